@@ -1,4 +1,7 @@
 """Defines custom authentication classes."""
+import time
+import threading
+from collections import OrderedDict
 import rest_framework.authentication
 from rest_framework.exceptions import AuthenticationFailed
 from datetime import timedelta
@@ -14,12 +17,171 @@ class TokenAuthentication(rest_framework.authentication.TokenAuthentication):
     """django.model: defines the Token model associated to this class"""
 
 
+class TokenAuthCache:
+    """Process-wide cache of the tokens used to authenticate REST requests, indexed by key.
+
+    Every cached token has its user loaded, with its permissions prefetched,
+    so authenticating a request with a cached token, and checking the permissions of its user,
+    does not query the database.
+
+    The cache keeps the field values of the tokens and users, and their permission caches, as plain data,
+    and builds new `Token` and `User` instances on every hit, so requests authenticated concurrently
+    do not share (and cannot modify) the same instances.
+
+    Entries are kept `TOKEN_AUTH_CACHE_TTL` seconds at most, and are invalidated by the signals
+    defined in `api.signals` when their token is deleted or their user, groups or permissions change.
+    """
+
+    _entries = OrderedDict()
+    """Time each token was cached, the id of its user and its data (see `_dump`), indexed by key,
+    from least to most recently used (`OrderedDict`)"""
+
+    _lock = threading.Lock()
+    """Lock of the `_entries`, as requests are authenticated in several threads (`threading.Lock`)"""
+
+    @classmethod
+    def get(cls, key):
+        """Return the cached token of a given key.
+
+        Parameters
+        ----------
+        key: `string`
+            The key of the token
+
+        Returns
+        -------
+        `Token`
+            A new instance of the token, with a new instance of its user,
+            or None if it is not cached or its entry is older than the TTL
+        """
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            cached_at, _, data = entry
+            if time.monotonic() - cached_at > settings.TOKEN_AUTH_CACHE_TTL:
+                del cls._entries[key]
+                return None
+            cls._entries.move_to_end(key)
+        return cls._load(data)
+
+    @classmethod
+    def add(cls, token):
+        """Prefetch the permissions of the user of a token and add the token to the cache.
+
+        Parameters
+        ----------
+        token: `Token`
+            The token, with its user
+        """
+        # Fills the permission caches of the user (see ModelBackend.get_all_permissions)
+        token.user.get_all_permissions()
+        data = cls._dump(token)
+        with cls._lock:
+            cls._entries[token.key] = (time.monotonic(), token.user_id, data)
+            cls._entries.move_to_end(token.key)
+            while len(cls._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate_token(cls, key):
+        """Remove a token from the cache.
+
+        Parameters
+        ----------
+        key: `string`
+            The key of the token
+        """
+        with cls._lock:
+            cls._entries.pop(key, None)
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        """Remove the tokens of a user from the cache.
+
+        Parameters
+        ----------
+        user_id: `int`
+            The id of the user
+        """
+        with cls._lock:
+            keys = [
+                key
+                for key, (_, entry_user_id, _) in cls._entries.items()
+                if entry_user_id == user_id
+            ]
+            for key in keys:
+                del cls._entries[key]
+
+    @classmethod
+    def clear(cls):
+        """Remove every token from the cache."""
+        with cls._lock:
+            cls._entries.clear()
+
+    @staticmethod
+    def _dump(token):
+        """Return the data of a token and its user that is kept in the cache.
+
+        Parameters
+        ----------
+        token: `Token`
+            The token, with its user and its permission caches filled
+
+        Returns
+        -------
+        `tuple`
+            The database of the token, the field values of the token and its user,
+            and the permission caches of the user, indexed by attribute name
+        """
+        user = token.user
+        permissions = {
+            name: frozenset(value)
+            for name, value in vars(user).items()
+            if name.endswith("_perm_cache")
+        }
+        return (
+            token._state.db,
+            tuple(getattr(token, f.attname) for f in Token._meta.concrete_fields),
+            tuple(getattr(user, f.attname) for f in type(user)._meta.concrete_fields),
+            permissions,
+        )
+
+    @staticmethod
+    def _load(data):
+        """Return a new token, with a new user, from the data kept in the cache.
+
+        Parameters
+        ----------
+        data: `tuple`
+            The data of the token, as returned by `_dump`
+
+        Returns
+        -------
+        `Token`
+            The token, with its user and its permission caches filled
+        """
+        db, token_values, user_values, permissions = data
+        user_model = Token._meta.get_field("user").related_model
+        token = Token.from_db(
+            db, [f.attname for f in Token._meta.concrete_fields], token_values
+        )
+        user = user_model.from_db(
+            db, [f.attname for f in user_model._meta.concrete_fields], user_values
+        )
+        for name, value in permissions.items():
+            setattr(user, name, set(value))
+        token.user = user
+        return token
+
+
 class ExpiringTokenAuthentication(rest_framework.authentication.TokenAuthentication):
     """Custom authentication class.
 
     Created in order to:
-    1. Use our custom Token model; and
-    2. Remove tokens if they are expired
+    1. Use our custom Token model;
+    2. Remove tokens if they are expired; and
+    3. Cache the valid tokens, with their users and permissions, in the `TokenAuthCache`
     """
 
     model = Token
@@ -40,10 +202,13 @@ class ExpiringTokenAuthentication(rest_framework.authentication.TokenAuthenticat
         User, Token
             The corresponding user and token objects
         """
-        try:
-            token = Token.objects.get(key=key)
-        except Token.DoesNotExist:
-            raise AuthenticationFailed("Invalid Token")
+        token = TokenAuthCache.get(key)
+        cached = token is not None
+        if not cached:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed("Invalid Token")
 
         if not token.user.is_active:
             raise AuthenticationFailed("User is not active")
@@ -52,6 +217,8 @@ class ExpiringTokenAuthentication(rest_framework.authentication.TokenAuthenticat
         if is_expired:
             raise AuthenticationFailed("The Token is expired")
 
+        if not cached:
+            TokenAuthCache.add(token)
         return (token.user, token)
 
     @classmethod
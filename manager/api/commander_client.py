@@ -0,0 +1,387 @@
+"""Defines the HTTP clients used to send requests to the LOVE-Commander."""
+import json
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+class CommanderClient:
+    """Process-wide HTTP client of the LOVE-Commander.
+
+    Requests are sent through a shared `requests.Session`, which keeps up to `COMMANDER_POOL_SIZE`
+    keep-alive connections, with the `COMMANDER_CONNECT_TIMEOUT` and `COMMANDER_READ_TIMEOUT` timeouts.
+    GET requests are retried up to `COMMANDER_RETRIES` times on connection and read errors,
+    other requests are only retried when the connection fails, as they may not be idempotent.
+    """
+
+    session = None
+    """Session used to send the requests, created on the first request (`requests.Session`)"""
+
+    _lock = threading.Lock()
+    """Lock used to create the session (`threading.Lock`)"""
+
+    @classmethod
+    def get_session(cls):
+        """Return the session, creating it if needed.
+
+        Returns
+        -------
+        `requests.Session`
+            The session
+        """
+        with cls._lock:
+            if cls.session is None:
+                retry = Retry(
+                    total=settings.COMMANDER_RETRIES,
+                    connect=settings.COMMANDER_RETRIES,
+                    read=settings.COMMANDER_RETRIES,
+                    status=0,
+                    allowed_methods=frozenset(["GET"]),
+                    backoff_factor=0.1,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.COMMANDER_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls.session = session
+            return cls.session
+
+    @classmethod
+    def get_url(cls, path):
+        """Return the URL of a LOVE-Commander endpoint.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any, e.g. "/salinfo/metadata"
+
+        Returns
+        -------
+        `string`
+            The URL
+        """
+        return f"http://{settings.COMMANDER_HOSTNAME}:{settings.COMMANDER_PORT}{path}"
+
+    @classmethod
+    def get_timeout(cls):
+        """Return the timeouts of the requests.
+
+        Returns
+        -------
+        `tuple`
+            The connect and read timeouts (in seconds)
+        """
+        return (settings.COMMANDER_CONNECT_TIMEOUT, settings.COMMANDER_READ_TIMEOUT)
+
+    @classmethod
+    def get(cls, path):
+        """Send a GET request to the LOVE-Commander.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+
+        Returns
+        -------
+        `requests.Response`
+            The response
+        """
+        return cls.get_session().get(cls.get_url(path), timeout=cls.get_timeout())
+
+    @classmethod
+    def post(cls, path, data):
+        """Send a POST request with a JSON body to the LOVE-Commander.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint
+        data: `dict`
+            Data sent as the JSON body
+
+        Returns
+        -------
+        `requests.Response`
+            The response
+        """
+        return cls.get_session().post(
+            cls.get_url(path), json=data, timeout=cls.get_timeout()
+        )
+
+    @classmethod
+    def reset(cls):
+        """Close the session and its connections, a new one is created on the next request."""
+        with cls._lock:
+            if cls.session is not None:
+                cls.session.close()
+            cls.session = None
+
+
+class CommanderResponse:
+    """Response of the LOVE-Commander to a request of the `AsyncCommanderClient`.
+
+    Parameters
+    ----------
+    status_code: `int`
+        HTTP status code of the response
+    headers: `dict`
+        Headers of the response, indexed by lowercase name
+    content: `bytes`
+        Body of the response
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Return the body of the response, decoded from JSON.
+
+        Returns
+        -------
+        `object`
+            The decoded body
+        """
+        return json.loads(self.content)
+
+
+class AsyncCommanderClient:
+    """Process-wide non-blocking HTTP client of the LOVE-Commander, for the event loop of the ASGI server.
+
+    Sends HTTP/1.1 requests through asyncio streams, keeping up to `COMMANDER_POOL_SIZE` idle
+    keep-alive connections, with the same timeouts and retries as the `CommanderClient`.
+    Idle connections that the LOVE-Commander closed are discarded before sending a request on them.
+    If one is closed while the request is sent, GET requests are sent again on a new connection,
+    but other requests fail, as the LOVE-Commander may have received them.
+    """
+
+    idle = []
+    """Idle connections, as (reader, writer) tuples (`list`)"""
+
+    loop = None
+    """Event loop of the idle connections, they are discarded when used from another loop
+    (`asyncio.AbstractEventLoop`)"""
+
+    @classmethod
+    def get_idle(cls):
+        """Return the idle connections of the running event loop.
+
+        Returns
+        -------
+        `list`
+            The idle connections
+        """
+        loop = asyncio.get_running_loop()
+        if cls.loop is not loop:
+            cls.loop = loop
+            cls.idle = []
+        return cls.idle
+
+    @classmethod
+    async def connect(cls):
+        """Return an idle connection, or open a new one if there are none.
+
+        Returns
+        -------
+        `tuple`
+            The reader and writer of the connection, and wether or not it was idle
+        """
+        idle = cls.get_idle()
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                settings.COMMANDER_HOSTNAME, int(settings.COMMANDER_PORT)
+            ),
+            settings.COMMANDER_CONNECT_TIMEOUT,
+        )
+        return reader, writer, False
+
+    @classmethod
+    def release(cls, reader, writer):
+        """Keep a connection as idle, or close it if there are already `COMMANDER_POOL_SIZE` idle connections.
+
+        Parameters
+        ----------
+        reader: `asyncio.StreamReader`
+            Reader of the connection
+        writer: `asyncio.StreamWriter`
+            Writer of the connection
+        """
+        idle = cls.get_idle()
+        if len(idle) < settings.COMMANDER_POOL_SIZE:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    @classmethod
+    async def read_response(cls, reader):
+        """Read a response from a connection.
+
+        Parameters
+        ----------
+        reader: `asyncio.StreamReader`
+            Reader of the connection
+
+        Returns
+        -------
+        `tuple`
+            The `CommanderResponse`, and wether or not the connection can be reused
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the LOVE-Commander")
+        version, status_code = status_line.decode("latin-1").split(" ", 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (
+            version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        )
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await reader.read()
+            keep_alive = False
+        return CommanderResponse(int(status_code), headers, content), keep_alive
+
+    @classmethod
+    async def request(cls, method, path, data=None):
+        """Send a request to the LOVE-Commander.
+
+        Connection failures are retried up to `COMMANDER_RETRIES` times,
+        other failures only for GET requests.
+
+        Parameters
+        ----------
+        method: `string`
+            HTTP method of the request
+        path: `string`
+            Path of the endpoint, including the query string if any
+        data: `dict`
+            Data sent as the JSON body, if any
+
+        Returns
+        -------
+        `CommanderResponse`
+            The response
+        """
+        body = b"" if data is None else json.dumps(data).encode()
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {settings.COMMANDER_HOSTNAME}:{settings.COMMANDER_PORT}\r\n"
+            "Accept: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+        )
+        if data is not None:
+            head += "Content-Type: application/json\r\n"
+        request = (head + "\r\n").encode("latin-1") + body
+
+        attempt = 0
+        while True:
+            if attempt > 0:
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+            attempt += 1
+            try:
+                reader, writer, reused = await cls.connect()
+            except (OSError, asyncio.TimeoutError):
+                if attempt > settings.COMMANDER_RETRIES:
+                    raise
+                continue
+            try:
+                writer.write(request)
+                response, keep_alive = await asyncio.wait_for(
+                    cls.read_response(reader), settings.COMMANDER_READ_TIMEOUT
+                )
+            except ConnectionResetError:
+                writer.close()
+                if reused and method == "GET":
+                    attempt -= 1
+                    continue
+                if method != "GET" or attempt > settings.COMMANDER_RETRIES:
+                    raise
+                continue
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                writer.close()
+                if method != "GET" or attempt > settings.COMMANDER_RETRIES:
+                    raise
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                cls.release(reader, writer)
+            else:
+                writer.close()
+            return response
+
+    @classmethod
+    async def get(cls, path):
+        """Send a GET request to the LOVE-Commander.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+
+        Returns
+        -------
+        `CommanderResponse`
+            The response
+        """
+        return await cls.request("GET", path)
+
+    @classmethod
+    async def post(cls, path, data):
+        """Send a POST request with a JSON body to the LOVE-Commander.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint
+        data: `dict`
+            Data sent as the JSON body
+
+        Returns
+        -------
+        `CommanderResponse`
+            The response
+        """
+        return await cls.request("POST", path, data)
+
+    @classmethod
+    def reset(cls):
+        """Close the idle connections."""
+        for reader, writer in cls.idle:
+            writer.close()
+        cls.idle = []
+        cls.loop = None
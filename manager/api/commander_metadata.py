@@ -0,0 +1,171 @@
+"""Defines the cache of the read-mostly LOVE-Commander metadata, e.g. SalInfo metadata and docstrings."""
+import asyncio
+import threading
+from api.commander_client import CommanderClient, AsyncCommanderClient
+from api.response_cache import commander_metadata_cache
+
+
+class CommanderMetadata:
+    """Process-wide cache of the responses of the LOVE-Commander endpoints whose data only changes
+    when the deployment changes, indexed by path and query string.
+
+    Successful responses are kept in the `commander_metadata_cache` for `COMMANDER_METADATA_CACHE_TTL` seconds.
+    Afterwards they are still served for `COMMANDER_METADATA_STALE_TTL` seconds, while they are
+    refreshed in the background, and kept if the refresh fails.
+
+    The cache can be invalidated (see `invalidate`), but only in this process:
+    the other processes keep serving their cached responses until they expire.
+    Every invalidation starts a new generation of the cache, and responses requested in a previous generation
+    are not cached, so requests in flight during an invalidation do not store outdated metadata.
+    """
+
+    refreshing = set()
+    """Paths being refreshed in the background (`set`)"""
+
+    generation = 0
+    """Number of invalidations of the cache (`int`)"""
+
+    _lock = threading.Lock()
+    """Lock of the `refreshing` and the `generation` (`threading.Lock`)"""
+
+    @classmethod
+    def store(cls, path, response, generation):
+        """Cache a response of the LOVE-Commander, if it was successful and the cache was not invalidated
+        since it was requested.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+        response: `requests.Response` or `CommanderResponse`
+            The response
+        generation: `int`
+            Generation of the cache when the response was requested
+
+        Returns
+        -------
+        `tuple`
+            The status code, the data and the ETag of the response, which is None if it was not cached
+        """
+        data = response.json()
+        if response.status_code != 200:
+            return response.status_code, data, None
+        with cls._lock:
+            if generation != cls.generation:
+                return 200, data, None
+            return 200, data, commander_metadata_cache.add(path, data)
+
+    @classmethod
+    def start_refresh(cls, path):
+        """Mark a path as being refreshed.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+
+        Returns
+        -------
+        `bool`
+            True if the path was not being refreshed already, False if it was
+        """
+        with cls._lock:
+            if path in cls.refreshing:
+                return False
+            cls.refreshing.add(path)
+            return True
+
+    @classmethod
+    def refresh(cls, path):
+        """Request a path from the LOVE-Commander again, keeping the cached response if it fails.
+
+        This is what the background threads do
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+        """
+        generation = cls.generation
+        try:
+            cls.store(path, CommanderClient.get(path), generation)
+        except Exception as e:
+            print(e, flush=True)
+        finally:
+            with cls._lock:
+                cls.refreshing.discard(path)
+
+    @classmethod
+    async def refresh_async(cls, path):
+        """Request a path from the LOVE-Commander again, keeping the cached response if it fails.
+
+        This is what the background tasks do
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+        """
+        generation = cls.generation
+        try:
+            cls.store(path, await AsyncCommanderClient.get(path), generation)
+        except Exception as e:
+            print(e, flush=True)
+        finally:
+            with cls._lock:
+                cls.refreshing.discard(path)
+
+    @classmethod
+    def get(cls, path):
+        """Return the response of a path, from the cache or from the LOVE-Commander.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+
+        Returns
+        -------
+        `tuple`
+            The status code, the data and the ETag of the response, which is None if it was not cached
+        """
+        generation = cls.generation
+        cached = commander_metadata_cache.lookup(path)
+        if cached is None:
+            return cls.store(path, CommanderClient.get(path), generation)
+        data, etag, expired = cached
+        if expired and cls.start_refresh(path):
+            threading.Thread(target=cls.refresh, args=(path,), daemon=True).start()
+        return 200, data, etag
+
+    @classmethod
+    async def get_async(cls, path):
+        """Return the response of a path, from the cache or from the LOVE-Commander,
+        without blocking the event loop.
+
+        Parameters
+        ----------
+        path: `string`
+            Path of the endpoint, including the query string if any
+
+        Returns
+        -------
+        `tuple`
+            The status code, the data and the ETag of the response, which is None if it was not cached
+        """
+        generation = cls.generation
+        cached = commander_metadata_cache.lookup(path)
+        if cached is None:
+            return cls.store(path, await AsyncCommanderClient.get(path), generation)
+        data, etag, expired = cached
+        if expired and cls.start_refresh(path):
+            asyncio.create_task(cls.refresh_async(path))
+        return 200, data, etag
+
+    @classmethod
+    def invalidate(cls):
+        """Remove every cached response of this process, e.g. after a deployment change,
+        and start a new generation of the cache."""
+        with cls._lock:
+            cls.generation += 1
+            commander_metadata_cache.clear()
@@ -0,0 +1,289 @@
+"""Defines the consumers that proxy the REST requests to the LOVE-Commander asynchronously."""
+import io
+import json
+import asyncio
+from urllib import parse
+from channels.db import database_sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication
+from api.authentication import ExpiringTokenAuthentication
+from api.commander_client import AsyncCommanderClient
+from api.commander_metadata import CommanderMetadata
+from api.efd_timeseries import EFDTimeseries
+from api.response_cache import etag_matches
+
+
+@database_sync_to_async
+def get_user(key, permission):
+    """Get the user of a token, and define wether or not it has a given permission.
+
+    Parameters
+    ----------
+    key: `string`
+        The key of the token
+    permission: `string`
+        The permission, or None if no permission is required
+
+    Returns
+    -------
+    `tuple`
+        The User, and wether or not it has the permission
+
+    Raises
+    ------
+    `exceptions.AuthenticationFailed`
+        If the token is not valid, or the user is inactive
+    """
+    user, _ = ExpiringTokenAuthentication().authenticate_credentials(key)
+    return user, permission is None or user.has_perm(permission)
+
+
+@database_sync_to_async
+def has_permission(user, permission):
+    """Define wether or not a user has a given permission.
+
+    Parameters
+    ----------
+    user: `User`
+        The user
+    permission: `string`
+        The permission, or None if no permission is required
+
+    Returns
+    -------
+    `bool`
+        True if the user has the permission, False if not
+    """
+    return permission is None or user.has_perm(permission)
+
+
+def enforce_csrf(scope, body):
+    """Check the CSRF token of a request authenticated with a session, as `SessionAuthentication` does.
+
+    Parameters
+    ----------
+    scope: `dict`
+        ASGI scope of the request
+    body: `bytes`
+        Body of the request
+
+    Raises
+    ------
+    `exceptions.PermissionDenied`
+        If the request is unsafe (e.g. POST) and its CSRF token is missing or wrong
+    """
+    SessionAuthentication().enforce_csrf(ASGIRequest(scope, io.BytesIO(body)))
+
+
+class CommanderProxyConsumer(AsyncHttpConsumer):
+    """Asynchronous version of the views that proxy requests to the LOVE-Commander, e.g. `api.views.commander`.
+
+    Requests are authenticated with their token, or with the session of the user (see `api.routing`),
+    as the views do, and forwarded with the `AsyncCommanderClient`,
+    so they do not hold a thread of the sync threadpool while waiting for the LOVE-Commander.
+    The endpoint is configured with keyword arguments of `as_asgi`, which set the attributes below.
+    """
+
+    method = "GET"
+    """HTTP method accepted by the endpoint (`string`)"""
+
+    commander_path = None
+    """Path of the LOVE-Commander endpoint (`string`)"""
+
+    query_params = ()
+    """Query parameters forwarded to the LOVE-Commander (`tuple`)"""
+
+    permission = None
+    """Permission required to use the endpoint, if any (`string`)"""
+
+    denied_message = None
+    """Message sent to users without the `permission` (`string`)"""
+
+    cached = False
+    """Define wether or not the responses are read-mostly metadata, served from the
+    `CommanderMetadata` cache with their ETags (`bool`)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    async def send_json(self, status, data, headers=()):
+        """Send a JSON response.
+
+        Parameters
+        ----------
+        status: `int`
+            HTTP status code of the response
+        data: `object`
+            Data sent as the JSON body
+        headers: `list`
+            Additional headers, as (name, value) tuples of `bytes`
+        """
+        await self.send_response(
+            status,
+            json.dumps(data).encode(),
+            headers=[(b"Content-Type", b"application/json"), *headers],
+        )
+
+    def get_token_key(self):
+        """Return the key of the token in the Authorization header of the request.
+
+        Returns
+        -------
+        `string`
+            The key, or None if the request has no token
+        """
+        auth = (self.get_header(b"authorization") or "").split()
+        if len(auth) == 2 and auth[0].lower() == "token":
+            return auth[1]
+        return None
+
+    def get_commander_path(self):
+        """Return the path of the LOVE-Commander endpoint, with the forwarded query parameters.
+
+        Returns
+        -------
+        `string`
+            The path
+        """
+        params = parse.parse_qs(self.scope["query_string"].decode())
+        query = [
+            (param, params[param][-1]) for param in self.query_params if param in params
+        ]
+        if query:
+            return self.commander_path + "?" + parse.urlencode(query)
+        return self.commander_path
+
+    def get_header(self, name):
+        """Return a header of the request.
+
+        Parameters
+        ----------
+        name: `bytes`
+            Lowercase name of the header
+
+        Returns
+        -------
+        `string`
+            The value of the header, or None if the request does not have it
+        """
+        for header, value in self.scope["headers"]:
+            if header.lower() == name:
+                return value.decode("latin-1")
+        return None
+
+    async def send_metadata(self):
+        """Send the response of the LOVE-Commander from the `CommanderMetadata` cache, with its ETag,
+        or an empty 304 response if the request has the same ETag in its If-None-Match header."""
+        status_code, data, etag = await CommanderMetadata.get_async(
+            self.get_commander_path()
+        )
+        if etag is None:
+            await self.send_json(status_code, data)
+        elif etag_matches(self.get_header(b"if-none-match") or "", etag):
+            await self.send_response(304, b"", headers=[(b"ETag", etag.encode())])
+        else:
+            await self.send_json(status_code, data, headers=[(b"ETag", etag.encode())])
+
+    async def forward(self, data):
+        """Forward a request to the LOVE-Commander and send its response.
+
+        Parameters
+        ----------
+        data: `dict`
+            Data of the request, sent as the JSON body of POST requests
+        """
+        if self.cached:
+            await self.send_metadata()
+            return
+        if self.method == "GET":
+            response = await AsyncCommanderClient.get(self.get_commander_path())
+        else:
+            response = await AsyncCommanderClient.post(self.commander_path, data)
+        await self.send_response(
+            response.status_code,
+            response.content,
+            headers=[(b"Content-Type", b"application/json")],
+        )
+
+    async def handle(self, body):
+        """Authenticate a request and forward it to the LOVE-Commander.
+
+        Parameters
+        ----------
+        body: `bytes`
+            Body of the request
+        """
+        if self.scope["method"] != self.method:
+            await self.send_json(
+                405,
+                {"detail": f'Method "{self.scope["method"]}" not allowed.'},
+                headers=[(b"Allow", self.method.encode())],
+            )
+            return
+
+        key = self.get_token_key()
+        if key is not None:
+            try:
+                user, allowed = await get_user(key, self.permission)
+            except exceptions.AuthenticationFailed as e:
+                await self.send_json(
+                    401,
+                    {"detail": str(e.detail)},
+                    headers=[(b"WWW-Authenticate", b"Token")],
+                )
+                return
+        else:
+            user = self.scope.get("user")
+            if user is None or not user.is_authenticated:
+                await self.send_json(
+                    401,
+                    {"detail": "Authentication credentials were not provided."},
+                    headers=[(b"WWW-Authenticate", b"Token")],
+                )
+                return
+            try:
+                enforce_csrf(self.scope, body)
+            except exceptions.PermissionDenied as e:
+                await self.send_json(403, {"detail": str(e.detail)})
+                return
+            allowed = await has_permission(user, self.permission)
+        if not allowed:
+            await self.send_json(401, {"ack": self.denied_message})
+            return
+
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError as e:
+            await self.send_json(400, {"detail": f"JSON parse error - {e}"})
+            return
+        try:
+            await self.forward(data)
+        except (
+            OSError,
+            ValueError,
+            asyncio.TimeoutError,
+            asyncio.IncompleteReadError,
+        ) as e:
+            await self.send_json(
+                502, {"detail": f"LOVE-Commander request failed: {e!r}"}
+            )
+
+
+class EFDTimeseriesProxyConsumer(CommanderProxyConsumer):
+    """Asynchronous version of `api.views.query_efd_timeseries`, which only requests the time ranges
+    that are not cached by `EFDTimeseries` to the LOVE-Commander."""
+
+    async def forward(self, data):
+        """Query the timeseries and send the response stitched from the cached points.
+
+        Parameters
+        ----------
+        data: `dict`
+            Data of the request
+        """
+        status_code, response_data = await EFDTimeseries.query_async(data)
+        await self.send_json(status_code, response_data)
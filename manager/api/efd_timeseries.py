@@ -0,0 +1,535 @@
+"""Defines the incremental cache of the EFD timeseries queried through the LOVE-Commander."""
+import re
+import sys
+import bisect
+import asyncio
+import datetime
+import threading
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from api.commander_client import CommanderClient, AsyncCommanderClient
+
+RESAMPLE_UNITS = {
+    "ms": 0.001,
+    "L": 0.001,
+    "S": 1,
+    "s": 1,
+    "sec": 1,
+    "T": 60,
+    "min": 60,
+    "H": 3600,
+    "h": 3600,
+    "D": 86400,
+    "d": 86400,
+}
+"""Duration (in seconds) of the units of the resample offsets that can be cached (`dict`)"""
+
+EPOCH = datetime.datetime(1970, 1, 1)
+"""Origin of the resample bins (`datetime.datetime`)"""
+
+EFDQuery = namedtuple("EFDQuery", ["data", "start", "end", "resample", "fields"])
+"""Timeseries query: the request data, its time range, its resample bin (in seconds, or None)
+and the requested fields, as (csc, index, topic, field) tuples"""
+
+
+def parse_date(value):
+    """Parse a date of the EFD queries and responses, as a naive UTC datetime.
+
+    Parameters
+    ----------
+    value: `string`
+        The date in ISO format, e.g. "2020-03-16T12:00:00" or "2020-03-06 21:49:41.471000"
+
+    Returns
+    -------
+    `datetime.datetime`
+        The date
+    """
+    date = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def parse_resample(value):
+    """Parse a resample offset, e.g. "15min" or "10S".
+
+    Parameters
+    ----------
+    value: `string`
+        The offset, or None if the query is not resampled
+
+    Returns
+    -------
+    `float`
+        The duration of the resample bins (in seconds), or None if the query is not resampled
+
+    Raises
+    ------
+    `ValueError`
+        If the offset is not supported
+    """
+    if not value:
+        return None
+    match = re.fullmatch(r"(\d*\.?\d*)\s*([A-Za-z]+)", value.strip())
+    if match is None or match.group(2) not in RESAMPLE_UNITS:
+        raise ValueError(f"Unsupported resample offset: {value}")
+    seconds = float(match.group(1) or 1) * RESAMPLE_UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"Unsupported resample offset: {value}")
+    return seconds
+
+
+def floor_date(date, resample):
+    """Return the start of the resample bin of a date.
+
+    Parameters
+    ----------
+    date: `datetime.datetime`
+        The date
+    resample: `float`
+        Duration of the resample bins (in seconds), or None
+
+    Returns
+    -------
+    `datetime.datetime`
+        The start of the bin, or the date if there are no bins
+    """
+    if resample is None:
+        return date
+    bins = (date - EPOCH).total_seconds() // resample
+    return EPOCH + datetime.timedelta(seconds=bins * resample)
+
+
+def ceil_date(date, resample):
+    """Return the end of the resample bin of a date, or the date if it is the start of a bin.
+
+    Parameters
+    ----------
+    date: `datetime.datetime`
+        The date
+    resample: `float`
+        Duration of the resample bins (in seconds), or None
+
+    Returns
+    -------
+    `datetime.datetime`
+        The end of the bin, or the date if there are no bins
+    """
+    start = floor_date(date, resample)
+    if start == date:
+        return date
+    return start + datetime.timedelta(seconds=resample)
+
+
+def get_point_size(point):
+    """Estimate the memory used by a cached point.
+
+    Parameters
+    ----------
+    point: `dict`
+        The point, e.g. {"ts": "2020-03-06 21:49:41.471000", "value": 0.21}
+
+    Returns
+    -------
+    `int`
+        The estimated size (in bytes), including its parsed timestamp
+    """
+    return (
+        sys.getsizeof(point)
+        + sum(sys.getsizeof(value) for value in point.values())
+        + sys.getsizeof(EPOCH)
+    )
+
+
+class EFDSeries:
+    """Cached points of a field of an EFD topic, sorted by timestamp, and the time ranges they cover."""
+
+    def __init__(self):
+        self.covered = []
+        """Disjoint time ranges whose points are cached, as sorted (start, end) tuples (`list`)"""
+
+        self.timestamps = []
+        """Timestamps of the points (`list` of `datetime.datetime`)"""
+
+        self.points = []
+        """Points, as received from the LOVE-Commander (`list` of `dict`)"""
+
+        self.size = 0
+        """Estimated memory used by the points (in bytes) (`int`)"""
+
+        self.window = datetime.timedelta(0)
+        """Longest time window queried, older points are discarded (`datetime.timedelta`)"""
+
+    def get_gaps(self, start, end):
+        """Return the time ranges of a query that are not covered.
+
+        Parameters
+        ----------
+        start: `datetime.datetime`
+            Start of the query
+        end: `datetime.datetime`
+            End of the query
+
+        Returns
+        -------
+        `list`
+            The uncovered ranges, as (start, end) tuples
+        """
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self.covered:
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, start, end, covered_end, timestamps, points):
+        """Replace the points of a time range by the ones received from the LOVE-Commander.
+
+        Parameters
+        ----------
+        start: `datetime.datetime`
+            Start of the range
+        end: `datetime.datetime`
+            End of the range
+        covered_end: `datetime.datetime`
+            End of the part of the range that is complete, points after it can still be written to the EFD
+        timestamps: `list` of `datetime.datetime`
+            Sorted timestamps of the points
+        points: `list` of `dict`
+            The points
+        """
+        first = bisect.bisect_left(self.timestamps, start)
+        last = bisect.bisect_right(self.timestamps, end)
+        self.size -= sum(get_point_size(point) for point in self.points[first:last])
+        self.size += sum(get_point_size(point) for point in points)
+        self.timestamps[first:last] = timestamps
+        self.points[first:last] = points
+        if covered_end <= start:
+            return
+        covered = []
+        for covered_range in sorted(self.covered + [(start, covered_end)]):
+            if covered and covered_range[0] <= covered[-1][1]:
+                covered[-1] = (covered[-1][0], max(covered[-1][1], covered_range[1]))
+            else:
+                covered.append(covered_range)
+        self.covered = covered
+
+    def trim(self, start):
+        """Discard the points before a date.
+
+        Parameters
+        ----------
+        start: `datetime.datetime`
+            The date
+        """
+        first = bisect.bisect_left(self.timestamps, start)
+        self.size -= sum(get_point_size(point) for point in self.points[:first])
+        del self.timestamps[:first]
+        del self.points[:first]
+        self.covered = [
+            (max(covered_start, start), covered_end)
+            for covered_start, covered_end in self.covered
+            if covered_end > start
+        ]
+
+    def get_points(self, start, end):
+        """Return the points of a time range.
+
+        Parameters
+        ----------
+        start: `datetime.datetime`
+            Start of the range
+        end: `datetime.datetime`
+            End of the range
+
+        Returns
+        -------
+        `list` of `dict`
+            The points
+        """
+        first = bisect.bisect_left(self.timestamps, start)
+        last = bisect.bisect_right(self.timestamps, end)
+        return self.points[first:last]
+
+
+class EFDTimeseries:
+    """Process-wide incremental cache of the EFD timeseries, indexed by
+    (efd_instance, csc, index, topic, field, resample).
+
+    Queries only request the time ranges that are not cached yet to the LOVE-Commander,
+    and the response is stitched from the cached points. As plots query sliding windows,
+    this is usually the few seconds since their previous query.
+    The last `EFD_TIMESERIES_SETTLE_TIME` seconds are not considered cached, as data can still be
+    written to the EFD, and points older than the longest window queried for a series are discarded.
+    The least recently used series are discarded when the cached points use more than
+    `EFD_TIMESERIES_CACHE_SIZE` megabytes.
+    Queries with resample offsets that cannot be aligned (e.g. "1W") are forwarded without cache.
+    """
+
+    series = OrderedDict()
+    """Cached series, from the least to the most recently used (`OrderedDict` of `EFDSeries`)"""
+
+    size = 0
+    """Estimated memory used by the cached points (in bytes) (`int`)"""
+
+    _lock = threading.Lock()
+    """Lock of the `series` (`threading.Lock`)"""
+
+    @classmethod
+    def parse_query(cls, data):
+        """Parse the data of a timeseries request.
+
+        Parameters
+        ----------
+        data: `dict`
+            The request data, see `api.views.query_efd_timeseries`
+
+        Returns
+        -------
+        `EFDQuery`
+            The query, or None if it cannot be cached
+        """
+        try:
+            resample = parse_resample(data.get("resample"))
+            start = parse_date(data["start_date"])
+            end = start + datetime.timedelta(minutes=float(data["time_window"]))
+            fields = [
+                (csc, str(index), topic, field)
+                for csc, indexes in data["cscs"].items()
+                for index, topics in indexes.items()
+                for topic, topic_fields in topics.items()
+                for field in topic_fields
+            ]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+        if end <= start or not fields:
+            return None
+        return EFDQuery(data, floor_date(start, resample), end, resample, fields)
+
+    @classmethod
+    def get_key(cls, query, field):
+        """Return the key of a series.
+
+        Parameters
+        ----------
+        query: `EFDQuery`
+            The query
+        field: `tuple`
+            The field, as a (csc, index, topic, field) tuple
+
+        Returns
+        -------
+        `tuple`
+            The key
+        """
+        return (query.data.get("efd_instance"), *field, query.data.get("resample"))
+
+    @classmethod
+    def get_requests(cls, query):
+        """Return the requests to send to the LOVE-Commander to complete the cached points of a query.
+        Fields with the same uncovered time ranges are requested together.
+
+        Parameters
+        ----------
+        query: `EFDQuery`
+            The query
+
+        Returns
+        -------
+        `list`
+            The requests, as (start, end, fields, data) tuples
+        """
+        fields_by_gaps = {}
+        with cls._lock:
+            for field in query.fields:
+                series = cls.series.get(cls.get_key(query, field))
+                if series is None:
+                    gaps = [(query.start, query.end)]
+                else:
+                    gaps = series.get_gaps(query.start, query.end)
+                # Gaps are widened to whole bins, and then to whole minutes,
+                # as the LOVE-Commander takes the time window in minutes
+                gaps = tuple(
+                    (
+                        floor_date(floor_date(start, query.resample), 60),
+                        ceil_date(ceil_date(end, query.resample), 60),
+                    )
+                    for start, end in gaps
+                )
+                fields_by_gaps.setdefault(gaps, []).append(field)
+
+        requests = []
+        for gaps, fields in fields_by_gaps.items():
+            cscs = {}
+            for csc, index, topic, field in fields:
+                cscs.setdefault(csc, {}).setdefault(index, {}).setdefault(
+                    topic, []
+                ).append(field)
+            for start, end in gaps:
+                data = {
+                    **query.data,
+                    "start_date": start.isoformat(),
+                    "time_window": round((end - start).total_seconds() / 60),
+                    "cscs": cscs,
+                }
+                requests.append((start, end, fields, data))
+        return requests
+
+    @classmethod
+    def complete(cls, query, results):
+        """Cache the points received from the LOVE-Commander and return the response of a query.
+
+        Parameters
+        ----------
+        query: `EFDQuery`
+            The query
+        results: `list`
+            The requests returned by `get_requests` and their responses data,
+            as (start, end, fields, response data) tuples
+
+        Returns
+        -------
+        `dict`
+            The response data, or None if cached points were discarded meanwhile by another query
+        """
+        settled = datetime.datetime.utcnow() - datetime.timedelta(
+            seconds=settings.EFD_TIMESERIES_SETTLE_TIME
+        )
+        window = query.end - query.start
+        with cls._lock:
+            for start, end, fields, response in results:
+                covered_end = floor_date(min(end, settled), query.resample)
+                for csc, index, topic, field in fields:
+                    key = cls.get_key(query, (csc, index, topic, field))
+                    series = cls.series.get(key)
+                    if series is None:
+                        series = cls.series[key] = EFDSeries()
+                    points = response.get(f"{csc}-{index}-{topic}", {}).get(field, [])
+                    timestamps = [parse_date(point["ts"]) for point in points]
+                    ordered = sorted(
+                        (ts, i, point)
+                        for i, (ts, point) in enumerate(zip(timestamps, points))
+                        if start <= ts <= end
+                    )
+                    size = series.size
+                    series.add(
+                        start,
+                        end,
+                        covered_end,
+                        [ts for ts, _, _ in ordered],
+                        [point for _, _, point in ordered],
+                    )
+                    cls.size += series.size - size
+
+            data = {}
+            for field in query.fields:
+                key = cls.get_key(query, field)
+                series = cls.series.get(key)
+                fetched = [
+                    (start, end) for start, end, fields, _ in results if field in fields
+                ]
+                if series is None or any(
+                    not any(start <= gap[0] and gap[1] <= end for start, end in fetched)
+                    for gap in series.get_gaps(query.start, query.end)
+                ):
+                    return None
+                csc, index, topic, name = field
+                data.setdefault(f"{csc}-{index}-{topic}", {})[name] = series.get_points(
+                    query.start, query.end
+                )
+
+            for field in query.fields:
+                key = cls.get_key(query, field)
+                series = cls.series[key]
+                series.window = max(series.window, window)
+                size = series.size
+                series.trim(query.start - series.window)
+                cls.size += series.size - size
+                cls.series.move_to_end(key)
+            max_size = settings.EFD_TIMESERIES_CACHE_SIZE * 1024 * 1024
+            while cls.series and cls.size > max_size:
+                _, series = cls.series.popitem(last=False)
+                cls.size -= series.size
+        return data
+
+    @classmethod
+    def query(cls, data):
+        """Query a timeseries, requesting only the time ranges that are not cached to the LOVE-Commander.
+
+        Parameters
+        ----------
+        data: `dict`
+            The request data, see `api.views.query_efd_timeseries`
+
+        Returns
+        -------
+        `tuple`
+            The status code and the data of the response
+        """
+        query = cls.parse_query(data)
+        if query is not None:
+            results = []
+            for start, end, fields, request_data in cls.get_requests(query):
+                response = CommanderClient.post("/efd/timeseries", request_data)
+                if response.status_code != 200:
+                    return response.status_code, response.json()
+                results.append((start, end, fields, response.json()))
+            response_data = cls.complete(query, results)
+            if response_data is not None:
+                return 200, response_data
+        response = CommanderClient.post("/efd/timeseries", data)
+        return response.status_code, response.json()
+
+    @classmethod
+    async def query_async(cls, data):
+        """Query a timeseries, requesting only the time ranges that are not cached to the LOVE-Commander,
+        without blocking the event loop.
+
+        Parameters
+        ----------
+        data: `dict`
+            The request data, see `api.views.query_efd_timeseries`
+
+        Returns
+        -------
+        `tuple`
+            The status code and the data of the response
+        """
+        query = cls.parse_query(data)
+        if query is not None:
+            requests = cls.get_requests(query)
+            responses = await asyncio.gather(
+                *[
+                    AsyncCommanderClient.post("/efd/timeseries", request_data)
+                    for _, _, _, request_data in requests
+                ]
+            )
+            for response in responses:
+                if response.status_code != 200:
+                    return response.status_code, response.json()
+            results = [
+                (start, end, fields, response.json())
+                for (start, end, fields, _), response in zip(requests, responses)
+            ]
+            response_data = cls.complete(query, results)
+            if response_data is not None:
+                return 200, response_data
+        response = await AsyncCommanderClient.post("/efd/timeseries", data)
+        return response.status_code, response.json()
+
+    @classmethod
+    def reset(cls):
+        """Discard every cached series."""
+        with cls._lock:
+            cls.series = OrderedDict()
+            cls.size = 0
@@ -0,0 +1,344 @@
+"""Defines the health of the LDAP servers, the pool of LDAP connections and the cache of the love_ops group members."""
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import ldap
+from django.conf import settings
+
+LOVE_OPS_GROUP_DN = "cn=love_ops,cn=groups,cn=compat,dc=lsst,dc=cloud"
+"""DN of the group whose members get the cmd and ui_framework groups on their first login (`string`)"""
+
+
+class LDAPServerHealth:
+    """Process-wide registry of the health and latency of the LDAP servers, indexed by URI.
+
+    Servers are healthy until an operation on them fails. Then a background thread probes them
+    every `LDAP_HEALTH_PROBE_INTERVAL` seconds, until they answer again.
+    The latency of a server is the exponential moving average of its successful logins.
+    """
+
+    latencies = {}
+    """Latency (in seconds) of the servers, indexed by URI (`dict`)"""
+
+    failures = {}
+    """Number of failed operations of the servers, indexed by URI (`dict`)"""
+
+    unhealthy = set()
+    """URIs of the servers that are unhealthy, and being probed (`set`)"""
+
+    latency_weight = 0.2
+    """Weight of the latest latency in the moving average (`float`)"""
+
+    _lock = threading.Lock()
+    """Lock of the registry (`threading.Lock`)"""
+
+    @classmethod
+    def record_success(cls, uri, latency):
+        """Mark a server as healthy and update its latency.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        latency: `float`
+            Duration of the operation (in seconds)
+        """
+        with cls._lock:
+            previous = cls.latencies.get(uri)
+            cls.latencies[uri] = (
+                latency
+                if previous is None
+                else previous + cls.latency_weight * (latency - previous)
+            )
+            cls.unhealthy.discard(uri)
+
+    @classmethod
+    def record_failure(cls, uri):
+        """Mark a server as unhealthy, and start probing it in the background.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        """
+        with cls._lock:
+            cls.failures[uri] = cls.failures.get(uri, 0) + 1
+            if uri in cls.unhealthy:
+                return
+            cls.unhealthy.add(uri)
+        threading.Thread(target=cls.probe, args=(uri,), daemon=True).start()
+
+    @classmethod
+    @contextmanager
+    def track(cls, uri):
+        """Measure an operation on a server, it is a success if it does not raise exceptions
+        and no failure is recorded for the server meanwhile, e.g. by the `ldap_error` signal.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        """
+        failures = cls.failures.get(uri, 0)
+        start = time.monotonic()
+        yield
+        if cls.failures.get(uri, 0) == failures:
+            cls.record_success(uri, time.monotonic() - start)
+
+    @classmethod
+    def is_healthy(cls, uri):
+        """Define wether or not a server is healthy.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+
+        Returns
+        -------
+        `bool`
+            True if the server is healthy, False if not
+        """
+        return uri not in cls.unhealthy
+
+    @classmethod
+    def order(cls, uris):
+        """Sort servers by preference: the healthy ones, from the fastest to the slowest.
+        Servers without latency measurements go first, to measure them.
+        If no server is healthy, all of them are returned in the given order.
+
+        Parameters
+        ----------
+        uris: `list` of `string`
+            URIs of the LDAP servers
+
+        Returns
+        -------
+        `list` of `string`
+            The URIs of the servers that should be tried, in order
+        """
+        with cls._lock:
+            healthy = [uri for uri in uris if uri not in cls.unhealthy]
+            if not healthy:
+                return list(uris)
+            return sorted(healthy, key=lambda uri: cls.latencies.get(uri, 0))
+
+    @classmethod
+    def probe(cls, uri):
+        """Try to connect to a server periodically, until it answers.
+
+        This is what the background threads do
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        """
+        while uri in cls.unhealthy:
+            time.sleep(settings.LDAP_HEALTH_PROBE_INTERVAL)
+            start = time.monotonic()
+            try:
+                connection = ldap.initialize(uri)
+                for option, value in settings.LDAP_CONNECTION_OPTIONS.items():
+                    connection.set_option(option, value)
+                connection.whoami_s()
+                connection.unbind_s()
+            except Exception:
+                continue
+            cls.record_success(uri, time.monotonic() - start)
+
+    @classmethod
+    def reset(cls):
+        """Reset the registry, the probing threads stop at their next probe."""
+        with cls._lock:
+            cls.latencies = {}
+            cls.failures = {}
+            cls.unhealthy = set()
+
+
+class LDAPConnectionPool:
+    """Process-wide pools of LDAP connections, one per server URI, of up to `LDAP_POOL_SIZE` idle connections.
+
+    Connections are created with `ldap.initialize` when a pool is empty, and discarded when
+    an operation on them fails.
+    """
+
+    pools = {}
+    """Queues of idle connections, indexed by server URI (`dict`)"""
+
+    _lock = threading.Lock()
+    """Lock used to create the pools (`threading.Lock`)"""
+
+    @classmethod
+    def get_pool(cls, uri):
+        """Return the pool of a server, creating it if needed.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+
+        Returns
+        -------
+        `queue.LifoQueue`
+            The idle connections of the server
+        """
+        with cls._lock:
+            if uri not in cls.pools:
+                cls.pools[uri] = queue.LifoQueue(maxsize=settings.LDAP_POOL_SIZE)
+            return cls.pools[uri]
+
+    @classmethod
+    @contextmanager
+    def connection(cls, uri):
+        """Borrow a connection to a server, it is returned to the pool unless the operation fails.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+
+        Yields
+        ------
+        `LDAPObject`
+            The connection
+        """
+        pool = cls.get_pool(uri)
+        try:
+            connection = pool.get_nowait()
+        except queue.Empty:
+            connection = ldap.initialize(uri)
+            for option, value in settings.LDAP_CONNECTION_OPTIONS.items():
+                connection.set_option(option, value)
+        try:
+            yield connection
+        except ldap.LDAPError:
+            LDAPServerHealth.record_failure(uri)
+            raise
+        # Only reached if the operation succeeded, so broken connections are not reused
+        try:
+            pool.put_nowait(connection)
+        except queue.Full:
+            pass
+
+    @classmethod
+    def reset(cls):
+        """Discard every pool."""
+        with cls._lock:
+            cls.pools = {}
+
+
+class LoveOpsMembers:
+    """Process-wide cache of the usernames of the members of the love_ops group, per server URI.
+
+    Members are searched in the server the first time they are needed. Then the cached set is used,
+    and refreshed in a background thread when it is older than `LDAP_LOVE_OPS_CACHE_TTL` seconds,
+    so membership checks are set lookups.
+    """
+
+    members = {}
+    """Cached members and the time they were searched, indexed by server URI (`dict`)"""
+
+    refreshing = set()
+    """URIs of the servers whose members are being refreshed in the background (`set`)"""
+
+    _lock = threading.Lock()
+    """Lock of the `members` and `refreshing` (`threading.Lock`)"""
+
+    @classmethod
+    def search(cls, uri):
+        """Search the members of the group in a server.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+
+        Returns
+        -------
+        `frozenset` of `string`
+            The usernames of the members
+        """
+        with LDAPConnectionPool.connection(uri) as connection:
+            result = connection.search_s(LOVE_OPS_GROUP_DN, ldap.SCOPE_SUBTREE)
+        members = frozenset(member.decode() for member in result[0][1]["memberUid"])
+        with cls._lock:
+            cls.members[uri] = (time.monotonic(), members)
+        return members
+
+    @classmethod
+    def refresh(cls, uri):
+        """Search the members of the group in a server, keeping the cached ones if it fails.
+
+        This is what the background threads do
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        """
+        try:
+            cls.search(uri)
+        except Exception as e:
+            print(e, flush=True)
+        finally:
+            with cls._lock:
+                cls.refreshing.discard(uri)
+
+    @classmethod
+    def get(cls, uri):
+        """Return the members of the group in a server.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+
+        Returns
+        -------
+        `frozenset` of `string`
+            The usernames of the members
+        """
+        with cls._lock:
+            cached = cls.members.get(uri)
+            if cached is None:
+                start_refresh = False
+            else:
+                searched_at, members = cached
+                start_refresh = (
+                    time.monotonic() - searched_at > settings.LDAP_LOVE_OPS_CACHE_TTL
+                    and uri not in cls.refreshing
+                )
+                if start_refresh:
+                    cls.refreshing.add(uri)
+        if cached is None:
+            return cls.search(uri)
+        if start_refresh:
+            threading.Thread(target=cls.refresh, args=(uri,), daemon=True).start()
+        return members
+
+    @classmethod
+    def is_member(cls, uri, username):
+        """Define wether or not a user is a member of the group.
+
+        Parameters
+        ----------
+        uri: `string`
+            URI of the LDAP server
+        username: `string`
+            The username
+
+        Returns
+        -------
+        `bool`
+            True if the user is a member of the group, False if not
+        """
+        return username in cls.get(uri)
+
+    @classmethod
+    def reset(cls):
+        """Discard the cached members."""
+        with cls._lock:
+            cls.members = {}
+            cls.refreshing = set()
@@ -0,0 +1,139 @@
+"""Defines the dispatcher of the logout messages sent to the consumers of deleted tokens."""
+import queue
+import asyncio
+import concurrent.futures
+import threading
+from channels.layers import get_channel_layer
+from django.conf import settings
+from subscription.metrics import Metrics
+
+
+class LogoutDispatcher:
+    """Sends the logout messages to the groups of the deleted tokens ("token-<key>") in the background.
+
+    Keys are put on an in-process queue, so whoever deletes a token does not wait on the Channel Layer.
+    A worker thread drains the queue in batches of up to `LOGOUT_DISPATCH_BATCH_SIZE` keys,
+    and hands every batch to the event loop of the consumers (see `initialize`), where its messages are sent
+    concurrently, as the Channel Layer is not thread-safe. Processes without consumers,
+    e.g. the `sweeptokens` command, send the batches in an event loop of the worker thread.
+    """
+
+    loop = None
+    """Event loop of the consumers of the process, where the messages are sent (`asyncio.AbstractEventLoop`)"""
+
+    pending = queue.Queue()
+    """Keys of the tokens whose consumers must logout (`queue.Queue`)"""
+
+    worker = None
+    """Thread that drains the `pending` queue (`threading.Thread`)"""
+
+    _lock = threading.Lock()
+    """Lock used to start the `worker` only once (`threading.Lock`)"""
+
+    @classmethod
+    def initialize(cls):
+        """Initialize the LogoutDispatcher.
+
+        Keep the running event loop, i.e. the one of the consumers, to send the messages in it.
+        """
+        cls.loop = asyncio.get_event_loop()
+
+    @classmethod
+    def enqueue(cls, keys):
+        """Queue the logout messages of the given tokens, starting the worker if needed.
+
+        Parameters
+        ----------
+        keys: `list` of `string`
+            keys of the tokens whose consumers must logout
+        """
+        for key in keys:
+            cls.pending.put(key)
+        if cls.worker is None:
+            with cls._lock:
+                if cls.worker is None:
+                    cls.worker = threading.Thread(
+                        target=cls.run, name="logout-dispatcher", daemon=True
+                    )
+                    cls.worker.start()
+
+    @classmethod
+    def flush(cls):
+        """Wait until every queued logout message is sent, e.g. before the process exits."""
+        cls.pending.join()
+
+    @classmethod
+    def get_batch(cls):
+        """Wait for a key in the queue and return it with the following ones, up to a batch.
+
+        Returns
+        -------
+        `list` of `string`
+            The keys of the batch
+        """
+        keys = [cls.pending.get()]
+        while len(keys) < settings.LOGOUT_DISPATCH_BATCH_SIZE:
+            try:
+                keys.append(cls.pending.get_nowait())
+            except queue.Empty:
+                break
+        return keys
+
+    @classmethod
+    async def send(cls, keys):
+        """Send the logout message to the groups of the given tokens, concurrently.
+
+        Parameters
+        ----------
+        keys: `list` of `string`
+            keys of the tokens whose consumers must logout
+        """
+        channel_layer = get_channel_layer()
+        payload = {"type": "logout", "message": ""}
+        await asyncio.gather(
+            *[channel_layer.group_send("token-{}".format(key), payload) for key in keys]
+        )
+        Metrics.increment("logout_messages", len(keys))
+        Metrics.increment("logout_batches")
+
+    @classmethod
+    def send_in_loop(cls, keys, loop):
+        """Send the logout message to the groups of the given tokens in another event loop,
+        and wait until they are sent, or the loop stops.
+
+        Parameters
+        ----------
+        keys: `list` of `string`
+            keys of the tokens whose consumers must logout
+        loop: `asyncio.AbstractEventLoop`
+            the event loop
+        """
+        future = asyncio.run_coroutine_threadsafe(cls.send(keys), loop)
+        while loop.is_running():
+            try:
+                return future.result(timeout=1)
+            except concurrent.futures.TimeoutError:
+                pass
+        future.cancel()
+
+    @classmethod
+    def run(cls):
+        """Drain the queue in batches, sending their messages in the event loop of the consumers,
+        or in the event loop of the thread if the process has no consumers running.
+
+        This is what the `worker` does
+        """
+        own_loop = asyncio.new_event_loop()
+        while True:
+            keys = cls.get_batch()
+            try:
+                loop = cls.loop
+                if loop is not None and loop.is_running():
+                    cls.send_in_loop(keys, loop)
+                else:
+                    own_loop.run_until_complete(cls.send(keys))
+            except Exception as e:
+                print(e, flush=True)
+            finally:
+                for key in keys:
+                    cls.pending.task_done()
@@ -0,0 +1,62 @@
+"""Management utility to delete the expired tokens."""
+import time
+from django.core.management.base import BaseCommand
+from api.logout_dispatcher import LogoutDispatcher
+from api.token_sweeper import TokenSweeper
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired tokens and instruct their consumers to logout.
+
+    It deletes the expired tokens once, or periodically if an interval is given,
+    run `python manage.py sweeptokens --help` for help.
+    """
+
+    help = """Django command to delete the expired tokens and instruct their consumers to logout.\n
+    It deletes the expired tokens once, or periodically if an interval is given."""
+
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        """Add arguments for the command.
+
+        Params
+        ------
+        parser: object
+            parser for the arguments
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Specifies the maximum number of tokens deleted per query.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Specifies the interval between sweeps in seconds, to sweep periodically.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command, which deletes the expired tokens.
+
+        Params
+        ------
+        args: list
+            List of arguments
+        kwargs: dict
+            Dictionary with addittional keyword arguments (indexed by keys in the dict)
+        """
+        while True:
+            if not options.get("interval"):
+                deleted = TokenSweeper.sweep(options.get("batch_size"))
+                LogoutDispatcher.flush()
+                self.stdout.write("Deleted {} expired tokens".format(deleted))
+                break
+            # Sweeping periodically, failures are reported and the next sweep is tried anyway
+            try:
+                deleted = TokenSweeper.sweep(options.get("batch_size"))
+                LogoutDispatcher.flush()
+                self.stdout.write("Deleted {} expired tokens".format(deleted))
+            except Exception as e:
+                self.stderr.write("Failed to delete the expired tokens: {!r}".format(e))
+            time.sleep(options["interval"])
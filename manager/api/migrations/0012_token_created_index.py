@@ -0,0 +1,20 @@
+# Generated by Django 3.1.14 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_auto_20221123_1413"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="token",
+            name="created",
+            field=models.DateTimeField(
+                auto_now_add=True, db_index=True, verbose_name="Created"
+            ),
+        ),
+    ]
@@ -50,6 +50,9 @@ class Token(rest_framework.authtoken.models.Token):
     )
     """ Relation to User model, it is a ForeignKey, so each user can have more than one token"""
 
+    created = models.DateTimeField(_("Created"), auto_now_add=True, db_index=True)
+    """ Creation date, indexed to find the expired tokens"""
+
     def __str__(self):
         """Define the string representation for objects of this class.
 
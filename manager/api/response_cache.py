@@ -0,0 +1,202 @@
+"""Defines a cache of response payloads with TTL and ETag, shared by the views of this app."""
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    """Process-wide cache of response payloads, with their ETags.
+
+    Entries expire after the number of seconds defined by the `ttl_setting`,
+    the least recently used ones are removed when there are more than `size`.
+    Expired entries can be kept as stale for the number of seconds defined by the `stale_setting`,
+    to be served while they are refreshed (see `lookup`).
+    Each entry can have an owner (e.g. a user id), so that every entry of an owner can be invalidated.
+
+    Parameters
+    ----------
+    ttl_setting: `string`
+        name of the setting that defines the TTL of the entries, in seconds
+    size: `int`
+        maximum number of entries
+    stale_setting: `string`
+        optional name of the setting that defines how long expired entries are kept, in seconds
+    """
+
+    def __init__(self, ttl_setting, size=1024, stale_setting=None):
+        self.ttl_setting = ttl_setting
+        self.size = size
+        self.stale_setting = stale_setting
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached payload and its ETag.
+
+        Parameters
+        ----------
+        key: `hashable`
+            The key of the entry
+
+        Returns
+        -------
+        `tuple`
+            The payload and its ETag, or None if it is not cached or its entry is older than the TTL
+        """
+        entry = self.lookup(key)
+        if entry is None or entry[2]:
+            return None
+        return entry[:2]
+
+    def lookup(self, key):
+        """Return a cached payload and its ETag, even if it is stale.
+
+        Parameters
+        ----------
+        key: `hashable`
+            The key of the entry
+
+        Returns
+        -------
+        `tuple`
+            The payload, its ETag and wether or not it is older than the TTL,
+            or None if it is not cached or it is older than the TTL and the stale time
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_at, _, payload, etag = entry
+            age = time.monotonic() - cached_at
+            ttl = getattr(settings, self.ttl_setting)
+            stale = getattr(settings, self.stale_setting) if self.stale_setting else 0
+            if age > ttl + stale:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload, etag, age > ttl
+
+    def add(self, key, payload, owner=None):
+        """Add a payload to the cache.
+
+        Parameters
+        ----------
+        key: `hashable`
+            The key of the entry
+        payload: `dict` or `list`
+            The payload, it must be JSON serializable
+        owner: `hashable`
+            Optional owner of the entry
+
+        Returns
+        -------
+        `string`
+            The ETag of the payload
+        """
+        etag = get_etag(payload)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), owner, payload, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate_owner(self, owner):
+        """Remove the entries of an owner.
+
+        Parameters
+        ----------
+        owner: `hashable`
+            The owner of the entries
+        """
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry[1] == owner]
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+def get_etag(payload):
+    """Return the ETag of a payload, a hash of its JSON.
+
+    Parameters
+    ----------
+    payload: `dict` or `list`
+        The payload
+
+    Returns
+    -------
+    `string`
+        The ETag, quoted
+    """
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return '"{}"'.format(hashlib.sha1(encoded).hexdigest())
+
+
+def etag_matches(if_none_match, etag):
+    """Define wether or not an If-None-Match header matches an ETag.
+
+    Parameters
+    ----------
+    if_none_match: `string`
+        The If-None-Match header, empty if the request has none
+    etag: `string`
+        The ETag
+
+    Returns
+    -------
+    `bool`
+        True if the header matches the ETag, False if not
+    """
+    # Weak comparison, as proxies can mark the ETags as weak ("W/" prefix)
+    tags = [tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")]
+    return etag in tags or if_none_match.strip() == "*"
+
+
+def etag_response(request, data, etag):
+    """Return a response with an ETag, or an empty 304 response if the request has the same ETag
+    in its If-None-Match header.
+
+    Parameters
+    ----------
+    request: `Request`
+        The Request object
+    data: `dict` or `list`
+        The data of the response
+    etag: `string`
+        The ETag of the data
+
+    Returns
+    -------
+    `Response`
+        The response
+    """
+    if etag_matches(request.META.get("HTTP_IF_NONE_MATCH", ""), etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(data, headers={"ETag": etag})
+
+
+validate_token_cache = ResponseCache("VALIDATE_TOKEN_CACHE_TTL")
+"""Cache of the payloads of `api.views.validate_token` without the time data,
+indexed by token key and flags, and owned by the user id (`ResponseCache`)"""
+
+user_permissions_cache = ResponseCache("USER_PERMISSIONS_CACHE_TTL")
+"""Cache of the permissions included in the token responses (see `api.serializers.TokenSerializer`),
+indexed and owned by the user id (`ResponseCache`)"""
+
+commander_metadata_cache = ResponseCache(
+    "COMMANDER_METADATA_CACHE_TTL",
+    size=64,
+    stale_setting="COMMANDER_METADATA_STALE_TTL",
+)
+"""Cache of the read-mostly LOVE-Commander responses, e.g. SalInfo metadata and docstrings,
+indexed by path and query string (see `api.commander_metadata.CommanderMetadata`) (`ResponseCache`)"""
@@ -0,0 +1,125 @@
+"""Define the rules for routing of HTTP requests to the consumers of the api application."""
+from django.urls import re_path
+from channels.auth import AuthMiddlewareStack
+from api.consumers import CommanderProxyConsumer, EFDTimeseriesProxyConsumer
+
+EXECUTE_COMMAND_PERMISSION = "api.command.execute_command"
+"""Permission required to send commands to the LOVE-Commander (`string`)"""
+
+http_urlpatterns = [
+    re_path(
+        r"^manager/api/cmd/$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                method="POST",
+                commander_path="/cmd",
+                permission=EXECUTE_COMMAND_PERMISSION,
+                denied_message="User does not have permissions to execute commands.",
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/lovecsc/observinglog$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                method="POST",
+                commander_path="/lovecsc/observinglog",
+                permission=EXECUTE_COMMAND_PERMISSION,
+                denied_message="User does not have permissions to send observing logs.",
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/salinfo/metadata$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/salinfo/metadata", cached=True
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/salinfo/topic-names$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/salinfo/topic-names",
+                query_params=("categories",),
+                cached=True,
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/salinfo/topic-data$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/salinfo/topic-data",
+                query_params=("categories",),
+                cached=True,
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/efd/timeseries$",
+        AuthMiddlewareStack(
+            EFDTimeseriesProxyConsumer.as_asgi(
+                method="POST", commander_path="/efd/timeseries"
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/efd/logmessages$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                method="POST", commander_path="/efd/logmessages"
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/efd/efd_clients$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/efd/efd_clients", cached=True
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/tcs/aux$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                method="POST",
+                commander_path="/tcs/aux",
+                permission=EXECUTE_COMMAND_PERMISSION,
+                denied_message="User does not have permissions to execute commands.",
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/tcs/aux/docstrings$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/tcs/aux/docstrings", cached=True
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/tcs/main$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                method="POST",
+                commander_path="/tcs/main",
+                permission=EXECUTE_COMMAND_PERMISSION,
+                denied_message="User does not have permissions to execute commands.",
+            )
+        ),
+    ),
+    re_path(
+        r"^manager/api/tcs/main/docstrings$",
+        AuthMiddlewareStack(
+            CommanderProxyConsumer.as_asgi(
+                commander_path="/tcs/main/docstrings", cached=True
+            )
+        ),
+    ),
+]
+"""List of url patterns of the endpoints served by consumers instead of `api.views`,
+with the same URLs and permissions as the corresponding views.
+The consumers get the user of the session of the request, to accept the requests authenticated with sessions."""
@@ -1,10 +1,13 @@
 """Defines the serializer used by the REST API exposed by this app ('api')."""
 import json
+import threading
+from collections import OrderedDict
 from drf_yasg.utils import swagger_serializer_method
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from manager import utils
 from api.models import ConfigFile, EmergencyContact, CSCAuthorizationRequest
+from api.response_cache import user_permissions_cache
 from typing import Union
 
 
@@ -96,6 +99,7 @@ class TokenSerializer(serializers.Serializer):
     @swagger_serializer_method(serializer_or_field=UserPermissionsSerializer)
     def get_permissions(self, token):
         """Return user permissions serialized as a dictionary with permission names as keys and bools as values.
+        They are cached per user in the `user_permissions_cache`.
 
         Params
         ------
@@ -107,7 +111,12 @@ class TokenSerializer(serializers.Serializer):
         Bool
             True if the user can execute commands, False if not.
         """
-        return UserPermissionsSerializer(token.user).data
+        cached = user_permissions_cache.get(token.user_id)
+        if cached is not None:
+            return cached[0]
+        permissions = dict(UserPermissionsSerializer(token.user).data)
+        user_permissions_cache.add(token.user_id, permissions, owner=token.user_id)
+        return permissions
 
     def get_token(self, token):
         """Return the token key.
@@ -212,13 +221,37 @@ class ConfigFileSerializer(serializers.ModelSerializer):
 
 
 class ConfigFileContentSerializer(serializers.ModelSerializer):
-    """Serializer to map the Model instance into JSON format."""
+    """Serializer to map the Model instance into JSON format.
+
+    The parsed contents of the files are cached by config file id and update timestamp,
+    so a file is read and parsed again only when its ConfigFile is updated.
+    """
 
     content = serializers.SerializerMethodField()
     filename = serializers.SerializerMethodField()
 
+    content_cache_size = 32
+    """Maximum number of parsed contents kept in the cache (`int`)"""
+
+    _content_cache = OrderedDict()
+    """Cache of parsed contents, indexed by (id, update_timestamp, file name) (`OrderedDict`)"""
+
+    _content_cache_lock = threading.Lock()
+    """Lock of the `_content_cache` (`threading.Lock`)"""
+
     def get_content(self, obj):
-        return json.loads(obj.config_file.read().decode("ascii"))
+        cls = ConfigFileContentSerializer
+        key = (obj.id, obj.update_timestamp, obj.config_file.name)
+        with cls._content_cache_lock:
+            if key in cls._content_cache:
+                cls._content_cache.move_to_end(key)
+                return cls._content_cache[key]
+        content = json.loads(obj.config_file.read().decode("ascii"))
+        with cls._content_cache_lock:
+            cls._content_cache[key] = content
+            while len(cls._content_cache) > cls.content_cache_size:
+                cls._content_cache.popitem(last=False)
+        return content
 
     def get_filename(self, obj):
         return str(obj.file_name)
@@ -1,8 +1,45 @@
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from api.models import Token
-import asyncio
+from django.contrib.auth.models import User, Group, Permission
+from django_auth_ldap.backend import ldap_error
+from api.authentication import TokenAuthCache
+from api.ldap_directory import LDAPServerHealth
+from api.logout_dispatcher import LogoutDispatcher
+from api.models import Token, ConfigFile
+from api.response_cache import validate_token_cache, user_permissions_cache
+
+
+def invalidate_user_caches(user_id):
+    """Remove the tokens of a user from the `TokenAuthCache`, and its entries from the
+    `validate_token_cache` and the `user_permissions_cache`.
+
+    Parameters
+    ----------
+    user_id: `int`
+        The id of the user
+    """
+    TokenAuthCache.invalidate_user(user_id)
+    validate_token_cache.invalidate_owner(user_id)
+    user_permissions_cache.invalidate_owner(user_id)
+
+
+def clear_user_caches():
+    """Clear the `TokenAuthCache`, the `validate_token_cache` and the `user_permissions_cache`."""
+    TokenAuthCache.clear()
+    validate_token_cache.clear()
+    user_permissions_cache.clear()
+
+
+def send_logout(keys):
+    """Send the logout message to the consumers subscribed to the groups of the given tokens,
+    without waiting for it, see `LogoutDispatcher`.
+
+    Parameters
+    ----------
+    keys: `list` of `string`
+        keys of the tokens whose consumers must logout
+    """
+    LogoutDispatcher.enqueue(keys)
 
 
 @receiver(post_delete, sender=Token)
@@ -18,16 +55,125 @@ def handle_token_deletion(sender, **kwargs):
         arguments dictionary sent with the signal. It contains the key 'instance' with the Token instance
         that was deleted
     """
-    deleted_token = str(kwargs["instance"])
-    groupname = "token-{}".format(deleted_token)
-    payload = {"type": "logout", "message": ""}
-    loop = None
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-
-    if loop and loop.is_running():
-        asyncio.create_task(get_channel_layer().group_send(groupname, payload))
+    send_logout([str(kwargs["instance"])])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, **kwargs):
+    """Receive signal when a Token is deleted and remove it from the `TokenAuthCache`.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, in this case 'Token'
+    kwargs: `dict`
+        arguments dictionary sent with the signal. It contains the key 'instance' with the Token instance
+        that was deleted
+    """
+    TokenAuthCache.invalidate_token(kwargs["instance"].key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user(sender, **kwargs):
+    """Receive signal when a User is saved and invalidate its cached tokens and responses,
+    e.g. when it is deactivated.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, in this case 'User'
+    kwargs: `dict`
+        arguments dictionary sent with the signal. It contains the key 'instance' with the User instance
+        that was saved
+    """
+    invalidate_user_caches(kwargs["instance"].pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, **kwargs):
+    """Receive signal when the groups or permissions of users change and invalidate their cached tokens
+    and responses.
+
+    Parameters
+    ----------
+    sender: `object`
+        the intermediate model of the relation
+    kwargs: `dict`
+        arguments dictionary sent with the signal. It contains the keys 'action', 'instance' with the
+        instance whose relation changed, which is a User unless the relation changed from the other side,
+        and 'pk_set' with the primary keys of the related objects
+    """
+    if not kwargs["action"].startswith("post_"):
+        return
+    instance = kwargs["instance"]
+    if isinstance(instance, User):
+        invalidate_user_caches(instance.pk)
     else:
-        loop.run_until_complete(get_channel_layer().group_send(groupname, payload))
+        clear_user_caches()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, **kwargs):
+    """Receive signal when the permissions of groups change and clear the cached tokens and responses.
+
+    Parameters
+    ----------
+    sender: `object`
+        the intermediate model of the relation
+    kwargs: `dict`
+        arguments dictionary sent with the signal. It contains the key 'action'
+    """
+    if kwargs["action"].startswith("post_"):
+        clear_user_caches()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_deleted_permissions(sender, **kwargs):
+    """Receive signal when a Group or a Permission is deleted and clear the cached tokens and responses,
+    as their relations are deleted without sending `m2m_changed` signals.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, 'Group' or 'Permission'
+    kwargs: `dict`
+        arguments dictionary sent with the signal
+    """
+    clear_user_caches()
+
+
+@receiver(post_save, sender=ConfigFile)
+@receiver(post_delete, sender=ConfigFile)
+@receiver(m2m_changed, sender=ConfigFile.selected_by_users.through)
+def invalidate_config_files(sender, **kwargs):
+    """Receive signal when a ConfigFile or its selection change and clear the `validate_token_cache`,
+    as its responses include the selected config.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the sender, 'ConfigFile' or the intermediate model of its selection
+    kwargs: `dict`
+        arguments dictionary sent with the signal
+    """
+    if kwargs.get("action", "post_").startswith("post_"):
+        validate_token_cache.clear()
+
+
+@receiver(ldap_error)
+def handle_ldap_error(sender, **kwargs):
+    """Receive signal when an LDAP backend gets an LDAPError, e.g. when its server is down,
+    and mark the server as unhealthy in the `LDAPServerHealth`.
+
+    Parameters
+    ----------
+    sender: `object`
+        class of the backend
+    kwargs: `dict`
+        arguments dictionary sent with the signal. It contains the keys 'context' and 'exception'
+    """
+    server_uri = getattr(sender, "server_uri", None)
+    if server_uri:
+        LDAPServerHealth.record_failure(server_uri)
@@ -0,0 +1,140 @@
+"""Defines a stand-in LOVE-Commander, a local HTTP server used by the tests and benchmarks."""
+import json
+import math
+import time
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def get_timeseries(body, period=1):
+    """Return synthetic EFD timeseries, as answered by the LOVE-Commander to the "/efd/timeseries" requests.
+
+    Every field has a point every `period` seconds, or at the start of every resample bin,
+    whose value is its timestamp in seconds since the epoch.
+
+    Parameters
+    ----------
+    body: `dict`
+        Body of the request
+    period: `float`
+        Time (in seconds) between the points of the fields that are not resampled
+
+    Returns
+    -------
+    `dict`
+        The timeseries, indexed by "<csc>-<index>-<topic>" and field
+    """
+    from api.efd_timeseries import EPOCH, parse_date, parse_resample
+
+    try:
+        period = parse_resample(body.get("resample")) or period
+    except ValueError:
+        pass
+    start = (parse_date(body["start_date"]) - EPOCH).total_seconds()
+    end = start + float(body["time_window"]) * 60
+    points = []
+    for i in range(math.floor(start / period), math.floor(end / period) + 1):
+        ts = EPOCH + datetime.timedelta(seconds=i * period)
+        if body.get("resample") or start <= i * period:
+            points.append(
+                {"ts": ts.strftime("%Y-%m-%d %H:%M:%S.%f"), "value": i * period}
+            )
+    return {
+        f"{csc}-{index}-{topic}": {field: points for field in fields}
+        for csc, indexes in body["cscs"].items()
+        for index, topics in indexes.items()
+        for topic, fields in topics.items()
+    }
+
+
+class StandInCommanderHandler(BaseHTTPRequestHandler):
+    """Handler of the requests to a `StandInCommander`, which answers with the method, path and body
+    of the request, or synthetic timeseries to the "/efd/timeseries" requests,
+    keeping the connections alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.commander.connections += 1
+
+    def respond(self, body=None):
+        """Answer a request after the latency of the commander, or drop the connection if it is failing.
+
+        Parameters
+        ----------
+        body: `dict`
+            Body of the request, if any
+        """
+        commander = self.server.commander
+        commander.requests += 1
+        commander.bodies.append(body)
+        if commander.failures > 0:
+            commander.failures -= 1
+            self.close_connection = True
+            return
+        time.sleep(commander.latency)
+        if self.path == "/efd/timeseries" and body:
+            data = get_timeseries(body, commander.period)
+        else:
+            data = {"method": self.command, "path": self.path, "body": body}
+        content = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.respond(json.loads(self.rfile.read(length) or "null"))
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInCommanderServer(ThreadingHTTPServer):
+    """HTTP server of a `StandInCommander`, accepting many concurrent connections."""
+
+    request_queue_size = 128
+
+    daemon_threads = True
+
+
+class StandInCommander:
+    """LOVE-Commander listening in a local port, in a background thread.
+
+    Parameters
+    ----------
+    latency: `float`
+        Time (in seconds) to answer every request
+    period: `float`
+        Time (in seconds) between the points of the synthetic timeseries
+    """
+
+    def __init__(self, latency=0, period=1):
+        self.latency = latency
+        self.period = period
+        self.bodies = []
+        self.failures = 0
+        self.connections = 0
+        self.requests = 0
+        self.server = StandInCommanderServer(("127.0.0.1", 0), StandInCommanderHandler)
+        self.server.commander = self
+        self.port = str(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        """Start listening."""
+        self.thread.start()
+
+    def stop(self):
+        """Stop listening."""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,86 @@
+"""Defines a stand-in LDAP server, used instead of `ldap.initialize` by the tests and benchmarks."""
+import time
+import ldap
+
+
+class StandInLDAPConnection:
+    """Connection to a `StandInLDAPServer`, with the `LDAPObject` methods used by the manager.
+
+    Parameters
+    ----------
+    server: `StandInLDAPServer`
+        The server
+    uri: `string`
+        The URI used to connect
+    """
+
+    def __init__(self, server, uri):
+        self.server = server
+        self.uri = uri
+        self.connected = False
+
+    def _request(self):
+        """Simulate the latency of a request, connecting first if needed."""
+        if self.server.down:
+            raise ldap.LDAPError("Can't contact LDAP server")
+        if not self.connected:
+            time.sleep(self.server.connect_latency)
+            self.connected = True
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+
+    def search_s(self, base, scope, *args, **kwargs):
+        self._request()
+        members = [member.encode() for member in self.server.members]
+        return [(base, {"memberUid": members})]
+
+    def simple_bind_s(self, *args, **kwargs):
+        self._request()
+
+    def whoami_s(self):
+        self._request()
+        return ""
+
+    def set_option(self, *args):
+        pass
+
+    def unbind_s(self):
+        self.connected = False
+
+
+class StandInLDAPServer:
+    """In-memory LDAP server with the members of the love_ops group and configurable latencies.
+
+    Parameters
+    ----------
+    members: `list` of `string`
+        Usernames of the members of the group
+    connect_latency: `float`
+        Time (in seconds) to establish a connection
+    latency: `float`
+        Time (in seconds) of every request
+    """
+
+    def __init__(self, members=(), connect_latency=0, latency=0):
+        self.members = list(members)
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.down = False
+        self.connections = 0
+        self.requests = 0
+
+    def initialize(self, uri, *args, **kwargs):
+        """Return a new connection, to be used instead of `ldap.initialize`.
+
+        Parameters
+        ----------
+        uri: `string`
+            The URI used to connect
+
+        Returns
+        -------
+        `StandInLDAPConnection`
+            The connection
+        """
+        self.connections += 1
+        return StandInLDAPConnection(self, uri)
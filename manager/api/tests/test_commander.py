@@ -10,8 +10,17 @@ from unittest.mock import patch, call
 # python manage.py test api.tests.test_commander.EFDTestCase
 # python manage.py test api.tests.test_commander.TCSTestCase
 
+COMMANDER_SETTINGS = {
+    "DEBUG": True,
+    "COMMANDER_HOSTNAME": "fakehost",
+    "COMMANDER_PORT": "fakeport",
+    "COMMANDER_CONNECT_TIMEOUT": 3,
+    "COMMANDER_READ_TIMEOUT": 60,
+}
+TIMEOUT = (3, 60)
 
-@override_settings(DEBUG=True)
+
+@override_settings(**COMMANDER_SETTINGS)
 class CommanderTestCase(TestCase):
     maxDiff = None
 
@@ -35,14 +44,8 @@ class CommanderTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_authorized_commander_data(self, mock_requests, mock_environ):
+    @patch("requests.Session.post")
+    def test_authorized_commander_data(self, mock_requests):
         """Test authorized user commander data is sent to love-commander"""
         # Arrange:
         self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
@@ -59,16 +62,12 @@ class CommanderTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = f"http://fakehost:fakeport/cmd"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_unauthorized_commander(self, mock_requests, mock_environ):
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=TIMEOUT)
+        )
+
+    @patch("requests.Session.post")
+    def test_unauthorized_commander(self, mock_requests):
         """Test an unauthorized user can't send commands"""
         # Act:
         url = reverse("commander")
@@ -88,7 +87,7 @@ class CommanderTestCase(TestCase):
         )
 
 
-@override_settings(DEBUG=True)
+@override_settings(**COMMANDER_SETTINGS)
 class SalinfoTestCase(TestCase):
     maxDiff = None
 
@@ -112,14 +111,8 @@ class SalinfoTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_salinfo_metadata(self, mock_requests, mock_environ):
+    @patch("requests.Session.get")
+    def test_salinfo_metadata(self, mock_requests):
         """Test authorized user can get salinfo metadata"""
         # Act:
         url = reverse("salinfo-metadata")
@@ -127,16 +120,10 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = f"http://fakehost:fakeport/salinfo/metadata"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_salinfo_topic_names(self, mock_requests, mock_environ):
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
+
+    @patch("requests.Session.get")
+    def test_salinfo_topic_names(self, mock_requests):
         """Test authorized user can get salinfo topic_names"""
         # Act:
         url = reverse("salinfo-topic-names")
@@ -144,16 +131,10 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = f"http://fakehost:fakeport/salinfo/topic-names"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_salinfo_topic_names_with_param(self, mock_requests, mock_environ):
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
+
+    @patch("requests.Session.get")
+    def test_salinfo_topic_names_with_param(self, mock_requests):
         """Test authorized user can get salinfo topic_names with query param"""
         # Act:
         url = reverse("salinfo-topic-names") + "?categories=telemetry"
@@ -163,16 +144,10 @@ class SalinfoTestCase(TestCase):
         expected_url = (
             f"http://fakehost:fakeport/salinfo/topic-names?categories=telemetry"
         )
-        self.assertEqual(mock_requests.call_args, call(expected_url))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_salinfo_topic_data(self, mock_requests, mock_environ):
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
+
+    @patch("requests.Session.get")
+    def test_salinfo_topic_data(self, mock_requests):
         """Test authorized user can get salinfo topic_data"""
         # Act:
         url = reverse("salinfo-topic-data")
@@ -180,16 +155,10 @@ class SalinfoTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = f"http://fakehost:fakeport/salinfo/topic-data"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_salinfo_topic_data_with_param(self, mock_requests, mock_environ):
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
+
+    @patch("requests.Session.get")
+    def test_salinfo_topic_data_with_param(self, mock_requests):
         """Test authorized user can get salinfo topic_data with query param"""
         # Act:
         url = reverse("salinfo-topic-data") + "?categories=telemetry"
@@ -199,10 +168,10 @@ class SalinfoTestCase(TestCase):
         expected_url = (
             f"http://fakehost:fakeport/salinfo/topic-data?categories=telemetry"
         )
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
 
 
-@override_settings(DEBUG=True)
+@override_settings(**COMMANDER_SETTINGS)
 class EFDTestCase(TestCase):
     maxDiff = None
 
@@ -226,19 +195,17 @@ class EFDTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_timeseries_query(self, mock_requests, mock_environ):
+    @patch("requests.Session.post")
+    def test_timeseries_query(self, mock_requests):
         """Test authorized user can query and get a timeseries"""
         # Act:
         cscs = {
-            "ATDome": {"0": {"topic1": ["field1"]},},
-            "ATMCS": {"1": {"topic2": ["field2", "field3"]},},
+            "ATDome": {
+                "0": {"topic1": ["field1"]},
+            },
+            "ATMCS": {
+                "1": {"topic2": ["field2", "field3"]},
+            },
         }
         data = {
             "start_date": "2020-03-16T12:00:00",
@@ -251,10 +218,12 @@ class EFDTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = f"http://fakehost:fakeport/efd/timeseries"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=TIMEOUT)
+        )
 
 
-@override_settings(DEBUG=True)
+@override_settings(**COMMANDER_SETTINGS)
 class TCSTestCase(TestCase):
     maxDiff = None
 
@@ -278,36 +247,30 @@ class TCSTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_command_query_atcs(self, mock_requests, mock_environ):
+    @patch("requests.Session.post")
+    def test_command_query_atcs(self, mock_requests):
         """Test authorized user can send a ATCS command"""
         self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
         # Act:
         data = {
             "command_name": "atcs_command",
-            "params": {"param1": "value1", "param2": 2, "param3": True,},  # noqa: E231
+            "params": {
+                "param1": "value1",
+                "param2": 2,
+                "param3": True,
+            },  # noqa: E231
         }
         url = reverse("TCS-aux")
 
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = f"http://fakehost:fakeport/tcs/aux"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_command_query_atcs_unauthorized(self, mock_requests, mock_environ):
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=TIMEOUT)
+        )
+
+    @patch("requests.Session.post")
+    def test_command_query_atcs_unauthorized(self, mock_requests):
         """Test unauthorized user cannot send a ATCS command"""
         self.user.user_permissions.remove(
             Permission.objects.get(name="Execute Commands")
@@ -315,7 +278,11 @@ class TCSTestCase(TestCase):
         # Act:
         data = {
             "command_name": "atcs_command",
-            "params": {"param1": "value1", "param2": 2, "param3": True,},  # noqa: E231
+            "params": {
+                "param1": "value1",
+                "param2": 2,
+                "param3": True,
+            },  # noqa: E231
         }
         url = reverse("TCS-aux")
         response = self.client.post(url, data, format="json")
@@ -325,14 +292,8 @@ class TCSTestCase(TestCase):
             result, {"ack": "User does not have permissions to execute commands."}
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_docstrings_query_atcs(self, mock_requests, mock_environ):
+    @patch("requests.Session.get")
+    def test_docstrings_query_atcs(self, mock_requests):
         """Test authorized user can send a ATCS command"""
         # Act:
         url = reverse("TCS-aux-docstrings")
@@ -340,38 +301,32 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = f"http://fakehost:fakeport/tcs/aux/docstrings"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_command_query_mtcs(self, mock_requests, mock_environ):
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
+
+    @patch("requests.Session.post")
+    def test_command_query_mtcs(self, mock_requests):
         """Test authorized user can send a MTCS command"""
         self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
         # Act:
         data = {
             "command_name": "mtcs_command",
-            "params": {"param1": "value1", "param2": 2, "param3": True,},  # noqa: E231
+            "params": {
+                "param1": "value1",
+                "param2": 2,
+                "param3": True,
+            },  # noqa: E231
         }
         url = reverse("TCS-main")
 
         with self.assertRaises(ValueError):
             self.client.post(url, data, format="json")
         expected_url = f"http://fakehost:fakeport/tcs/main"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
-
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_command_query_mtcs_unauthorized(self, mock_requests, mock_environ):
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=TIMEOUT)
+        )
+
+    @patch("requests.Session.post")
+    def test_command_query_mtcs_unauthorized(self, mock_requests):
         """Test unauthorized user cannot send a MTCS command"""
         self.user.user_permissions.remove(
             Permission.objects.get(name="Execute Commands")
@@ -379,7 +334,11 @@ class TCSTestCase(TestCase):
         # Act:
         data = {
             "command_name": "mtcs_command",
-            "params": {"param1": "value1", "param2": 2, "param3": True,},  # noqa: E231
+            "params": {
+                "param1": "value1",
+                "param2": 2,
+                "param3": True,
+            },  # noqa: E231
         }
         url = reverse("TCS-main")
         response = self.client.post(url, data, format="json")
@@ -389,14 +348,8 @@ class TCSTestCase(TestCase):
             result, {"ack": "User does not have permissions to execute commands."}
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.get")
-    def test_docstrings_query_mtcs(self, mock_requests, mock_environ):
+    @patch("requests.Session.get")
+    def test_docstrings_query_mtcs(self, mock_requests):
         """Test authorized user can send a MTCS command"""
         # Act:
         url = reverse("TCS-main-docstrings")
@@ -404,4 +357,4 @@ class TCSTestCase(TestCase):
         with self.assertRaises(ValueError):
             self.client.get(url)
         expected_url = f"http://fakehost:fakeport/tcs/main/docstrings"
-        self.assertEqual(mock_requests.call_args, call(expected_url))
+        self.assertEqual(mock_requests.call_args, call(expected_url, timeout=TIMEOUT))
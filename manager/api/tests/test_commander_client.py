@@ -0,0 +1,74 @@
+import time
+import requests
+from django.test import TestCase, override_settings
+from api.commander_client import CommanderClient
+from api.tests.commander_server import StandInCommander
+
+
+class CommanderClientTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        CommanderClient.reset()
+        self.commander = StandInCommander()
+        self.commander.start()
+        settings_override = override_settings(
+            COMMANDER_HOSTNAME="127.0.0.1",
+            COMMANDER_PORT=self.commander.port,
+            COMMANDER_RETRIES=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tearDown(self):
+        CommanderClient.reset()
+        self.commander.stop()
+
+    def test_connections_are_reused(self):
+        """Test that consecutive requests reuse the same keep-alive connection."""
+        # Act
+        responses = [
+            CommanderClient.get("/salinfo/metadata"),
+            CommanderClient.post("/cmd", {"cmd": "cmd_start"}),
+            CommanderClient.get("/tcs/aux/docstrings"),
+        ]
+
+        # Assert
+        self.assertEqual(
+            [response.json() for response in responses],
+            [
+                {"method": "GET", "path": "/salinfo/metadata", "body": None},
+                {"method": "POST", "path": "/cmd", "body": {"cmd": "cmd_start"}},
+                {"method": "GET", "path": "/tcs/aux/docstrings", "body": None},
+            ],
+        )
+        self.assertEqual(self.commander.connections, 1)
+
+    def test_get_requests_are_retried(self):
+        """Test that GET requests are retried when the connection is dropped, and POST requests are not."""
+        # Arrange
+        self.commander.failures = 2
+
+        # Act
+        response = CommanderClient.get("/efd/efd_clients")
+        self.commander.failures = 1
+        with self.assertRaises(requests.ConnectionError):
+            CommanderClient.post("/cmd", {"cmd": "cmd_start"})
+
+        # Assert
+        self.assertEqual(response.json()["path"], "/efd/efd_clients")
+        self.assertEqual(self.commander.requests, 4)
+
+    @override_settings(COMMANDER_READ_TIMEOUT=0.1, COMMANDER_RETRIES=0)
+    def test_timeout(self):
+        """Test that requests fail when the commander takes longer than the read timeout."""
+        # Arrange
+        self.commander.latency = 0.5
+
+        # Act
+        start = time.monotonic()
+        with self.assertRaises(requests.RequestException):
+            CommanderClient.get("/efd/efd_clients")
+
+        # Assert
+        self.assertLess(time.monotonic() - start, 0.4)
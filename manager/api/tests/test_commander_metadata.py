@@ -0,0 +1,118 @@
+import time
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from api.commander_client import CommanderClient
+from api.commander_metadata import CommanderMetadata
+from api.models import Token
+from api.response_cache import commander_metadata_cache
+from api.tests.commander_server import StandInCommander
+
+
+@override_settings(DEBUG=True)
+class CommanderMetadataTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        CommanderClient.reset()
+        CommanderMetadata.invalidate()
+        self.commander = StandInCommander()
+        self.commander.start()
+        settings_override = override_settings(
+            COMMANDER_HOSTNAME="127.0.0.1", COMMANDER_PORT=self.commander.port
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def tearDown(self):
+        CommanderClient.reset()
+        CommanderMetadata.invalidate()
+        self.commander.stop()
+
+    def test_metadata_is_cached(self):
+        """Test that metadata is requested once per query, and sent with its ETag."""
+        # Arrange
+        url = reverse("salinfo-topic-names")
+        first_response = self.client.get(url + "?categories=telemetry")
+
+        # Act
+        response = self.client.get(url + "?categories=telemetry")
+        not_modified_response = self.client.get(
+            url + "?categories=telemetry", HTTP_IF_NONE_MATCH=first_response["ETag"]
+        )
+        other_response = self.client.get(url + "?categories=event")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, first_response.data)
+        self.assertEqual(
+            response.data["path"], "/salinfo/topic-names?categories=telemetry"
+        )
+        self.assertEqual(not_modified_response.status_code, 304)
+        self.assertEqual(
+            other_response.data["path"], "/salinfo/topic-names?categories=event"
+        )
+        self.assertEqual(self.commander.requests, 2)
+
+    @override_settings(COMMANDER_METADATA_CACHE_TTL=0)
+    def test_stale_while_revalidate(self):
+        """Test that expired metadata is sent while it is refreshed in the background."""
+        # Arrange
+        url = reverse("TCS-main-docstrings")
+        self.client.get(url)
+        self.commander.latency = 0.5
+
+        # Act
+        start = time.monotonic()
+        response = self.client.get(url)
+        elapsed = time.monotonic() - start
+        while CommanderMetadata.refreshing:
+            time.sleep(0.01)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(self.commander.requests, 2)
+
+    def test_invalidation(self):
+        """Test that staff users can invalidate the cached metadata."""
+        # Arrange
+        url = reverse("EFD-clients")
+        invalidate_url = reverse("commander-metadata-invalidate")
+        self.client.get(url)
+
+        # Act
+        forbidden_response = self.client.post(invalidate_url)
+        self.client.get(url)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(invalidate_url)
+        self.client.get(url)
+
+        # Assert
+        self.assertEqual(forbidden_response.status_code, 403)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("in this process", response.data["ack"])
+        self.assertEqual(self.commander.requests, 2)
+
+    def test_invalidation_during_request(self):
+        """Test that responses requested before an invalidation are not cached."""
+        # Arrange
+        path = "/efd/efd_clients"
+        generation = CommanderMetadata.generation
+        response = CommanderClient.get(path)
+
+        # Act
+        CommanderMetadata.invalidate()
+        status_code, data, etag = CommanderMetadata.store(path, response, generation)
+
+        # Assert
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data["path"], path)
+        self.assertIsNone(etag)
+        self.assertIsNone(commander_metadata_cache.lookup(path))
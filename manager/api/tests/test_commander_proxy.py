@@ -0,0 +1,289 @@
+"""Tests for the asynchronous proxy of the REST requests to the LOVE-Commander."""
+import json
+import time
+import pytest
+import asyncio
+from django.conf import settings
+from django.contrib.auth.models import User, Permission
+from django.test import Client
+from channels.db import database_sync_to_async
+from channels.testing import HttpCommunicator
+from manager.routing import application
+from api.commander_client import AsyncCommanderClient
+from api.commander_metadata import CommanderMetadata
+from api.efd_timeseries import EFDTimeseries
+from api.models import Token
+from api.tests.commander_server import StandInCommander, get_timeseries
+
+
+class TestCommanderProxy:
+    """Test that the proxied requests reach the LOVE-Commander, with the permissions of the views."""
+
+    def setup_method(self):
+        AsyncCommanderClient.reset()
+        CommanderMetadata.invalidate()
+        EFDTimeseries.reset()
+        self.commander = StandInCommander()
+        self.commander.start()
+        self.user = User.objects.create_user(
+            "username", password="123", email="user@user.cl"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.headers = [(b"authorization", f"Token {self.token}".encode())]
+
+    def teardown_method(self):
+        AsyncCommanderClient.reset()
+        CommanderMetadata.invalidate()
+        EFDTimeseries.reset()
+        self.commander.stop()
+
+    @pytest.fixture(autouse=True)
+    def commander_settings(self, settings):
+        settings.COMMANDER_HOSTNAME = "127.0.0.1"
+        settings.COMMANDER_PORT = self.commander.port
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_command(self):
+        """Test that users with permissions can send commands."""
+        # Arrange
+        permission = await database_sync_to_async(Permission.objects.get)(
+            name="Execute Commands"
+        )
+        await database_sync_to_async(self.user.user_permissions.add)(permission)
+        data = {"csc": "Test", "salindex": 1, "cmd": "cmd_setScalars", "params": {}}
+        communicator = HttpCommunicator(
+            application,
+            "POST",
+            "/manager/api/cmd/",
+            body=json.dumps(data).encode(),
+            headers=self.headers,
+        )
+        # Act
+        response = await communicator.get_response()
+        # Assert
+        assert response["status"] == 200
+        assert json.loads(response["body"]) == {
+            "method": "POST",
+            "path": "/cmd",
+            "body": data,
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_unauthorized_command(self):
+        """Test that users without permissions cannot send commands."""
+        # Arrange
+        communicator = HttpCommunicator(
+            application,
+            "POST",
+            "/manager/api/tcs/aux",
+            body=b"{}",
+            headers=self.headers,
+        )
+        # Act
+        response = await communicator.get_response()
+        # Assert
+        assert response["status"] == 401
+        assert json.loads(response["body"]) == {
+            "ack": "User does not have permissions to execute commands."
+        }
+        assert self.commander.requests == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_unauthenticated(self):
+        """Test that requests without a valid token are rejected."""
+        # Arrange
+        communicators = [
+            HttpCommunicator(application, "GET", "/manager/api/salinfo/metadata"),
+            HttpCommunicator(
+                application,
+                "GET",
+                "/manager/api/salinfo/metadata",
+                headers=[(b"authorization", b"Token invalid")],
+            ),
+        ]
+        # Act
+        responses = [await c.get_response() for c in communicators]
+        # Assert
+        assert [response["status"] for response in responses] == [401, 401]
+        assert self.commander.requests == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_session_authentication(self):
+        """Test that requests authenticated with a session are accepted, checking their CSRF token
+        and permissions as the views do."""
+        # Arrange
+        client = Client()
+        await database_sync_to_async(client.force_login)(self.user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        csrf_token = "a" * 64
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session}; {settings.CSRF_COOKIE_NAME}={csrf_token}"
+        headers = [(b"cookie", cookie.encode())]
+        csrf_headers = headers + [(b"x-csrftoken", csrf_token.encode())]
+        permission = await database_sync_to_async(Permission.objects.get)(
+            name="Execute Commands"
+        )
+        await database_sync_to_async(self.user.user_permissions.add)(permission)
+        communicators = [
+            HttpCommunicator(
+                application, "GET", "/manager/api/salinfo/metadata", headers=headers
+            ),
+            HttpCommunicator(
+                application, "POST", "/manager/api/cmd/", body=b"{}", headers=headers
+            ),
+            HttpCommunicator(
+                application,
+                "POST",
+                "/manager/api/cmd/",
+                body=b"{}",
+                headers=csrf_headers,
+            ),
+        ]
+        # Act
+        responses = [await c.get_response() for c in communicators]
+        # Assert
+        assert [response["status"] for response in responses] == [200, 403, 200]
+        assert json.loads(responses[1]["body"])["detail"].startswith("CSRF Failed")
+        assert self.commander.requests == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_post_is_not_sent_again(self):
+        """Test that POST requests are not sent again when a pooled connection is closed after sending them."""
+        # Arrange
+        await AsyncCommanderClient.get("/salinfo/metadata")
+        self.commander.failures = 1
+
+        # Act & Assert
+        with pytest.raises(ConnectionResetError):
+            await AsyncCommanderClient.post("/cmd", {"cmd": "cmd_start"})
+        assert self.commander.requests == 2
+        assert self.commander.connections == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_query_params(self):
+        """Test that the query parameters of the views are forwarded."""
+        # Arrange
+        communicator = HttpCommunicator(
+            application,
+            "GET",
+            "/manager/api/salinfo/topic-names?categories=telemetry&other=1",
+            headers=self.headers,
+        )
+        # Act
+        response = await communicator.get_response()
+        # Assert
+        assert response["status"] == 200
+        assert (
+            json.loads(response["body"])["path"]
+            == "/salinfo/topic-names?categories=telemetry"
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_concurrent_requests(self):
+        """Test that slow requests are proxied concurrently, reusing the connections."""
+        # Arrange
+        self.commander.latency = 0.2
+        communicators = [
+            HttpCommunicator(
+                application,
+                "POST",
+                "/manager/api/efd/timeseries",
+                body=b"{}",
+                headers=self.headers,
+            )
+            for i in range(100)
+        ]
+        await communicators[0].get_response()
+        # Act
+        start = time.monotonic()
+        responses = await asyncio.gather(
+            *[
+                communicator.get_response(timeout=5)
+                for communicator in communicators[1:]
+            ]
+        )
+        elapsed = time.monotonic() - start
+        # Assert
+        assert all(response["status"] == 200 for response in responses)
+        assert elapsed < 2
+        assert self.commander.connections < len(communicators)
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_commander_down(self):
+        """Test that requests fail with a 502 status when the LOVE-Commander cannot be reached."""
+        # Arrange
+        self.commander.stop()
+        communicator = HttpCommunicator(
+            application, "GET", "/manager/api/efd/efd_clients", headers=self.headers
+        )
+        # Act
+        response = await communicator.get_response(timeout=5)
+        # Assert
+        assert response["status"] == 502
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_metadata_is_cached(self):
+        """Test that metadata is requested once, and sent with its ETag."""
+        # Arrange
+        first_response = await HttpCommunicator(
+            application, "GET", "/manager/api/tcs/aux/docstrings", headers=self.headers
+        ).get_response()
+        etag = dict(first_response["headers"])[b"ETag"]
+        # Act
+        response = await HttpCommunicator(
+            application, "GET", "/manager/api/tcs/aux/docstrings", headers=self.headers
+        ).get_response()
+        not_modified_response = await HttpCommunicator(
+            application,
+            "GET",
+            "/manager/api/tcs/aux/docstrings",
+            headers=self.headers + [(b"if-none-match", etag)],
+        ).get_response()
+        # Assert
+        assert response["status"] == 200
+        assert response["body"] == first_response["body"]
+        assert not_modified_response["status"] == 304
+        assert not_modified_response["body"] == b""
+        assert self.commander.requests == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_timeseries_are_cached(self):
+        """Test that sliding timeseries queries only request the new time range."""
+        # Arrange
+        data = {
+            "start_date": "2020-03-16T12:00:00",
+            "time_window": 10,
+            "cscs": {"ATDome": {"0": {"position": ["azimuth", "elevation"]}}},
+            "efd_instance": "summit_efd",
+        }
+        await HttpCommunicator(
+            application,
+            "POST",
+            "/manager/api/efd/timeseries",
+            body=json.dumps(data).encode(),
+            headers=self.headers,
+        ).get_response()
+        data["start_date"] = "2020-03-16T12:01:00"
+        # Act
+        response = await HttpCommunicator(
+            application,
+            "POST",
+            "/manager/api/efd/timeseries",
+            body=json.dumps(data).encode(),
+            headers=self.headers,
+        ).get_response()
+        # Assert
+        assert response["status"] == 200
+        assert json.loads(response["body"]) == get_timeseries(data)
+        assert self.commander.requests == 2
+        assert self.commander.bodies[-1]["start_date"] == "2020-03-16T12:10:00"
+        assert self.commander.bodies[-1]["time_window"] == 1
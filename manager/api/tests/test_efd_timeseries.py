@@ -0,0 +1,178 @@
+import datetime
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from api.commander_client import CommanderClient
+from api.efd_timeseries import EFDTimeseries
+from api.models import Token
+from api.tests.commander_server import StandInCommander, get_timeseries
+
+
+@override_settings(DEBUG=True)
+class EFDTimeseriesTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        CommanderClient.reset()
+        EFDTimeseries.reset()
+        self.commander = StandInCommander()
+        self.commander.start()
+        settings_override = override_settings(
+            COMMANDER_HOSTNAME="127.0.0.1", COMMANDER_PORT=self.commander.port
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("EFD-timeseries")
+        self.data = {
+            "start_date": "2020-03-16T12:00:00",
+            "time_window": 10,
+            "cscs": {
+                "ATDome": {"0": {"position": ["azimuth", "elevation"]}},
+                "ATMCS": {"1": {"mount_AzEl_Encoders": ["azimuthCalculatedAngle"]}},
+            },
+            "efd_instance": "summit_efd",
+        }
+
+    def tearDown(self):
+        CommanderClient.reset()
+        EFDTimeseries.reset()
+        self.commander.stop()
+
+    def test_sliding_window(self):
+        """Test that a sliding query only requests the new time range, and is stitched from the cached points."""
+        # Arrange
+        self.client.post(self.url, self.data, format="json")
+        self.data["start_date"] = "2020-03-16T12:01:00"
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.requests, 2)
+        self.assertEqual(self.commander.bodies[-1]["start_date"], "2020-03-16T12:10:00")
+        self.assertEqual(self.commander.bodies[-1]["time_window"], 1)
+        self.assertEqual(self.commander.bodies[-1]["cscs"], self.data["cscs"])
+
+    def test_sub_minute_slide(self):
+        """Test that time ranges shorter than a minute are requested as a whole minute."""
+        # Arrange
+        self.client.post(self.url, self.data, format="json")
+        self.data["start_date"] = "2020-03-16T12:00:30"
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.requests, 2)
+        self.assertEqual(self.commander.bodies[-1]["start_date"], "2020-03-16T12:10:00")
+        self.assertEqual(self.commander.bodies[-1]["time_window"], 1)
+
+    def test_covered_query(self):
+        """Test that queries within the cached time ranges are not sent to the LOVE-Commander."""
+        # Arrange
+        self.client.post(self.url, self.data, format="json")
+        self.data["start_date"] = "2020-03-16T12:02:30"
+        self.data["time_window"] = 5
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.requests, 1)
+
+    def test_new_fields(self):
+        """Test that only the fields that are not cached are requested."""
+        # Arrange
+        self.client.post(self.url, self.data, format="json")
+        self.data["cscs"]["ATDome"]["0"]["position"].append(
+            "dropoutDoorOpeningPercentage"
+        )
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.requests, 2)
+        self.assertEqual(
+            self.commander.bodies[-1]["cscs"],
+            {"ATDome": {"0": {"position": ["dropoutDoorOpeningPercentage"]}}},
+        )
+
+    def test_resample(self):
+        """Test that resampled queries are requested and cached by whole bins."""
+        # Arrange
+        self.data["resample"] = "1min"
+        self.data["start_date"] = "2020-03-16T12:00:30"
+        self.client.post(self.url, self.data, format="json")
+        self.data["start_date"] = "2020-03-16T12:03:15"
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.bodies[0]["start_date"], "2020-03-16T12:00:00")
+        self.assertEqual(self.commander.bodies[-1]["start_date"], "2020-03-16T12:11:00")
+        self.assertEqual(self.commander.bodies[-1]["time_window"], 3)
+
+    @override_settings(EFD_TIMESERIES_SETTLE_TIME=60)
+    def test_recent_points_are_not_cached(self):
+        """Test that the points that can still be written to the EFD are requested again."""
+        # Arrange
+        start = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+        self.data["start_date"] = start.isoformat()
+        self.client.post(self.url, self.data, format="json")
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(self.commander.requests, 2)
+        settled = datetime.datetime.fromisoformat(
+            self.commander.bodies[-1]["start_date"]
+        )
+        self.assertGreater(settled, start + datetime.timedelta(minutes=3))
+
+    @override_settings(EFD_TIMESERIES_CACHE_SIZE=0.5)
+    def test_least_recently_used_are_discarded(self):
+        """Test that the least recently used series are discarded beyond the cache size."""
+        # Arrange
+        other_data = {**self.data, "efd_instance": "base_efd"}
+        self.client.post(self.url, self.data, format="json")
+        self.client.post(self.url, other_data, format="json")
+
+        # Act
+        response = self.client.post(self.url, self.data, format="json")
+        other_response = self.client.post(self.url, other_data, format="json")
+
+        # Assert
+        self.assertEqual(response.data, get_timeseries(self.data))
+        self.assertEqual(other_response.data, get_timeseries(other_data))
+        self.assertEqual(self.commander.requests, 4)
+        self.assertLessEqual(EFDTimeseries.size, 0.5 * 1024 * 1024)
+        self.assertGreater(EFDTimeseries.size, 0)
+
+    def test_unsupported_resample(self):
+        """Test that queries with resample offsets that cannot be cached are forwarded as they are."""
+        # Arrange
+        self.data["resample"] = "1W-MON"
+
+        # Act
+        self.client.post(self.url, self.data, format="json")
+        self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(self.commander.requests, 2)
+        self.assertEqual(self.commander.bodies, [self.data, self.data])
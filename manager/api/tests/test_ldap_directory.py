@@ -0,0 +1,269 @@
+import time
+import ldap
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import Group, User
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django_auth_ldap.backend import ldap_error
+from api.ldap_directory import LDAPConnectionPool, LDAPServerHealth, LoveOpsMembers
+from api.views import IPAFailoverBackend, IPABackend1, IPABackend2, IPABackend3
+from api.tests.ldap_server import StandInLDAPServer
+from unittest.mock import patch
+
+LDAP_URI = "ldap://ipa1.test/"
+
+
+@override_settings(DEBUG=True)
+class LoveOpsMembersTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        LDAPConnectionPool.reset()
+        LoveOpsMembers.reset()
+        self.server = StandInLDAPServer(members=["ops1", "ops2"])
+        patcher = patch("ldap.initialize", self.server.initialize)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        LDAPConnectionPool.reset()
+        LoveOpsMembers.reset()
+        LDAPServerHealth.reset()
+
+    def test_membership_is_cached(self):
+        """Test that the members are searched once, and checked in memory afterwards."""
+        # Act
+        results = [
+            LoveOpsMembers.is_member(LDAP_URI, username)
+            for username in ["ops1", "ops2", "other", "ops1"]
+        ]
+
+        # Assert
+        self.assertEqual(results, [True, True, False, True])
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_connections_are_pooled(self):
+        """Test that connections are reused, and discarded when an operation fails."""
+        # Act
+        LoveOpsMembers.search(LDAP_URI)
+        LoveOpsMembers.search(LDAP_URI)
+        self.server.down = True
+        with self.assertRaises(Exception):
+            LoveOpsMembers.search(LDAP_URI)
+        self.server.down = False
+        LoveOpsMembers.search(LDAP_URI)
+
+        # Assert
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.server.requests, 3)
+
+    @override_settings(LDAP_LOVE_OPS_CACHE_TTL=0)
+    def test_background_refresh(self):
+        """Test that expired members are refreshed in the background, keeping the cached ones meanwhile,
+        and that the cached ones are kept if the refresh fails."""
+        # Arrange
+        self.assertFalse(LoveOpsMembers.is_member(LDAP_URI, "ops3"))
+        self.server.members.append("ops3")
+        self.server.latency = 0.2
+
+        # Act & Assert
+        start = time.monotonic()
+        self.assertFalse(LoveOpsMembers.is_member(LDAP_URI, "ops3"))
+        self.assertLess(time.monotonic() - start, 0.1)
+        while LoveOpsMembers.refreshing:
+            time.sleep(0.01)
+        self.assertTrue(LoveOpsMembers.is_member(LDAP_URI, "ops3"))
+        while LoveOpsMembers.refreshing:
+            time.sleep(0.01)
+
+        self.server.down = True
+        self.assertTrue(LoveOpsMembers.is_member(LDAP_URI, "ops3"))
+        while LoveOpsMembers.refreshing:
+            time.sleep(0.01)
+        self.assertTrue(LoveOpsMembers.is_member(LDAP_URI, "ops1"))
+
+
+class StandInBackend:
+    """Authentication backend of a `StandInLDAPServer`, which fails as the IPA backends do when it is down."""
+
+    server_uri = None
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        with LDAPServerHealth.track(self.server_uri):
+            try:
+                ldap.initialize(self.server_uri).simple_bind_s(username, password)
+            except ldap.LDAPError as e:
+                ldap_error.send(type(self), context="authenticate", exception=e)
+                return None
+        return User.objects.filter(username=username).first()
+
+    def get_user(self, user_id):
+        return User.objects.filter(id=user_id).first()
+
+
+@override_settings(DEBUG=True, LDAP_HEALTH_PROBE_INTERVAL=0.05)
+class LDAPFailoverTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        LDAPServerHealth.reset()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.servers = [
+            StandInLDAPServer(connect_latency=0.1, latency=0.01),
+            StandInLDAPServer(connect_latency=0.001, latency=0.001),
+        ]
+        self.uris = ["ldap://ipa0.test/", "ldap://ipa1.test/"]
+        servers = dict(zip(self.uris, self.servers))
+        backend_classes = [
+            type("StandInBackend", (StandInBackend,), {"server_uri": uri})
+            for uri in self.uris
+        ]
+        for patcher in [
+            patch("ldap.initialize", lambda uri: servers[uri].initialize(uri)),
+            patch.object(IPAFailoverBackend, "backend_classes", backend_classes),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.backend = IPAFailoverBackend()
+
+    def tearDown(self):
+        LDAPServerHealth.reset()
+
+    def test_fastest_server_first(self):
+        """Test that the fastest healthy server is tried first, once every server is measured."""
+        # Arrange
+        self.servers[0].down = True
+        self.backend.authenticate(None, username="user", password="password")
+        self.servers[0].down = False
+        while not LDAPServerHealth.is_healthy(self.uris[0]):
+            time.sleep(0.01)
+
+        # Act
+        user = self.backend.authenticate(None, username="user", password="password")
+
+        # Assert
+        self.assertEqual(user, self.user)
+        self.assertEqual(LDAPServerHealth.order(self.uris), self.uris[::-1])
+
+    def test_unhealthy_server_is_skipped(self):
+        """Test that a server that is down is skipped until a probe reaches it again."""
+        # Arrange
+        self.servers[0].down = True
+        self.servers[0].connect_latency = 0.5
+        self.backend.authenticate(None, username="user", password="password")
+        requests = self.servers[1].requests
+
+        # Act
+        start = time.monotonic()
+        user = self.backend.authenticate(None, username="user", password="password")
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(user, self.user)
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(self.servers[1].requests, requests + 1)
+        self.assertFalse(LDAPServerHealth.is_healthy(self.uris[0]))
+        self.servers[0].down = False
+        while not LDAPServerHealth.is_healthy(self.uris[0]):
+            time.sleep(0.01)
+
+
+@override_settings(
+    DEBUG=True,
+    LDAP_HEALTH_PROBE_INTERVAL=0.05,
+    AUTH_LDAP_1_SERVER_URI="ldap://ipa1.test/",
+    AUTH_LDAP_2_SERVER_URI="ldap://ipa2.test/",
+    AUTH_LDAP_3_SERVER_URI="ldap://ipa3.test/",
+    AUTH_LDAP_1_USER_DN_TEMPLATE="uid=%(user)s,cn=users,cn=accounts,dc=lsst,dc=cloud",
+    AUTH_LDAP_2_USER_DN_TEMPLATE="uid=%(user)s,cn=users,cn=accounts,dc=lsst,dc=cloud",
+    AUTH_LDAP_3_USER_DN_TEMPLATE="uid=%(user)s,cn=users,cn=accounts,dc=lsst,dc=cloud",
+)
+class IPAFailoverBackendTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        LDAPServerHealth.reset()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.backend_classes = [IPABackend1, IPABackend2, IPABackend3]
+        self.uris = ["ldap://ipa1.test/", "ldap://ipa2.test/", "ldap://ipa3.test/"]
+        self.servers = [StandInLDAPServer() for uri in self.uris]
+        servers = dict(zip(self.uris, self.servers))
+        patchers = [
+            patch(
+                "ldap.initialize",
+                lambda uri, *args, **kwargs: servers[uri].initialize(uri),
+            )
+        ]
+        for backend_class, uri in zip(self.backend_classes, self.uris):
+            patchers.append(patch.object(backend_class, "server_uri", uri))
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.backend = IPAFailoverBackend()
+
+    def tearDown(self):
+        LDAPServerHealth.reset()
+        LDAPConnectionPool.reset()
+        LoveOpsMembers.reset()
+
+    def test_server_down_is_marked_unhealthy(self):
+        """Test that an IPA backend whose server is down reports it through the ldap_error signal,
+        and that the next backend authenticates the user and gets its latency measured."""
+        # Arrange
+        self.servers[0].down = True
+
+        # Act
+        user = self.backend.authenticate(None, username="user", password="password")
+
+        # Assert
+        self.assertEqual(user, self.user)
+        self.assertFalse(LDAPServerHealth.is_healthy(self.uris[0]))
+        self.assertEqual(LDAPServerHealth.failures, {self.uris[0]: 1})
+        self.assertNotIn(self.uris[0], LDAPServerHealth.latencies)
+        self.assertIn(self.uris[1], LDAPServerHealth.latencies)
+        self.assertEqual(user.ldap_server_uri, self.uris[1])
+        self.assertEqual(self.servers[2].requests, 0)
+        self.servers[0].down = False
+        while not LDAPServerHealth.is_healthy(self.uris[0]):
+            time.sleep(0.01)
+
+    def test_login_checks_permissions_on_authenticating_server(self):
+        """Test that the love_ops membership of a new user is checked against the server that authenticated it."""
+        # Arrange: a first login through the first server, which then goes down
+        self.servers[1].members = ["ops"]
+        cmd_group = Group.objects.create(name="cmd")
+        ui_framework_group = Group.objects.create(name="ui_framework")
+        client = APIClient()
+        login_url = reverse("login")
+        data = {"username": "ops", "password": "password"}
+        with self.settings(AUTHENTICATION_BACKENDS=["api.views.IPAFailoverBackend"]):
+            client.post(login_url, {"username": "other", "password": "password"})
+            self.servers[0].down = True
+
+            # Act
+            response = client.post(login_url, data, format="json")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(username="ops")
+        self.assertIn(cmd_group, user.groups.all())
+        self.assertIn(ui_framework_group, user.groups.all())
+        self.assertEqual(self.servers[2].requests, 0)
+        self.servers[0].down = False
+        while not LDAPServerHealth.is_healthy(self.uris[0]):
+            time.sleep(0.01)
+
+    def test_get_user(self):
+        """Test that users are loaded by the first IPA backend that finds them, skipping unhealthy servers."""
+        # Arrange
+        LDAPServerHealth.unhealthy.add(self.uris[0])
+
+        # Act
+        user = self.backend.get_user(self.user.id)
+        missing_user = self.backend.get_user(self.user.id + 1)
+
+        # Assert
+        self.assertEqual(user, self.user)
+        self.assertIsInstance(user.ldap_user.backend, IPABackend2)
+        self.assertIsNone(missing_user)
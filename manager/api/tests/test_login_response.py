@@ -0,0 +1,76 @@
+import json
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.models import ConfigFile
+from api.signals import clear_user_caches
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User, Permission
+from unittest.mock import patch
+
+
+@override_settings(DEBUG=True)
+class LoginResponseTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        clear_user_caches()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        self.content = {"key1": "this is the content of the file"}
+        self.configfile = ConfigFile.objects.create(
+            user=self.user,
+            config_file=ContentFile(
+                json.dumps(self.content).encode("ascii"), name="random_filename"
+            ),
+            file_name="test.json",
+        )
+        self.configfile.selected_by_users.add(self.user)
+        self.url = reverse("login")
+        self.data = {"username": "user", "password": "password"}
+
+    def tearDown(self):
+        clear_user_caches()
+
+    def test_login_from_cached_parts(self):
+        """Test that logins reuse the cached permissions and parsed config."""
+        # Arrange
+        first_response = self.client.post(self.url, self.data, format="json")
+
+        # Act
+        with patch("api.serializers.json", wraps=json) as mock_json:
+            with self.assertNumQueries(4):
+                response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(mock_json.loads.call_count, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["token"], first_response.data["token"])
+        self.assertEqual(
+            response.data["permissions"],
+            {"execute_commands": True, "authlist_admin": False},
+        )
+        self.assertEqual(response.data["config"]["content"], self.content)
+
+    def test_config_update(self):
+        """Test that the parsed config is read again when the config file is updated."""
+        # Arrange
+        self.client.post(self.url, self.data, format="json")
+        new_content = {"key1": "this is the new content of the file"}
+
+        # Act
+        self.configfile.config_file = ContentFile(
+            json.dumps(new_content).encode("ascii"), name="random_filename"
+        )
+        self.configfile.save()
+        response = self.client.post(self.url, self.data, format="json")
+
+        # Assert
+        self.assertEqual(response.data["config"]["content"], new_content)
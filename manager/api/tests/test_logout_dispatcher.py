@@ -0,0 +1,98 @@
+import pytest
+import asyncio
+import threading
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+from api.models import Token
+from api.logout_dispatcher import LogoutDispatcher
+from django.contrib.auth.models import User
+from manager.routing import application
+from subscription.metrics import Metrics
+from unittest.mock import patch, MagicMock
+
+
+@override_settings(DEBUG=True)
+class LogoutDispatcherTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.tokens = [Token.objects.create(user=self.user) for i in range(4)]
+        self.sent = []
+        self.sending = threading.Event()
+        self.release = threading.Event()
+        LogoutDispatcher.flush()
+        Metrics.reset()
+
+    def tearDown(self):
+        self.release.set()
+        LogoutDispatcher.flush()
+        Metrics.reset()
+
+    async def group_send(self, group, payload):
+        """Block the worker until the test releases it, and record the message."""
+        self.sending.set()
+        self.release.wait(timeout=10)
+        self.sent.append((group, payload))
+
+    @patch("api.logout_dispatcher.get_channel_layer")
+    def test_token_deletion_does_not_wait(self, mock_get_channel_layer):
+        """Test that deleting tokens does not wait on the Channel Layer,
+        and that the queued messages are sent in batches."""
+        # Arrange
+        mock_get_channel_layer.return_value = MagicMock(group_send=self.group_send)
+
+        # Act: the worker blocks sending the first message, so the rest are queued
+        self.tokens[0].delete()
+        self.sending.wait(timeout=10)
+        Token.objects.filter(id__in=[token.id for token in self.tokens[1:]]).delete()
+        self.assertEqual(self.sent, [])
+        self.release.set()
+        LogoutDispatcher.flush()
+
+        # Assert
+        self.assertEqual(
+            sorted(group for group, _ in self.sent),
+            sorted("token-{}".format(token.key) for token in self.tokens),
+        )
+        for _, payload in self.sent:
+            self.assertEqual(payload, {"type": "logout", "message": ""})
+        self.assertEqual(Metrics.get("logout_messages"), 4)
+        self.assertEqual(Metrics.get("logout_batches"), 2)
+
+
+class TestLogoutDispatcherConsumers:
+    """Test that the logout messages are sent to the consumers through the Channel Layer of their event loop."""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            "username", password="123", email="user@user.cl"
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_token_deletion_closes_the_consumer(self):
+        """Test that deleting a token closes its consumers, sending the message in their event loop."""
+        # Arrange
+        communicator = WebsocketCommunicator(
+            application, "manager/ws/subscription/?token={}".format(self.token)
+        )
+        connected, _ = await communicator.connect()
+        assert connected
+        assert LogoutDispatcher.loop is asyncio.get_event_loop()
+
+        # Act
+        await database_sync_to_async(self.token.delete)()
+
+        # Assert
+        output = await communicator.receive_output(timeout=5)
+        assert output["type"] == "websocket.close"
+        await communicator.wait()
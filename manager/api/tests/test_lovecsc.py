@@ -7,7 +7,13 @@ import yaml
 from unittest.mock import patch, call
 
 
-@override_settings(DEBUG=True)
+@override_settings(
+    DEBUG=True,
+    COMMANDER_HOSTNAME="fakehost",
+    COMMANDER_PORT="fakeport",
+    COMMANDER_CONNECT_TIMEOUT=3,
+    COMMANDER_READ_TIMEOUT=60,
+)
 class LOVECscTestCase(TestCase):
     maxDiff = None
 
@@ -31,14 +37,8 @@ class LOVECscTestCase(TestCase):
             Permission.objects.get(codename="change_view"),
         )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_authorized_lovecsc_data(self, mock_requests, mock_environ):
+    @patch("requests.Session.post")
+    def test_authorized_lovecsc_data(self, mock_requests):
         """Test authorized user observing log is sent to love-commander"""
         # Arrange:
         self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
@@ -54,16 +54,12 @@ class LOVECscTestCase(TestCase):
             self.client.post(url, data, format="json")
 
         expected_url = f"http://fakehost:fakeport/lovecsc/observinglog"
-        self.assertEqual(mock_requests.call_args, call(expected_url, json=data))
+        self.assertEqual(
+            mock_requests.call_args, call(expected_url, json=data, timeout=(3, 60))
+        )
 
-    @patch(
-        "os.environ.get",
-        side_effect=lambda arg: "fakehost"
-        if arg == "COMMANDER_HOSTNAME"
-        else "fakeport",
-    )
-    @patch("requests.post")
-    def test_unauthorized_lovecsc(self, mock_requests, mock_environ):
+    @patch("requests.Session.post")
+    def test_unauthorized_lovecsc(self, mock_requests):
         """Test an unauthorized user can't send commands"""
         # Act:
         url = reverse("lovecsc-observinglog")
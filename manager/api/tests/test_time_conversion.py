@@ -0,0 +1,105 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.models import Token
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from astropy.time import Time
+from manager import utils
+
+
+@override_settings(DEBUG=True)
+class TimeConversionTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("time-convert")
+        # 2016-12-31T23:59:59, 2017-01-01T00:00:01 (after a leap second) and 2023-11-14T22:13:20
+        self.timestamps = [1483228799.0, 1483228801.0, 1700000000.0]
+
+    def test_convert_utc(self):
+        """Test that UTC timestamps are converted to every time measure, as astropy does."""
+        # Act
+        response = self.client.post(
+            self.url, {"timestamps": self.timestamps}, format="json"
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        t = Time(self.timestamps, format="unix", scale="utc")
+        sidereal_greenwich = t.sidereal_time(
+            "apparent", longitude="greenwich", model=None
+        ).value
+        self.assertEqual(response.data["utc"], self.timestamps)
+        self.assertEqual(response.data["tai_to_utc"], [-36.0, -37.0, -37.0])
+        self.assertEqual(
+            response.data["tai"], [1483228835.0, 1483228838.0, 1700000037.0]
+        )
+        self.assertEqual(
+            response.data["observing_day"], ["20161231", "20161231", "20231114"]
+        )
+        for i in range(len(self.timestamps)):
+            self.assertAlmostEqual(response.data["mjd"][i], t.mjd[i], places=9)
+            self.assertAlmostEqual(
+                response.data["sidereal_greenwich"][i],
+                sidereal_greenwich[i],
+                places=6,
+            )
+
+    def test_convert_tai(self):
+        """Test that TAI timestamps give the same result as the equivalent UTC timestamps."""
+        # Arrange
+        expected_data = {
+            key: values.tolist()
+            for key, values in utils.convert_times(self.timestamps).items()
+        }
+
+        # Act
+        response = self.client.post(
+            self.url,
+            {"timestamps": expected_data["tai"], "scale": "tai"},
+            format="json",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, expected_data)
+
+    @override_settings(TIME_CONVERSION_MAX_TIMESTAMPS=2)
+    def test_invalid_parameters(self):
+        """Test that invalid parameters and too many timestamps are rejected."""
+        invalid_data = [
+            {},
+            {"timestamps": "1700000000"},
+            {"timestamps": [1700000000.0, "now"]},
+            {"timestamps": [1700000000.0], "scale": "tt"},
+            {"timestamps": self.timestamps},
+        ]
+        for data in invalid_data:
+            # Act
+            response = self.client.post(self.url, data, format="json")
+
+            # Assert
+            self.assertEqual(response.status_code, 400)
+
+    def test_unauthenticated(self):
+        """Test that unauthenticated users cannot convert timestamps."""
+        # Arrange
+        self.client.credentials()
+
+        # Act
+        response = self.client.post(
+            self.url, {"timestamps": self.timestamps}, format="json"
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 401)
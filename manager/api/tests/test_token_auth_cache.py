@@ -0,0 +1,123 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.models import Token
+from api.authentication import ExpiringTokenAuthentication, TokenAuthCache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User, Group, Permission
+
+
+@override_settings(DEBUG=True)
+class TokenAuthCacheTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        TokenAuthCache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.group = Group.objects.create(name="operators")
+        self.user.groups.add(self.group)
+        self.authentication = ExpiringTokenAuthentication()
+
+    def tearDown(self):
+        TokenAuthCache.clear()
+
+    def test_warm_cache_does_not_query(self):
+        """Test that requests authenticated with a cached token do not query the database."""
+        # Arrange
+        url = reverse("time-convert")
+        data = {"timestamps": [1700000000.0]}
+        self.client.post(url, data, format="json")
+
+        # Act & Assert
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data, format="json")
+            user, _ = self.authentication.authenticate_credentials(self.token.key)
+            user.has_perm("api.command.execute_command")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user, self.user)
+
+    def test_token_deletion(self):
+        """Test that deleted tokens are not accepted from the cache."""
+        # Arrange
+        self.authentication.authenticate_credentials(self.token.key)
+
+        # Act
+        self.token.delete()
+
+        # Assert
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_user_deactivation(self):
+        """Test that tokens of deactivated users are not accepted from the cache."""
+        # Arrange
+        self.authentication.authenticate_credentials(self.token.key)
+
+        # Act
+        self.user.is_active = False
+        self.user.save()
+
+        # Assert
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_permission_changes(self):
+        """Test that permission changes of users and groups are seen with a warm cache."""
+        # Arrange
+        permission = Permission.objects.get(name="Execute Commands")
+        user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertFalse(user.has_perm("api.command.execute_command"))
+
+        # Act & Assert
+        self.group.permissions.add(permission)
+        user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertTrue(user.has_perm("api.command.execute_command"))
+
+        self.user.groups.remove(self.group)
+        user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertFalse(user.has_perm("api.command.execute_command"))
+
+        self.user.user_permissions.add(permission)
+        user, _ = self.authentication.authenticate_credentials(self.token.key)
+        self.assertTrue(user.has_perm("api.command.execute_command"))
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=0)
+    def test_ttl(self):
+        """Test that cached tokens are queried again after the TTL."""
+        # Arrange
+        self.authentication.authenticate_credentials(self.token.key)
+
+        # Act & Assert
+        with self.assertNumQueries(3):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_hits_are_not_shared(self):
+        """Test that every request authenticated with a cached token gets its own token and user instances."""
+        # Arrange
+        self.authentication.authenticate_credentials(self.token.key)
+        user, token = self.authentication.authenticate_credentials(self.token.key)
+
+        # Act
+        user.first_name = "Changed"
+        user._perm_cache.add("api.changed")
+
+        # Assert
+        with self.assertNumQueries(0):
+            other_user, other_token = self.authentication.authenticate_credentials(
+                self.token.key
+            )
+        self.assertIsNot(other_user, user)
+        self.assertIsNot(other_token, token)
+        self.assertIs(other_token.user, other_user)
+        self.assertEqual(other_user, self.user)
+        self.assertEqual(other_user.first_name, "First")
+        self.assertFalse(other_user.has_perm("api.changed"))
@@ -0,0 +1,106 @@
+import datetime
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.models import Token
+from api.authentication import TokenAuthCache
+from api.token_sweeper import TokenSweeper
+from django.contrib.auth.models import User
+from unittest.mock import patch
+
+
+@override_settings(DEBUG=True)
+class TokenSweeperTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.valid_tokens = [Token.objects.create(user=self.user) for i in range(2)]
+        self.expired_tokens = [Token.objects.create(user=self.user) for i in range(5)]
+        expired_date = timezone.now() - datetime.timedelta(
+            days=settings.TOKEN_EXPIRED_AFTER_DAYS + 1
+        )
+        Token.objects.filter(id__in=[token.id for token in self.expired_tokens]).update(
+            created=expired_date
+        )
+        TokenAuthCache.clear()
+
+    def tearDown(self):
+        TokenAuthCache.clear()
+
+    @patch("api.token_sweeper.send_logout")
+    @patch("api.signals.send_logout")
+    def test_sweep(self, mock_signal_logout, mock_logout):
+        """Test that the expired tokens are deleted in batches, without signals,
+        with one logout fan-out and cache invalidation per batch."""
+        # Arrange
+        for token in self.expired_tokens + self.valid_tokens:
+            TokenAuthCache.add(token)
+
+        # Act: 3 batches, of 2, 2 and 1 tokens (select and delete), and a last query with no tokens
+        with self.assertNumQueries(7):
+            deleted = TokenSweeper.sweep(batch_size=2)
+
+        # Assert
+        self.assertEqual(deleted, 5)
+        self.assertEqual(
+            set(Token.objects.values_list("key", flat=True)),
+            set(token.key for token in self.valid_tokens),
+        )
+        self.assertEqual(mock_signal_logout.call_count, 0)
+        self.assertEqual(
+            [len(call[0][0]) for call in mock_logout.call_args_list], [2, 2, 1]
+        )
+        self.assertEqual(
+            set(key for call in mock_logout.call_args_list for key in call[0][0]),
+            set(token.key for token in self.expired_tokens),
+        )
+        for token in self.expired_tokens:
+            self.assertIsNone(TokenAuthCache.get(token.key))
+        for token in self.valid_tokens:
+            self.assertIsNotNone(TokenAuthCache.get(token.key))
+
+    def test_tokens_have_no_dependent_objects(self):
+        """Test that no model has a relation to Token, which is why the sweep can delete the rows directly."""
+        self.assertEqual(list(Token._meta.related_objects), [])
+
+    @patch("api.token_sweeper.send_logout")
+    def test_command(self, mock_logout):
+        """Test that the sweeptokens command deletes the expired tokens."""
+        # Arrange
+        out = StringIO()
+
+        # Act
+        call_command("sweeptokens", "--batch-size", "10", stdout=out)
+
+        # Assert
+        self.assertEqual(Token.objects.count(), 2)
+        self.assertIn("Deleted 5 expired tokens", out.getvalue())
+
+    @patch("api.management.commands.sweeptokens.time.sleep")
+    @patch("api.token_sweeper.TokenSweeper.sweep")
+    def test_command_interval(self, mock_sweep, mock_sleep):
+        """Test that the periodic sweeps of the sweeptokens command continue after a failure."""
+        # Arrange
+        out = StringIO()
+        err = StringIO()
+        mock_sweep.side_effect = [DatabaseError("database is down"), 5]
+        mock_sleep.side_effect = [None, KeyboardInterrupt]
+
+        # Act
+        with self.assertRaises(KeyboardInterrupt):
+            call_command("sweeptokens", "--interval", "60", stdout=out, stderr=err)
+
+        # Assert
+        self.assertEqual(mock_sweep.call_count, 2)
+        self.assertIn("database is down", err.getvalue())
+        self.assertIn("Deleted 5 expired tokens", out.getvalue())
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.models import Token
+from api.authentication import TokenAuthCache
+from api.response_cache import validate_token_cache
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User, Permission
+from manager import utils
+
+
+@override_settings(DEBUG=True)
+class ValidateTokenTestCase(TestCase):
+    def setUp(self):
+        """Define the test suite setup."""
+        # Arrange
+        TokenAuthCache.clear()
+        validate_token_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="user",
+            password="password",
+            email="test@user.cl",
+            first_name="First",
+            last_name="Last",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.url = reverse("validate-token", kwargs={"flags": "no_config"})
+
+    def tearDown(self):
+        TokenAuthCache.clear()
+        validate_token_cache.clear()
+
+    def test_minimal(self):
+        """Test that the minimal mode only returns the validity and remaining time of the token,
+        without queries once the token is cached."""
+        # Arrange
+        url = reverse("validate-token", kwargs={"flags": "minimal"})
+        self.client.get(url)
+
+        # Act
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data.keys()), {"valid", "expires_in"})
+        self.assertTrue(response.data["valid"])
+        self.assertAlmostEqual(
+            response.data["expires_in"],
+            settings.TOKEN_EXPIRED_AFTER_DAYS * 86400,
+            delta=60,
+        )
+
+    def test_cached_response(self):
+        """Test that repeated validations are served from the cache, always with fresh time data."""
+        # Arrange
+        first_response = self.client.get(self.url)
+
+        # Act
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.data["token"], self.token.key)
+        self.assertTrue(utils.assert_time_data(response.data["time_data"]))
+        self.assertGreaterEqual(
+            response.data["time_data"]["utc"], first_response.data["time_data"]["utc"]
+        )
+
+    def test_invalidation(self):
+        """Test that the cached response is invalidated when the permissions of the user change."""
+        # Arrange
+        first_response = self.client.get(self.url)
+        self.assertFalse(first_response.data["permissions"]["execute_commands"])
+
+        # Act
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        response = self.client.get(self.url)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["permissions"]["execute_commands"])
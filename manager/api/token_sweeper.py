@@ -0,0 +1,61 @@
+"""Defines the sweeper of the expired tokens."""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from api.models import Token
+from api.authentication import TokenAuthCache
+from api.signals import send_logout
+from subscription.metrics import Metrics
+
+
+class TokenSweeper:
+    """Deletes the expired tokens, which are otherwise deleted only when they are used.
+
+    Tokens are deleted in batches of `TOKEN_SWEEP_BATCH_SIZE`, selected with the index of their
+    creation date, with one DELETE query per batch and without sending a `post_delete` signal per token.
+    Instead, the tokens of every batch are removed from the `TokenAuthCache`,
+    and their consumers instructed to logout with a single `send_logout`.
+
+    The sweep runs with the `sweeptokens` management command, once or periodically (`--interval`),
+    e.g. in the process of the background tasks (see `runtasks.sh`).
+    """
+
+    @classmethod
+    def sweep(cls, batch_size=None):
+        """Delete the expired tokens and instruct their consumers to logout.
+
+        Parameters
+        ----------
+        batch_size: `int`
+            maximum number of tokens deleted per query, `TOKEN_SWEEP_BATCH_SIZE` by default
+
+        Returns
+        -------
+        `int`
+            The number of deleted tokens
+        """
+        batch_size = batch_size or settings.TOKEN_SWEEP_BATCH_SIZE
+        expired_before = timezone.now() - timedelta(
+            days=settings.TOKEN_EXPIRED_AFTER_DAYS
+        )
+        deleted = 0
+        while True:
+            batch = list(
+                Token.objects.filter(created__lt=expired_before)
+                .order_by("created")
+                .values_list("id", "key")[:batch_size]
+            )
+            if not batch:
+                break
+            # No model has a relation to Token, so the rows can be deleted directly,
+            # and the signal handlers of the tokens are replaced by the calls below
+            Token.objects.filter(
+                id__in=[token_id for token_id, _ in batch]
+            )._raw_delete(Token.objects.db)
+            keys = [key for _, key in batch]
+            for key in keys:
+                TokenAuthCache.invalidate_token(key)
+            send_logout(keys)
+            deleted += len(keys)
+        Metrics.increment("expired_tokens_deleted", deleted)
+        return deleted
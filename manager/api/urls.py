@@ -61,6 +61,13 @@ urlpatterns = [
     path(
         "tcs/main/docstrings", api.views.tcs_main_docstrings, name="TCS-main-docstrings"
     ),
+    path(
+        "commander-metadata/invalidate",
+        api.views.invalidate_commander_metadata,
+        name="commander-metadata-invalidate",
+    ),
+    path("metrics", api.views.metrics, name="metrics"),
+    path("time/convert", api.views.convert_times, name="time-convert"),
 ]
 router.register("configfile", ConfigFileViewSet)
 router.register("emergencycontact", EmergencyContactViewSet)
@@ -1,14 +1,11 @@
 """Defines the views exposed by the REST API exposed by this app."""
-import os
 import json
-import requests
-import yaml
-import jsonschema
 import collections
-import ldap
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.db.models.query_utils import Q
+from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import Group, User
 from django_auth_ldap.backend import LDAPBackend
 from drf_yasg import openapi
@@ -17,7 +14,7 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import api_view
 from rest_framework.decorators import permission_classes
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import viewsets, status, mixins
 from api.models import (
@@ -26,6 +23,12 @@ from api.models import (
     EmergencyContact,
     CSCAuthorizationRequest,
 )
+from api.authentication import ExpiringTokenAuthentication
+from api.commander_client import CommanderClient
+from api.commander_metadata import CommanderMetadata
+from api.efd_timeseries import EFDTimeseries
+from api.ldap_directory import LoveOpsMembers, LDAPServerHealth
+from api.response_cache import validate_token_cache, etag_response
 from api.serializers import TokenSerializer, ConfigSerializer
 from api.serializers import (
     ConfigFileSerializer,
@@ -36,7 +39,9 @@ from api.serializers import (
     CSCAuthorizationRequestAuthorizeSerializer,
     CSCAuthorizationRequestExecuteSerializer,
 )
-from .schema_validator import DefaultingValidator
+from channels.layers import get_channel_layer
+from subscription.metrics import Metrics
+from manager import utils
 from manager.settings import (
     AUTH_LDAP_1_SERVER_URI,
     AUTH_LDAP_2_SERVER_URI,
@@ -62,6 +67,8 @@ def validate_token(request, *args, **kwargs):
 
     If the token is invalid this function is not executed (the request fails before)
 
+    The payload is cached per token for `VALIDATE_TOKEN_CACHE_TTL` seconds, except the time data,
+    which is added to every response. Responses have no ETag, as the time data changes in every request.
 
     Params
     ------
@@ -71,7 +78,9 @@ def validate_token(request, *args, **kwargs):
         List of addittional arguments. Currenlty unused
     kwargs: dict
         Dictionary with addittional keyword arguments (indexed by keys in the dict),
-        one optional parameter that could be expeted is `flags`
+        one optional parameter that could be expeted is `flags`, which can be
+        `no_config`, to not include the config, or `minimal`, to only include the validity
+        and the remaining seconds of the token
 
     Returns
     -------
@@ -79,11 +88,24 @@ def validate_token(request, *args, **kwargs):
         The response stating that the token is valid with a 200 status code.
     """
     flags = kwargs.get("flags", None)
+    token = request.auth
+    if not isinstance(token, Token):
+        token_key = request.META.get("HTTP_AUTHORIZATION")[6:]
+        token = Token.objects.get(key=token_key)
+
+    if flags == "minimal":
+        expires_in = ExpiringTokenAuthentication.expires_in(token)
+        return Response({"valid": True, "expires_in": expires_in.total_seconds()})
+
     no_config = flags == "no_config" or flags == "no-config"
-    token_key = request.META.get("HTTP_AUTHORIZATION")[6:]
-    token = Token.objects.get(key=token_key)
-    data = TokenSerializer(token, context={"no_config": no_config}).data
-    return Response(data)
+    cached = validate_token_cache.get((token.key, no_config))
+    if cached is None:
+        data = dict(TokenSerializer(token, context={"no_config": no_config}).data)
+        data.pop("time_data")
+        validate_token_cache.add((token.key, no_config), data, owner=token.user_id)
+    else:
+        data, _ = cached
+    return Response({**data, "time_data": utils.get_times()})
 
 
 @swagger_auto_schema(
@@ -114,37 +136,78 @@ def logout(request):
     )
 
 
-class IPABackend1(LDAPBackend):
-    settings_prefix = "AUTH_LDAP_1_"
-    successful_login = False
+class IPABackend(LDAPBackend):
+    """Base of the IPA backends, which record the server that authenticated each user.
+
+    The URI of the server is stored in the `ldap_server_uri` attribute of the authenticated user,
+    to check its membership in the love_ops group against the same server.
+    """
+
+    server_uri = None
+    """URI of the LDAP server of the backend (`str`)"""
 
     def authenticate_ldap_user(self, ldap_user, password):
-        user = ldap_user.authenticate(password)
+        with LDAPServerHealth.track(self.server_uri):
+            user = ldap_user.authenticate(password)
         if user:
-            IPABackend1.successful_login = True
+            user.ldap_server_uri = self.server_uri
         return user
 
 
-class IPABackend2(LDAPBackend):
-    settings_prefix = "AUTH_LDAP_2_"
-    successful_login = False
+class IPABackend1(IPABackend):
+    settings_prefix = "AUTH_LDAP_1_"
+    server_uri = AUTH_LDAP_1_SERVER_URI
 
-    def authenticate_ldap_user(self, ldap_user, password):
-        user = ldap_user.authenticate(password)
-        if user:
-            IPABackend2.successful_login = True
-        return user
 
+class IPABackend2(IPABackend):
+    settings_prefix = "AUTH_LDAP_2_"
+    server_uri = AUTH_LDAP_2_SERVER_URI
 
-class IPABackend3(LDAPBackend):
+
+class IPABackend3(IPABackend):
     settings_prefix = "AUTH_LDAP_3_"
-    successful_login = False
+    server_uri = AUTH_LDAP_3_SERVER_URI
 
-    def authenticate_ldap_user(self, ldap_user, password):
-        user = ldap_user.authenticate(password)
-        if user:
-            IPABackend3.successful_login = True
-        return user
+
+class IPAFailoverBackend(BaseBackend):
+    """Authentication backend that tries the configured IPA backends by the health of their servers.
+
+    The fastest healthy server is tried first, and unhealthy servers are skipped
+    while they are probed in the background, unless no server is healthy (see `LDAPServerHealth`).
+    The authenticated users record the server that authenticated them in `ldap_server_uri` (see `IPABackend`).
+    """
+
+    backend_classes = [IPABackend1, IPABackend2, IPABackend3]
+    """IPA backends, in the configured order (`list`)"""
+
+    def get_backends(self):
+        """Return the IPA backends with a server, in the order they should be tried.
+
+        Returns
+        -------
+        `list` of `LDAPBackend`
+            The backends
+        """
+        backends = {
+            cls.server_uri: cls for cls in self.backend_classes if cls.server_uri
+        }
+        return [backends[uri]() for uri in LDAPServerHealth.order(list(backends))]
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        for backend in self.get_backends():
+            user = backend.authenticate(
+                request, username=username, password=password, **kwargs
+            )
+            if user is not None:
+                return user
+        return None
+
+    def get_user(self, user_id):
+        for backend in self.get_backends():
+            user = backend.get_user(user_id)
+            if user is not None:
+                return user
+        return None
 
 
 class CustomObtainAuthToken(ObtainAuthToken):
@@ -191,25 +254,10 @@ class CustomObtainAuthToken(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user_obj = serializer.validated_data["user"]
 
-        ldap_result = None
-        if user_aux is None:
-            if IPABackend1.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_1_SERVER_URI)
-            elif IPABackend2.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_2_SERVER_URI)
-            elif IPABackend3.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_3_SERVER_URI)
-
-        baseDN = "cn=love_ops,cn=groups,cn=compat,dc=lsst,dc=cloud"
-        searchScope = ldap.SCOPE_SUBTREE
-
-        if ldap_result is not None:
+        # Only LDAP users logging in for the first time, checked against the server that authenticated them
+        if user_aux is None and hasattr(user_obj, "ldap_server_uri"):
             try:
-                ldap_result = ldap_result.search_s(baseDN, searchScope)
-                ops_users = list(
-                    map(lambda u: u.decode(), ldap_result[0][1]["memberUid"])
-                )
-                if username in ops_users:
+                if LoveOpsMembers.is_member(user_obj.ldap_server_uri, username):
                     cmd_group = Group.objects.filter(name="cmd").first()
                     ui_framework_group = Group.objects.filter(
                         name="ui_framework"
@@ -272,25 +320,10 @@ class CustomSwapAuthToken(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user_obj = serializer.validated_data["user"]
 
-        ldap_result = None
-        if user_aux is None:
-            if IPABackend1.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_1_SERVER_URI)
-            elif IPABackend2.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_2_SERVER_URI)
-            elif IPABackend3.successful_login:
-                ldap_result = ldap.initialize(AUTH_LDAP_3_SERVER_URI)
-
-        baseDN = "cn=love_ops,cn=groups,cn=compat,dc=lsst,dc=cloud"
-        searchScope = ldap.SCOPE_SUBTREE
-
-        if ldap_result is not None:
+        # Only LDAP users logging in for the first time, checked against the server that authenticated them
+        if user_aux is None and hasattr(user_obj, "ldap_server_uri"):
             try:
-                ldap_result = ldap_result.search_s(baseDN, searchScope)
-                ops_users = list(
-                    map(lambda u: u.decode(), ldap_result[0][1]["memberUid"])
-                )
-                if username in ops_users:
+                if LoveOpsMembers.is_member(user_obj.ldap_server_uri, username):
                     cmd_group = Group.objects.filter(name="cmd").first()
                     ui_framework_group = Group.objects.filter(
                         name="ui_framework"
@@ -329,6 +362,11 @@ def validate_config_schema(request):
         Dictionary containing a 'title' and an 'error' key (if any)
         or an 'output' with the output of the validator (config with defaults-autocomplete)
     """
+    # Imported here as they are only used by this view, to shorten the start up of the manager
+    import yaml
+    import jsonschema
+    from .schema_validator import DefaultingValidator
+
     try:
         config = yaml.safe_load(request.data["config"])
     except yaml.YAMLError as e:
@@ -362,6 +400,28 @@ def validate_config_schema(request):
         )
 
 
+def commander_metadata_response(request, path):
+    """Return the response of a read-mostly LOVE-Commander endpoint, from the `CommanderMetadata` cache.
+
+    Params
+    ------
+    request: Request
+        The Request object
+    path: string
+        Path of the LOVE-Commander endpoint, including the query string if any
+
+    Returns
+    -------
+    Response
+        The response of the LOVE-Commander, with its ETag if it was successful,
+        or an empty 304 response if the request has the same ETag in its If-None-Match header
+    """
+    status_code, data, etag = CommanderMetadata.get(path)
+    if etag is None:
+        return Response(data, status=status_code)
+    return etag_response(request, data, etag)
+
+
 @swagger_auto_schema(
     method="post",
     responses={
@@ -389,8 +449,7 @@ def commander(request):
         return Response(
             {"ack": "User does not have permissions to execute commands."}, 401
         )
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/cmd"
-    response = requests.post(url, json=request.data)
+    response = CommanderClient.post("/cmd", request.data)
 
     return Response(response.json(), status=response.status_code)
 
@@ -423,8 +482,7 @@ def lovecsc_observinglog(request):
         return Response(
             {"ack": "User does not have permissions to send observing logs."}, 401
         )
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/lovecsc/observinglog"
-    response = requests.post(url, json=request.data)
+    response = CommanderClient.post("/lovecsc/observinglog", request.data)
 
     return Response(response.json(), status=response.status_code)
 
@@ -459,10 +517,7 @@ def salinfo_metadata(request):
     Response
         The response and status code of the request to the LOVE-Commander
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/salinfo/metadata"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, "/salinfo/metadata")
 
 
 @swagger_auto_schema(
@@ -504,10 +559,7 @@ def salinfo_topic_names(request):
     query = ""
     if "categories" in request.query_params:
         query = "?categories=" + request.query_params["categories"]
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/salinfo/topic-names{query}"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, f"/salinfo/topic-names{query}")
 
 
 @swagger_auto_schema(
@@ -549,10 +601,7 @@ def salinfo_topic_data(request):
     query = ""
     if "categories" in request.query_params:
         query = "?categories=" + request.query_params["categories"]
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/salinfo/topic-data{query}"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, f"/salinfo/topic-data{query}")
 
 
 @swagger_auto_schema(
@@ -689,10 +738,7 @@ def query_efd_clients(request):
     Response
         The response and status code of the request to the LOVE-Commander
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/efd_clients"
-    response = requests.get(url)
-
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, "/efd/efd_clients")
 
 
 @api_view(["POST"])
@@ -726,11 +772,11 @@ def query_efd_timeseries(request, *args, **kwargs):
     Returns
     -------
     Response
-        The response and status code of the request to the LOVE-Commander
+        The response and status code of the request to the LOVE-Commander,
+        stitched from the points cached by `EFDTimeseries`
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/timeseries"
-    response = requests.post(url, json=request.data)
-    return Response(response.json(), status=response.status_code)
+    status_code, data = EFDTimeseries.query(request.data)
+    return Response(data, status=status_code)
 
 
 @api_view(["POST"])
@@ -765,8 +811,7 @@ def query_efd_logs(request, *args, **kwargs):
     Response
         The response and status code of the request to the LOVE-Commander
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/efd/logmessages"
-    response = requests.post(url, json=request.data)
+    response = CommanderClient.post("/efd/logmessages", request.data)
     return Response(response.json(), status=response.status_code)
 
 
@@ -800,8 +845,7 @@ def tcs_aux_command(request, *args, **kwargs):
         return Response(
             {"ack": "User does not have permissions to execute commands."}, 401
         )
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/aux"
-    response = requests.post(url, json=request.data)
+    response = CommanderClient.post("/tcs/aux", request.data)
     return Response(response.json(), status=response.status_code)
 
 
@@ -824,9 +868,7 @@ def tcs_aux_docstrings(request, *args, **kwargs):
     Response
         The response and status code of the request to the LOVE-Commander
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/aux/docstrings"
-    response = requests.get(url)
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, "/tcs/aux/docstrings")
 
 
 @api_view(["POST"])
@@ -859,8 +901,7 @@ def tcs_main_command(request, *args, **kwargs):
         return Response(
             {"ack": "User does not have permissions to execute commands."}, 401
         )
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/main"
-    response = requests.post(url, json=request.data)
+    response = CommanderClient.post("/tcs/main", request.data)
     return Response(response.json(), status=response.status_code)
 
 
@@ -883,9 +924,166 @@ def tcs_main_docstrings(request, *args, **kwargs):
     Response
         The response and status code of the request to the LOVE-Commander
     """
-    url = f"http://{os.environ.get('COMMANDER_HOSTNAME')}:{os.environ.get('COMMANDER_PORT')}/tcs/main/docstrings"
-    response = requests.get(url)
-    return Response(response.json(), status=response.status_code)
+    return commander_metadata_response(request, "/tcs/main/docstrings")
+
+
+@swagger_auto_schema(
+    method="post",
+    responses={
+        200: openapi.Response("Cache invalidated in this process"),
+        401: openapi.Response("Unauthenticated"),
+        403: openapi.Response("Unauthorized"),
+    },
+)
+@api_view(["POST"])
+@permission_classes((IsAdminUser,))
+def invalidate_commander_metadata(request):
+    """Removes the cached LOVE-Commander metadata (SalInfo, docstrings and EFD clients),
+    e.g. after a deployment change, so it is requested again. Only for staff users
+
+    Only the cache of the process that handles the request is invalidated,
+    the other processes refresh their metadata when it expires, after `COMMANDER_METADATA_CACHE_TTL` seconds.
+
+    Params
+    ------
+    request: Request
+        The Request object
+
+    Returns
+    -------
+    Response
+        The response confirming the invalidation
+    """
+    CommanderMetadata.invalidate()
+    return Response(
+        {
+            "ack": "Commander metadata cache invalidated in this process. "
+            "Other processes refresh it within {:g} seconds.".format(
+                settings.COMMANDER_METADATA_CACHE_TTL
+            )
+        }
+    )
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response(
+            "Response of the form: "
+            + json.dumps(
+                {
+                    "<counter name>": "<value>",
+                    "<labeled counter name>": {"<label>": "<value>"},
+                    "channel_layer": {"<stat name>": "<value>"},
+                },
+                indent=4,
+            )
+        ),
+        401: openapi.Response("Unauthenticated"),
+    },
+)
+@api_view(["GET"])
+@permission_classes((IsAuthenticated,))
+def metrics(request):
+    """Returns the metrics of the manager process that handles the request,
+    e.g. the number of slow websocket clients downgraded or evicted
+
+    Params
+    ------
+    request: Request
+        The Request object
+
+    Returns
+    -------
+    Response
+        Dictionary containing the counters, indexed by name,
+        and the usage of the Channel Layer if it is available
+    """
+    data = Metrics.snapshot()
+    channel_layer = get_channel_layer()
+    if hasattr(channel_layer, "get_stats"):
+        data["channel_layer"] = channel_layer.get_stats()
+    return Response(data)
+
+
+@swagger_auto_schema(
+    method="post",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "timestamps": openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_NUMBER),
+                description="Unix timestamps (seconds)",
+            ),
+            "scale": openapi.Schema(
+                type=openapi.TYPE_STRING,
+                enum=["utc", "tai"],
+                description="Time scale of the timestamps, utc by default",
+            ),
+        },
+        required=["timestamps"],
+    ),
+    responses={
+        200: openapi.Response(
+            "Response of the form: "
+            + json.dumps(
+                {
+                    "utc": ["<time in UTC scale as a unix timestamp (seconds)>"],
+                    "tai": ["<time in TAI scale as a unix timestamp (seconds)>"],
+                    "mjd": ["<time as a modified julian date>"],
+                    "observing_day": ["<observing day, as YYYYMMDD>"],
+                    "sidereal_summit": ["<sidereal time in the summit (hourangles)>"],
+                    "sidereal_greenwich": ["<sidereal time in Greenwich (hourangles)>"],
+                    "tai_to_utc": ["<difference between TAI and UTC (seconds)>"],
+                },
+                indent=4,
+            )
+        ),
+        400: openapi.Response("Invalid parameters"),
+        401: openapi.Response("Unauthenticated"),
+    },
+)
+@api_view(["POST"])
+@permission_classes((IsAuthenticated,))
+def convert_times(request):
+    """Converts a list of UTC or TAI timestamps to the time measures of the time_data,
+    at most `TIME_CONVERSION_MAX_TIMESTAMPS` timestamps per request
+
+    Params
+    ------
+    request: Request
+        The Request object
+
+    Returns
+    -------
+    Response
+        Dictionary containing a list of values for each time measure, in the order of the timestamps,
+        or an 'ack' with the error if the parameters are not valid
+    """
+    timestamps = request.data.get("timestamps")
+    scale = request.data.get("scale", "utc")
+    if not isinstance(timestamps, list):
+        return Response({"ack": "The timestamps must be a list of numbers."}, 400)
+    if len(timestamps) > settings.TIME_CONVERSION_MAX_TIMESTAMPS:
+        return Response(
+            {
+                "ack": "At most {} timestamps can be converted per request.".format(
+                    settings.TIME_CONVERSION_MAX_TIMESTAMPS
+                )
+            },
+            400,
+        )
+    if any(
+        isinstance(value, bool) or not isinstance(value, (int, float))
+        for value in timestamps
+    ):
+        return Response({"ack": "The timestamps must be a list of numbers."}, 400)
+    try:
+        result = utils.convert_times(timestamps, scale)
+    except ValueError as e:
+        return Response({"ack": str(e)}, 400)
+    return Response({key: values.tolist() for key, values in result.items()})
 
 
 class CSCAuthorizationRequestViewSet(
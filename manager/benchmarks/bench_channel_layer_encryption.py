@@ -0,0 +1,112 @@
+"""Benchmark of the CPU time spent serializing and encrypting the messages sent to groups through Redis.
+
+Measures the work done by the sender of a group_send (serialization and encryption of the message for every
+process with members in the group) and by the receivers (decryption and deserialization),
+with and without encryption, for `RedisChannelLayer` and `EncryptOnceRedisChannelLayer`.
+No Redis server is needed, only the serialization is measured.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_channel_layer_encryption.py --processes 4 --channels 50
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channels_redis.core import RedisChannelLayer  # noqa: E402
+from subscription.layers.redis import EncryptOnceRedisChannelLayer  # noqa: E402
+
+
+def make_message(streams=20):
+    """Return a message similar to the ones sent by the producers to the telemetry groups.
+
+    Parameters
+    ----------
+    streams: `int`
+        number of streams in the message
+
+    Returns
+    -------
+    `dict`
+        The message
+    """
+    return {
+        "type": "subscription_data",
+        "category": "telemetry",
+        "csc": "ATMCS",
+        "salindex": 0,
+        "data": {
+            "stream{}".format(s): {"value": {"value": [0.1] * 10, "dataType": "Array"}}
+            for s in range(streams)
+        },
+    }
+
+
+def measure(layer, channel_names, messages):
+    """Measure the CPU time per message of the sender and of all the receivers.
+
+    Parameters
+    ----------
+    layer: `RedisChannelLayer`
+        the layer to measure
+    channel_names: `list` of `string`
+        members of the group
+    messages: `int`
+        number of messages
+
+    Returns
+    -------
+    `tuple`
+        Milliseconds of CPU time per message spent by the sender and by the receivers
+    """
+    message = make_message()
+    send_time = 0
+    receive_time = 0
+    for i in range(messages):
+        start = time.process_time()
+        _, channel_key_to_message, _ = layer._map_channel_keys_to_connection(
+            channel_names, message
+        )
+        sent = time.process_time()
+        for serialized in channel_key_to_message.values():
+            layer.deserialize(serialized)
+        received = time.process_time()
+        send_time += sent - start
+        receive_time += received - sent
+    return 1000 * send_time / messages, 1000 * receive_time / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+
+    channel_names = [
+        "specific.process{}!channel{}".format(p, c)
+        for p in range(args.processes)
+        for c in range(args.channels)
+    ]
+    layers = {
+        "RedisChannelLayer, no encryption": RedisChannelLayer(),
+        "RedisChannelLayer, encryption": RedisChannelLayer(
+            symmetric_encryption_keys=["key"]
+        ),
+        "EncryptOnce, no encryption": EncryptOnceRedisChannelLayer(),
+        "EncryptOnce, encryption": EncryptOnceRedisChannelLayer(
+            symmetric_encryption_keys=["key"]
+        ),
+    }
+    print("{} processes with {} members each".format(args.processes, args.channels))
+    print("{:<36}{:>16}{:>18}".format("backend", "send [ms/msg]", "receive [ms/msg]"))
+    for name, layer in layers.items():
+        send_time, receive_time = measure(layer, channel_names, args.messages)
+        print("{:<36}{:>16.3f}{:>18.3f}".format(name, send_time, receive_time))
+
+
+if __name__ == "__main__":
+    main()
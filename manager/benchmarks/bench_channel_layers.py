@@ -0,0 +1,151 @@
+"""Benchmark of the group fan-out of the Channel Layer backends.
+
+Sends messages shaped like the producers' telemetry to a group with many members,
+and measures the time needed to send them and to receive them in every member.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_channel_layers.py --channels 100 --messages 200
+
+The Redis backend is only measured when a Redis server is reachable at `REDIS_HOST:REDIS_PORT`.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channels.layers import InMemoryChannelLayer  # noqa: E402
+from subscription.layers.memory import LocalChannelLayer  # noqa: E402
+
+
+def make_message(index, streams=20):
+    """Return a message similar to the ones sent by the producers to the telemetry groups.
+
+    Parameters
+    ----------
+    index: `int`
+        index of the message
+    streams: `int`
+        number of streams in the message
+
+    Returns
+    -------
+    `dict`
+        The message
+    """
+    return {
+        "type": "subscription_data",
+        "category": "telemetry",
+        "csc": "ATMCS",
+        "salindex": 0,
+        "subscription": "telemetry-ATMCS-0-all",
+        "data": {
+            "stream{}".format(s): {
+                "value": {"value": [index * 0.1] * 10, "dataType": "Array"}
+            }
+            for s in range(streams)
+        },
+    }
+
+
+async def run(layer, channels, messages):
+    """Measure the fan-out of a layer.
+
+    Parameters
+    ----------
+    layer: `BaseChannelLayer`
+        the layer to measure
+    channels: `int`
+        number of members of the group
+    messages: `int`
+        number of messages sent to the group
+
+    Returns
+    -------
+    `tuple`
+        Seconds spent sending and receiving all the messages
+    """
+    group = "telemetry-ATMCS-0-all"
+    names = [await layer.new_channel() for i in range(channels)]
+    for name in names:
+        await layer.group_add(group, name)
+    payloads = [make_message(i) for i in range(messages)]
+
+    start = time.perf_counter()
+    for payload in payloads:
+        await layer.group_send(group, payload)
+    sent = time.perf_counter()
+    for name in names:
+        for i in range(messages):
+            await layer.receive(name)
+    received = time.perf_counter()
+
+    for name in names:
+        await layer.group_discard(group, name)
+    await layer.flush()
+    return sent - start, received - sent
+
+
+def get_layers(loop, capacity):
+    """Return the layers to measure, indexed by name.
+
+    Parameters
+    ----------
+    loop: `asyncio.AbstractEventLoop`
+        event loop used to check if Redis is available
+    capacity: `int`
+        capacity of every channel
+
+    Returns
+    -------
+    `dict`
+        Dictionary of layers
+    """
+    layers = {
+        "InMemoryChannelLayer": InMemoryChannelLayer(capacity=capacity),
+        "LocalChannelLayer": LocalChannelLayer(capacity=capacity),
+    }
+    try:
+        from channels_redis.core import RedisChannelLayer
+
+        host = os.environ.get("REDIS_HOST", "localhost")
+        port = int(os.environ.get("REDIS_PORT", 6379))
+        loop.run_until_complete(
+            asyncio.wait_for(asyncio.open_connection(host, port), 1)
+        )
+        layers["RedisChannelLayer"] = RedisChannelLayer(
+            hosts=[(host, port)], capacity=capacity
+        )
+    except (ImportError, OSError, asyncio.TimeoutError):
+        print("Redis is not available, skipping RedisChannelLayer")
+    return layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    layers = get_layers(loop, args.messages)
+    total = args.channels * args.messages
+    print(
+        "{:<22}{:>12}{:>12}{:>16}".format("backend", "send [s]", "receive [s]", "msg/s")
+    )
+    for name, layer in layers.items():
+        send_time, receive_time = loop.run_until_complete(
+            run(layer, args.channels, args.messages)
+        )
+        print(
+            "{:<22}{:>12.3f}{:>12.3f}{:>16.0f}".format(
+                name, send_time, receive_time, total / (send_time + receive_time)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
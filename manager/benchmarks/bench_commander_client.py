@@ -0,0 +1,84 @@
+"""Benchmark of the requests sent by the proxy views to the LOVE-Commander.
+
+Uses the stand-in LOVE-Commander of the tests, a local HTTP server with a simulated latency,
+and compares the previous requests, a bare `requests.get` or `requests.post` with a new connection
+every time, with `CommanderClient`, which keeps the connections alive in a pool.
+Requests are sent from a pool of threads, as the views are run by the threadpool of daphne.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_commander_client.py --requests 1000 --threads 8 --latency 0.001
+"""
+import os
+import sys
+import time
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manager.settings")
+
+import django  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.001)
+    args = parser.parse_args()
+
+    commander = None
+    try:
+        from api.tests.commander_server import StandInCommander
+
+        commander = StandInCommander(latency=args.latency)
+        commander.start()
+        os.environ["COMMANDER_HOSTNAME"] = "127.0.0.1"
+        os.environ["COMMANDER_PORT"] = commander.port
+        django.setup()
+        from api.commander_client import CommanderClient
+
+        url = CommanderClient.get_url("")
+        data = {"csc": "ATDome", "salindex": 0, "cmd": "cmd_start", "params": {}}
+        implementations = [
+            (
+                "bare requests",
+                lambda i: requests.get(url + "/salinfo/metadata").json()
+                if i % 2
+                else requests.post(url + "/cmd", json=data).json(),
+            ),
+            (
+                "CommanderClient",
+                lambda i: CommanderClient.get("/salinfo/metadata").json()
+                if i % 2
+                else CommanderClient.post("/cmd", data).json(),
+            ),
+        ]
+        print(
+            "{:<20}{:>14}{:>14}{:>14}".format(
+                "implementation", "ms/request", "requests/s", "connections"
+            )
+        )
+        for name, send in implementations:
+            commander.connections = 0
+            with ThreadPoolExecutor(args.threads) as executor:
+                start = time.perf_counter()
+                list(executor.map(send, range(args.requests)))
+                elapsed = time.perf_counter() - start
+            print(
+                "{:<20}{:>14.3f}{:>14.0f}{:>14}".format(
+                    name,
+                    1000 * elapsed * args.threads / args.requests,
+                    args.requests / elapsed,
+                    commander.connections,
+                )
+            )
+    finally:
+        if commander is not None:
+            commander.stop()
+
+
+if __name__ == "__main__":
+    main()
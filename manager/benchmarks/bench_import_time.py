@@ -0,0 +1,117 @@
+"""Benchmark of the time needed to import the manager, as a daphne worker does when it starts.
+
+Runs a new Python process with `-X importtime` several times, importing the ASGI application
+(`manager.asgi`) and the URL configuration (`manager.urls`, loaded on the first HTTP request),
+and prints the median time of the whole import and the cumulative import time of the heaviest modules.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_import_time.py --runs 5 --top 15
+
+Compare the output in different revisions to measure the effect of a change in the imports.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+MANAGER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""Path of the `manager` folder (`string`)"""
+
+BOOT_SCRIPT = """
+import os
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manager.settings")
+import manager.asgi
+import manager.urls
+"""
+"""Script run in every process, it imports what a worker needs to serve its first request (`string`)"""
+
+TRACKED_MODULES = [
+    "astropy",
+    "astropy.time",
+    "erfa",
+    "numpy",
+    "requests",
+    "yaml",
+    "jsonschema",
+    "ldap",
+    "django_auth_ldap",
+    "drf_yasg",
+    "manager.utils",
+    "manager.time_engine",
+    "api.views",
+    "subscription.consumers",
+]
+"""Modules whose import time is always reported, if they are imported (`list` of `string`)"""
+
+
+def run(python):
+    """Import the manager in a new process.
+
+    Parameters
+    ----------
+    python: `string`
+        path of the Python interpreter
+
+    Returns
+    -------
+    `tuple`
+        Wall time of the process in seconds and cumulative import time in microseconds
+        of each module, indexed by module name
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [python, "-X", "importtime", "-c", BOOT_SCRIPT],
+        cwd=MANAGER_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Lines have the form "import time: <self> | <cumulative> | <indented module name>"
+        _, total, name = line.split("|")
+        cumulative[name.strip()] = int(total)
+    return elapsed, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args()
+
+    runs = [run(args.python) for i in range(args.runs)]
+    elapsed = [r[0] for r in runs]
+    modules = {}
+    for _, cumulative in runs:
+        for name, value in cumulative.items():
+            modules.setdefault(name, []).append(value)
+    medians = {name: statistics.median(values) for name, values in modules.items()}
+
+    print(
+        "Process wall time: median {:.3f} s, min {:.3f} s".format(
+            statistics.median(elapsed), min(elapsed)
+        )
+    )
+    print("\nHeaviest top-level modules (cumulative import time):")
+    top_level = [name for name in medians if "." not in name]
+    for name in sorted(top_level, key=medians.get, reverse=True)[: args.top]:
+        print("    {:<32}{:>10.1f} ms".format(name, medians[name] / 1000))
+    print("\nTracked modules (cumulative import time, when imported first by them):")
+    for name in TRACKED_MODULES:
+        if name in medians:
+            print("    {:<32}{:>10.1f} ms".format(name, medians[name] / 1000))
+        else:
+            print("    {:<32}{:>13}".format(name, "not imported"))
+
+
+if __name__ == "__main__":
+    main()
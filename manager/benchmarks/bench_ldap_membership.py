@@ -0,0 +1,97 @@
+"""Benchmark of the love_ops membership check of the first LDAP login of a user.
+
+Uses the stand-in LDAP server of the tests, with simulated connection and search latencies,
+and compares the previous check, which connected and searched the whole group on every login,
+with `LoveOpsMembers`, which pools the connections and caches the members.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_ldap_membership.py --logins 200 --connect-latency 0.02 --latency 0.005
+"""
+import os
+import sys
+import time
+import argparse
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manager.settings")
+
+import django  # noqa: E402
+
+LDAP_URI = "ldap://ipa1.test/"
+"""URI of the stand-in server (`string`)"""
+
+
+def is_member_uncached(username):
+    """Check the membership as `CustomObtainAuthToken.post` did before `LoveOpsMembers`.
+
+    Parameters
+    ----------
+    username: `string`
+        The username
+
+    Returns
+    -------
+    `bool`
+        True if the user is a member of the group, False if not
+    """
+    import ldap
+    from api.ldap_directory import LOVE_OPS_GROUP_DN
+
+    ldap_result = ldap.initialize(LDAP_URI)
+    ldap_result = ldap_result.search_s(LOVE_OPS_GROUP_DN, ldap.SCOPE_SUBTREE)
+    ops_users = list(map(lambda u: u.decode(), ldap_result[0][1]["memberUid"]))
+    return username in ops_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    django.setup()
+    from api.ldap_directory import LoveOpsMembers
+    from api.tests.ldap_server import StandInLDAPServer
+
+    server = StandInLDAPServer(
+        members=["user{}".format(i) for i in range(args.members)],
+        connect_latency=args.connect_latency,
+        latency=args.latency,
+    )
+    usernames = ["user{}".format(i * 7) for i in range(args.logins)]
+    implementations = [
+        ("connect and search per login", is_member_uncached),
+        (
+            "LoveOpsMembers",
+            lambda username: LoveOpsMembers.is_member(LDAP_URI, username),
+        ),
+    ]
+    print(
+        "{:<32}{:>14}{:>14}{:>10}".format(
+            "implementation", "ms/login", "connections", "searches"
+        )
+    )
+    with patch("ldap.initialize", server.initialize):
+        for name, is_member in implementations:
+            server.connections = 0
+            server.requests = 0
+            start = time.perf_counter()
+            for username in usernames:
+                is_member(username)
+            elapsed = time.perf_counter() - start
+            print(
+                "{:<32}{:>14.3f}{:>14}{:>10}".format(
+                    name,
+                    1000 * elapsed / args.logins,
+                    server.connections,
+                    server.requests,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
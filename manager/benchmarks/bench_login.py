@@ -0,0 +1,135 @@
+"""Benchmark of the login (`CustomObtainAuthToken.post`) and validate token responses.
+
+Creates a test database, a user and its selected config file, and measures the median latency
+and the number of queries of the login and validate token requests, with the cached parts of their
+responses (permissions, parsed config and token) cleared before every request and with warm caches.
+Passwords are hashed with a fast hasher, as the default one takes longer than the rest of the login,
+unless `--default-hasher` is given.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_login.py --requests 200 --config-size 2000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "manager.settings")
+
+import django  # noqa: E402
+
+
+def clear_caches():
+    """Clear the caches used to build the login and validate token responses."""
+    from api.signals import clear_user_caches
+    from api.serializers import ConfigFileContentSerializer
+
+    clear_user_caches()
+    ConfigFileContentSerializer._content_cache.clear()
+
+
+def measure(client, method, url, data, requests, cold):
+    """Send requests and measure their latency and queries.
+
+    Parameters
+    ----------
+    client: `APIClient`
+        the client that sends the requests
+    method: `string`
+        "get" or "post"
+    url: `string`
+        the URL of the requests
+    data: `dict`
+        the data of the requests
+    requests: `int`
+        number of requests
+    cold: `bool`
+        True to clear the caches before every request
+
+    Returns
+    -------
+    `tuple`
+        Median latency in milliseconds and median number of queries per request
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies = []
+    queries = []
+    for i in range(requests):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data, format="json")
+            latencies.append(1000 * (time.perf_counter() - start))
+        assert response.status_code == 200, response.status_code
+        queries.append(len(context.captured_queries))
+    return statistics.median(latencies), statistics.median(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--config-size", type=int, default=2000, help="keys")
+    parser.add_argument("--default-hasher", action="store_true")
+    args = parser.parse_args()
+
+    django.setup()
+    from django.conf import settings
+    from django.core.files.base import ContentFile
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.contrib.auth.models import User, Permission
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from api.models import ConfigFile, Token
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    if not args.default_hasher:
+        settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+    user = User.objects.create_user(username="user", password="password")
+    user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+    content = {"key{}".format(i): {"value": i} for i in range(args.config_size)}
+    config = ConfigFile.objects.create(
+        user=user,
+        config_file=ContentFile(json.dumps(content).encode("ascii"), name="bench"),
+        file_name="bench.json",
+    )
+    config.selected_by_users.add(user)
+
+    client = APIClient()
+    login_data = {"username": "user", "password": "password"}
+    token = Token.objects.create(user=user)
+    validate_client = APIClient()
+    validate_client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+
+    cases = [
+        ("login", client, "post", reverse("login"), login_data),
+        ("validate token", validate_client, "get", reverse("validate-token"), None),
+    ]
+    print(
+        "{:<20}{:>8}{:>16}{:>10}".format("request", "caches", "latency [ms]", "queries")
+    )
+    for name, case_client, method, url, data in cases:
+        for cold in (True, False):
+            latency, queries = measure(
+                case_client, method, url, data, args.requests, cold
+            )
+            print(
+                "{:<20}{:>8}{:>16.3f}{:>10.0f}".format(
+                    name, "cold" if cold else "warm", latency, queries
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
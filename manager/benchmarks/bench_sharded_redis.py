@@ -0,0 +1,140 @@
+"""Benchmark of the throughput of the sharded Redis Channel Layer with 1, 2 and 4 Redis servers.
+
+Starts the Redis servers locally, and several processes sending messages to many groups,
+as the producers do with the telemetry of the CSCs.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_sharded_redis.py --redis-server /usr/bin/redis-server --senders 8
+
+The groups are read by no one, so this measures the write throughput of the Redis servers.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subscription.layers.sharded import ShardedRedisStreamsChannelLayer  # noqa: E402
+from subscription.metrics import Metrics  # noqa: E402
+
+
+def start_redis(redis_server, port):
+    """Start a Redis server without persistence and wait until it accepts connections.
+
+    Parameters
+    ----------
+    redis_server: `string`
+        path of the redis-server executable
+    port: `int`
+        port of the server
+
+    Returns
+    -------
+    `subprocess.Popen`
+        The process of the server
+    """
+    process = subprocess.Popen(
+        [redis_server, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+    )
+    for i in range(50):
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Redis did not start on port {}".format(port))
+
+
+def send(ports, groups, messages, queue):
+    """Send messages to the groups, spread over the Redis servers. Runs in a separate process.
+
+    Parameters
+    ----------
+    ports: `list` of `int`
+        ports of the Redis servers
+    groups: `int`
+        number of groups
+    messages: `int`
+        number of messages to send
+    queue: `multiprocessing.Queue`
+        queue where the messages sent to each shard are reported
+    """
+
+    async def run():
+        layer = ShardedRedisStreamsChannelLayer(
+            hosts=[("localhost", port) for port in ports]
+        )
+        names = ["telemetry-ATMCS-0-stream{}".format(i) for i in range(groups)]
+        message = {
+            "type": "subscription_data",
+            "data": {"value": {"value": [0.1] * 10, "dataType": "Array"}},
+        }
+        pending = []
+        for i in range(messages):
+            pending.append(layer.group_send(names[i % groups], message))
+            if len(pending) == 50:
+                await asyncio.gather(*pending)
+                pending = []
+        await asyncio.gather(*pending)
+        await layer.close_pools()
+
+    asyncio.run(run())
+    queue.put(Metrics.get("channel_layer_shard_messages"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-server", default="redis-server")
+    parser.add_argument("--base-port", type=int, default=7000)
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=256)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("{:<8}{:>12}{:>14}   {}".format("shards", "time [s]", "msg/s", "per shard"))
+    for shards in (1, 2, 4):
+        ports = [args.base_port + i for i in range(shards)]
+        servers = [start_redis(args.redis_server, port) for port in ports]
+        try:
+            queue = multiprocessing.Queue()
+            senders = [
+                multiprocessing.Process(
+                    target=send, args=(ports, args.groups, args.messages, queue)
+                )
+                for i in range(args.senders)
+            ]
+            start = time.perf_counter()
+            for sender in senders:
+                sender.start()
+            per_shard = {}
+            for sender in senders:
+                for shard, count in queue.get().items():
+                    per_shard[shard] = per_shard.get(shard, 0) + count
+            for sender in senders:
+                sender.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+        total = args.senders * args.messages
+        print(
+            "{:<8}{:>12.2f}{:>14.0f}   {}".format(
+                shards,
+                elapsed,
+                total / elapsed,
+                " ".join(str(per_shard.get(n, 0)) for n in sorted(per_shard)),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
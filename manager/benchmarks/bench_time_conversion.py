@@ -0,0 +1,92 @@
+"""Benchmark of the batch conversion of timestamps with `manager.utils.convert_times`.
+
+Converts 1e3, 1e5 and 1e6 UTC timestamps, spread over one hour (as in a plot) and over `--span` days,
+and compares the time per timestamp with a conversion one timestamp at a time with astropy,
+as `manager.utils.get_times` did before the `TimeEngine`.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_time_conversion.py --span 30
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from astropy.time import Time  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def convert_one_by_one(timestamps):
+    """Convert timestamps one at a time with astropy.
+
+    Parameters
+    ----------
+    timestamps: `numpy.ndarray`
+        UTC unix timestamps (seconds)
+
+    Returns
+    -------
+    `list` of `float`
+        The apparent sidereal times in Greenwich (hourangles)
+    """
+    results = []
+    for utc in timestamps:
+        t = Time(utc, format="unix", scale="utc")
+        t.tai.datetime.timestamp()
+        t.mjd
+        results.append(
+            t.sidereal_time("apparent", longitude="greenwich", model=None).value
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--span", type=float, default=30, help="days")
+    parser.add_argument("--one-by-one", type=int, default=200)
+    parser.add_argument("--refresh-interval", type=float, default=600)
+    args = parser.parse_args()
+
+    settings.configure(TIME_ENGINE_REFRESH_INTERVAL=args.refresh_interval)
+    from manager import utils
+
+    start_utc = time.time()
+    utils.convert_times([start_utc])
+
+    timestamps = start_utc + np.linspace(0, 3600, args.one_by_one)
+    start = time.perf_counter()
+    convert_one_by_one(timestamps)
+    elapsed = time.perf_counter() - start
+    print(
+        "astropy one by one: {:.2f} us/timestamp".format(
+            1e6 * elapsed / len(timestamps)
+        )
+    )
+
+    print(
+        "{:<10}{:>12}{:>16}{:>16}{:>18}".format(
+            "points", "span [d]", "convert [s]", "us/timestamp", "with JSON [s]"
+        )
+    )
+    for points in (1000, 100000, 1000000):
+        for span in (1 / 24, args.span):
+            timestamps = start_utc + np.linspace(0, span * 86400, points)
+            start = time.perf_counter()
+            result = utils.convert_times(timestamps)
+            converted = time.perf_counter() - start
+            json.dumps({key: value.tolist() for key, value in result.items()})
+            encoded = time.perf_counter() - start
+            print(
+                "{:<10}{:>12.2f}{:>16.3f}{:>16.2f}{:>18.3f}".format(
+                    points, span, converted, 1e6 * converted / points, encoded
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
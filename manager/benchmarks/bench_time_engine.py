@@ -0,0 +1,102 @@
+"""Benchmark of the computation of the time data with astropy and with the `TimeEngine`.
+
+Measures the time per call of the previous implementation of `manager.utils.get_times`,
+which computed everything with astropy, and of the `TimeEngine`, with its corrections refreshed
+every `--refresh-interval` seconds of simulated time, and prints the largest differences between both.
+
+Usage, from the `manager` folder::
+
+    python benchmarks/bench_time_engine.py --calls 200
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from astropy.time import Time  # noqa: E402
+from astropy.units import hour  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def get_times_astropy(utc):
+    """Return the time data computed with astropy, as `manager.utils.get_times` did before the `TimeEngine`.
+
+    Parameters
+    ----------
+    utc: `float`
+        time in UTC scale as a unix timestamp (seconds)
+
+    Returns
+    -------
+    `dict`
+        The time data
+    """
+    t = Time(utc, format="unix", scale="utc")
+    t_utc = t.datetime.timestamp()
+    t_tai = t.tai.datetime.timestamp()
+    shifted_iso = (t.tai - 12 * hour).iso
+    observing_day = shifted_iso[0:10].replace("-", "")
+    sidereal_summit = t.sidereal_time("apparent", longitude=-70.749417, model=None)
+    sidereal_greenwich = t.sidereal_time("apparent", longitude="greenwich", model=None)
+    return {
+        "utc": t_utc,
+        "tai": t_tai,
+        "mjd": t.mjd,
+        "observing_day": observing_day,
+        "sidereal_summit": sidereal_summit.value,
+        "sidereal_greenwich": sidereal_greenwich.value,
+        "tai_to_utc": t_utc - t_tai,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--refresh-interval", type=float, default=600)
+    args = parser.parse_args()
+
+    settings.configure(TIME_ENGINE_REFRESH_INTERVAL=args.refresh_interval)
+    from manager.time_engine import TimeEngine
+
+    # Calls are spread over a simulated day, so the engine refreshes its corrections as in production
+    start_utc = time.time()
+    step = 86400 / args.calls
+    timestamps = [start_utc + i * step for i in range(args.calls)]
+    get_times_astropy(start_utc)
+    TimeEngine.get_times(start_utc)
+    TimeEngine.reset()
+
+    start = time.perf_counter()
+    reference = [get_times_astropy(utc) for utc in timestamps]
+    astropy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [TimeEngine.get_times(utc) for utc in timestamps]
+    engine_time = time.perf_counter() - start
+
+    # The engine without refreshes, i.e. calls within the refresh interval
+    start = time.perf_counter()
+    for i in range(args.calls):
+        TimeEngine.get_times(start_utc + i * 1e-3)
+    cached_time = time.perf_counter() - start
+
+    print("{:<40}{:>14}".format("implementation", "time [ms/call]"))
+    print("{:<40}{:>14.4f}".format("astropy", 1000 * astropy_time / args.calls))
+    print(
+        "{:<40}{:>14.4f}".format("TimeEngine, one day", 1000 * engine_time / args.calls)
+    )
+    print(
+        "{:<40}{:>14.4f}".format(
+            "TimeEngine, within refresh interval", 1000 * cached_time / args.calls
+        )
+    )
+    print("Largest differences with astropy:")
+    for key in ["mjd", "sidereal_summit", "sidereal_greenwich"]:
+        difference = max(abs(r[key] - e[key]) for r, e in zip(reference, results))
+        print("    {:<20}{:.3e}".format(key, difference))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
-"""Defines the rules for routing of channels messages (websockets) in the whole project."""
+"""Defines the rules for routing of channels messages (websockets) and HTTP requests in the whole project."""
+from django.core.asgi import get_asgi_application
+from django.urls import re_path
 from channels.routing import ProtocolTypeRouter, URLRouter
+import api.routing
 import subscription.routing
 
 application = ProtocolTypeRouter(
-    {"websocket": URLRouter(subscription.routing.websocket_urlpatterns)}
+    {
+        "http": URLRouter(
+            api.routing.http_urlpatterns + [re_path(r"", get_asgi_application())]
+        ),
+        "websocket": URLRouter(subscription.routing.websocket_urlpatterns),
+    }
 )
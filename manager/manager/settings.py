@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 import ldap
+import tempfile
 from django_auth_ldap.config import LDAPSearch
 
 # Quick-start development settings - unsuitable for production
@@ -172,6 +173,72 @@ REST_FRAMEWORK = {
 TOKEN_EXPIRED_AFTER_DAYS = 30
 """Duration of users tokens, in days (`int`)"""
 
+TOKEN_AUTH_CACHE_TTL = float(os.environ.get("TOKEN_AUTH_CACHE_TTL", 10))
+"""Time (in seconds) the user and permissions of a token are kept in the authentication cache of each process.
+Changes made in other processes are seen after this time at most.
+Read from the `TOKEN_AUTH_CACHE_TTL` environment variable (`float`)"""
+
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 1024))
+"""Maximum number of tokens kept in the authentication cache of each process.
+Read from the `TOKEN_AUTH_CACHE_SIZE` environment variable (`int`)"""
+
+VALIDATE_TOKEN_CACHE_TTL = float(os.environ.get("VALIDATE_TOKEN_CACHE_TTL", 10))
+"""Time (in seconds) the responses of the validate token endpoint are cached in each process.
+Read from the `VALIDATE_TOKEN_CACHE_TTL` environment variable (`float`)"""
+
+USER_PERMISSIONS_CACHE_TTL = float(os.environ.get("USER_PERMISSIONS_CACHE_TTL", 30))
+"""Time (in seconds) the permissions included in the login and token responses are cached in each process.
+Read from the `USER_PERMISSIONS_CACHE_TTL` environment variable (`float`)"""
+
+TOKEN_SWEEP_BATCH_SIZE = int(os.environ.get("TOKEN_SWEEP_BATCH_SIZE", 1000))
+"""Maximum number of expired tokens deleted per query by the `TokenSweeper`.
+Read from the `TOKEN_SWEEP_BATCH_SIZE` environment variable (`int`)"""
+
+LOGOUT_DISPATCH_BATCH_SIZE = int(os.environ.get("LOGOUT_DISPATCH_BATCH_SIZE", 100))
+"""Maximum number of logout messages sent concurrently by the `LogoutDispatcher`.
+Read from the `LOGOUT_DISPATCH_BATCH_SIZE` environment variable (`int`)"""
+
+# LOVE-Commander
+COMMANDER_HOSTNAME = os.environ.get("COMMANDER_HOSTNAME", "localhost")
+"""Hostname of the LOVE-Commander. Read from the `COMMANDER_HOSTNAME` environment variable (`string`)"""
+
+COMMANDER_PORT = os.environ.get("COMMANDER_PORT", "5000")
+"""Port of the LOVE-Commander. Read from the `COMMANDER_PORT` environment variable (`string`)"""
+
+COMMANDER_CONNECT_TIMEOUT = float(os.environ.get("COMMANDER_CONNECT_TIMEOUT", 3))
+"""Timeout (in seconds) to connect to the LOVE-Commander.
+Read from the `COMMANDER_CONNECT_TIMEOUT` environment variable (`float`)"""
+
+COMMANDER_READ_TIMEOUT = float(os.environ.get("COMMANDER_READ_TIMEOUT", 60))
+"""Timeout (in seconds) to wait for the LOVE-Commander responses, EFD queries can take long.
+Read from the `COMMANDER_READ_TIMEOUT` environment variable (`float`)"""
+
+COMMANDER_RETRIES = int(os.environ.get("COMMANDER_RETRIES", 2))
+"""Number of retries of the LOVE-Commander requests. GET requests are retried on connection and read errors,
+other requests only when the connection fails. Read from the `COMMANDER_RETRIES` environment variable (`int`)"""
+
+COMMANDER_POOL_SIZE = int(os.environ.get("COMMANDER_POOL_SIZE", 10))
+"""Maximum number of idle keep-alive connections to the LOVE-Commander.
+Read from the `COMMANDER_POOL_SIZE` environment variable (`int`)"""
+
+COMMANDER_METADATA_CACHE_TTL = float(os.environ.get("COMMANDER_METADATA_CACHE_TTL", 300))
+"""Time (in seconds) after which the cached LOVE-Commander metadata (SalInfo, docstrings and EFD clients) is refreshed.
+Read from the `COMMANDER_METADATA_CACHE_TTL` environment variable (`float`)"""
+
+COMMANDER_METADATA_STALE_TTL = float(
+    os.environ.get("COMMANDER_METADATA_STALE_TTL", 3600)
+)
+"""Time (in seconds) after the TTL during which the cached LOVE-Commander metadata is still served
+while it is refreshed in the background. Read from the `COMMANDER_METADATA_STALE_TTL` environment variable (`float`)"""
+
+EFD_TIMESERIES_CACHE_SIZE = float(os.environ.get("EFD_TIMESERIES_CACHE_SIZE", 64))
+"""Maximum memory (in megabytes) used by the cached EFD timeseries points, the least recently used
+series are discarded beyond it. Read from the `EFD_TIMESERIES_CACHE_SIZE` environment variable (`float`)"""
+
+EFD_TIMESERIES_SETTLE_TIME = float(os.environ.get("EFD_TIMESERIES_SETTLE_TIME", 10))
+"""Time (in seconds) during which recent EFD timeseries points are not cached, as late data can still be written.
+Read from the `EFD_TIMESERIES_SETTLE_TIME` environment variable (`float`)"""
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
@@ -208,32 +275,179 @@ REDIS_PORT = os.environ.get("REDIS_PORT", "6379")
 REDIS_PASS = os.environ.get("REDIS_PASS", False)
 REDIS_CONFIG_EXPIRY = int(os.environ.get("REDIS_CONFIG_EXPIRY", 60))
 REDIS_CONFIG_CAPACITY = int(os.environ.get("REDIS_CONFIG_CAPACITY", 100))
-if REDIS_HOST and not TESTING:
+CHANNEL_LAYER_GROUP_CAPACITY = {
+    "*-all": int(os.environ.get("REDIS_CONFIG_ALL_CAPACITY", 500)),
+}
+"""Capacity of the channels for the messages sent to some groups, indexed by group name pattern.
+The subscriptions to "all" streams get a larger buffer than the single streams, which use `REDIS_CONFIG_CAPACITY`.
+Read from the `REDIS_CONFIG_ALL_CAPACITY` environment variable.
+Only used by the layers of `subscription.layers` that extend `CapacityRulesMixin` (`dict`)"""
+
+CHANNEL_LAYER_CHANNEL_CAPACITY = {
+    "*-telemetry": int(
+        os.environ.get("REDIS_CONFIG_TELEMETRY_CAPACITY", REDIS_CONFIG_CAPACITY)
+    ),
+}
+"""Capacity of the channels, indexed by channel name pattern, e.g. for the telemetry lanes of the consumers.
+Read from the `REDIS_CONFIG_TELEMETRY_CAPACITY` environment variable (`dict`)"""
+
+IN_MEMORY_CHANNEL_LAYER_BACKEND = os.environ.get(
+    "IN_MEMORY_CHANNEL_LAYER_BACKEND", "subscription.layers.memory.LocalChannelLayer"
+)
+"""Backend of the Channel Layer used when there is no Redis, i.e. when the manager runs in a single process.
+Either `subscription.layers.memory.LocalChannelLayer` or `channels.layers.InMemoryChannelLayer`.
+Read from the `IN_MEMORY_CHANNEL_LAYER_BACKEND` environment variable (`string`)"""
+
+REDIS_CHANNEL_LAYER_BACKEND = os.environ.get(
+    "REDIS_CHANNEL_LAYER_BACKEND",
+    "subscription.layers.redis.EncryptOnceRedisChannelLayer",
+)
+"""Backend of the Channel Layer used when there is Redis.
+Either `subscription.layers.redis.EncryptOnceRedisChannelLayer`,
+`subscription.layers.redis_streams.RedisStreamsChannelLayer`, or their versions with consistent hashing of groups
+over `REDIS_HOSTS`: `subscription.layers.sharded.ShardedRedisChannelLayer` and
+`subscription.layers.sharded.ShardedRedisStreamsChannelLayer`.
+Read from the `REDIS_CHANNEL_LAYER_BACKEND` environment variable (`string`)"""
+
+REDIS_STREAMS_REPLAY_DEPTH = int(os.environ.get("REDIS_STREAMS_REPLAY_DEPTH", 100))
+"""Maximum number of messages kept in the stream of each group by the `RedisStreamsChannelLayer`,
+i.e. how many messages a process can recover after being disconnected from Redis.
+Read from the `REDIS_STREAMS_REPLAY_DEPTH` environment variable (`int`)"""
+
+REDIS_STREAMS_CATEGORY_REPLAY_DEPTH = {
+    "event": int(os.environ.get("REDIS_STREAMS_EVENT_REPLAY_DEPTH", 100)),
+    "telemetry": int(os.environ.get("REDIS_STREAMS_TELEMETRY_REPLAY_DEPTH", 10)),
+}
+"""Maximum number of messages kept in the stream of each group by the `RedisStreamsChannelLayer`,
+indexed by category. Read from the `REDIS_STREAMS_<CATEGORY>_REPLAY_DEPTH` environment variables (`dict`)"""
+
+REDIS_HOSTS = [
+    host.strip()
+    for host in os.environ.get("REDIS_HOSTS", "").split(",")
+    if host.strip()
+]
+"""List of Redis hosts ("<host>:<port>") used by the Channel Layer, to spread the load of the groups over them.
+Read from the `REDIS_HOSTS` environment variable as a comma separated list.
+If empty, `REDIS_HOST` and `REDIS_PORT` are used (`list` of `string`)"""
+
+CHANNEL_LAYER_ENCRYPTION = not os.environ.get("NO_CHANNEL_LAYER_ENCRYPTION", False)
+"""Define wether or not the messages sent through Redis are encrypted with the `SECRET_KEY`.
+Encryption can be turned off in trusted networks by defining the `NO_CHANNEL_LAYER_ENCRYPTION`
+environment variable (`bool`)"""
+
+if (REDIS_HOST or REDIS_HOSTS) and not TESTING:
     CHANNEL_LAYERS = {
         "default": {
-            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "BACKEND": REDIS_CHANNEL_LAYER_BACKEND,
             "CONFIG": {
                 "hosts": [
-                    "redis://:"
-                    + REDIS_PASS
-                    + "@"
-                    + REDIS_HOST
-                    + ":"
-                    + REDIS_PORT
-                    + "/0"
+                    "redis://:" + REDIS_PASS + "@" + host + "/0"
+                    for host in (REDIS_HOSTS or [REDIS_HOST + ":" + REDIS_PORT])
                 ],
                 "expiry": REDIS_CONFIG_EXPIRY,
                 "capacity": REDIS_CONFIG_CAPACITY,
-                "symmetric_encryption_keys": [SECRET_KEY],
+                "channel_capacity": CHANNEL_LAYER_CHANNEL_CAPACITY,
+                "symmetric_encryption_keys": (
+                    [SECRET_KEY] if CHANNEL_LAYER_ENCRYPTION else None
+                ),
             },
         },
     }
     """Django Channels Channel Layer configuration (`dict`)"""
+    if REDIS_CHANNEL_LAYER_BACKEND.endswith("StreamsChannelLayer"):
+        CHANNEL_LAYERS["default"]["CONFIG"].update(
+            {
+                "replay_depth": REDIS_STREAMS_REPLAY_DEPTH,
+                "category_replay_depth": REDIS_STREAMS_CATEGORY_REPLAY_DEPTH,
+            }
+        )
+    elif REDIS_CHANNEL_LAYER_BACKEND.startswith("subscription.layers"):
+        CHANNEL_LAYERS["default"]["CONFIG"][
+            "group_capacity"
+        ] = CHANNEL_LAYER_GROUP_CAPACITY
 
 else:
     CHANNEL_LAYERS = {
-        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+        "default": {"BACKEND": IN_MEMORY_CHANNEL_LAYER_BACKEND},
     }
+    if IN_MEMORY_CHANNEL_LAYER_BACKEND.startswith("subscription.layers"):
+        CHANNEL_LAYERS["default"]["CONFIG"] = {
+            "expiry": REDIS_CONFIG_EXPIRY,
+            "capacity": REDIS_CONFIG_CAPACITY,
+            "channel_capacity": CHANNEL_LAYER_CHANNEL_CAPACITY,
+            "group_capacity": CHANNEL_LAYER_GROUP_CAPACITY,
+        }
+
+SUBSCRIPTION_INDEX_ANNOUNCE_INTERVAL = float(
+    os.environ.get("SUBSCRIPTION_INDEX_ANNOUNCE_INTERVAL", 5)
+)
+"""Interval (in seconds) between the announcements of the subscriptions of each process
+to the other processes sharing the Channel Layer. Read from the `SUBSCRIPTION_INDEX_ANNOUNCE_INTERVAL`
+environment variable (`float`)"""
+
+INTEREST_FEEDBACK_INTERVAL = float(os.environ.get("INTEREST_FEEDBACK_INTERVAL", 0.5))
+"""Interval (in seconds) between the notifications of the changes of the interest set
+(the streams with at least one subscriber) to the producers. Read from the `INTEREST_FEEDBACK_INTERVAL`
+environment variable (`float`)"""
+
+TELEMETRY_LANE_CAPACITY = int(os.environ.get("TELEMETRY_LANE_CAPACITY", 100))
+"""Maximum number of telemetry messages waiting to be sent to each websocket client,
+older messages are dropped when it is reached. Read from the `TELEMETRY_LANE_CAPACITY`
+environment variable (`int`)"""
+
+SLOW_CLIENT_MAX_DELAY = float(os.environ.get("SLOW_CLIENT_MAX_DELAY", 5))
+"""Maximum time (in seconds) a telemetry message can wait to be written to a websocket client
+before the client is considered slow.
+Read from the `SLOW_CLIENT_MAX_DELAY` environment variable (`float`)"""
+
+SLOW_CLIENT_MAX_QUEUE_DEPTH = int(os.environ.get("SLOW_CLIENT_MAX_QUEUE_DEPTH", 50))
+"""Maximum number of telemetry messages waiting to be sent to a websocket client, in its telemetry lane
+and its telemetry outbox, before it is considered slow.
+Read from the `SLOW_CLIENT_MAX_QUEUE_DEPTH` environment variable (`int`)"""
+
+SLOW_CLIENT_GRACE_PERIOD = float(os.environ.get("SLOW_CLIENT_GRACE_PERIOD", 30))
+"""Time (in seconds) a slow client can stay behind in reduced-rate mode before being closed.
+Read from the `SLOW_CLIENT_GRACE_PERIOD` environment variable (`float`)"""
+
+SLOW_CLIENT_REDUCED_RATE_INTERVAL = float(
+    os.environ.get("SLOW_CLIENT_REDUCED_RATE_INTERVAL", 1)
+)
+"""Interval (in seconds) between the telemetry messages sent to slow clients in reduced-rate mode.
+Read from the `SLOW_CLIENT_REDUCED_RATE_INTERVAL` environment variable (`float`)"""
+
+SLOW_CLIENT_CHECK_INTERVAL = float(os.environ.get("SLOW_CLIENT_CHECK_INTERVAL", 1))
+"""Interval (in seconds) between the checks of the websocket clients that are not reading their messages.
+Read from the `SLOW_CLIENT_CHECK_INTERVAL` environment variable (`float`)"""
+
+CLIENT_OUTBOX_CAPACITY = int(os.environ.get("CLIENT_OUTBOX_CAPACITY", 100))
+"""Maximum number of telemetry messages waiting to be written to each websocket client, once it is reached
+the consumer waits before queueing more. Other messages are not limited.
+Read from the `CLIENT_OUTBOX_CAPACITY` environment variable (`int`)"""
+
+TIME_ENGINE_REFRESH_INTERVAL = float(
+    os.environ.get("TIME_ENGINE_REFRESH_INTERVAL", 600)
+)
+"""Interval (in seconds) between the refreshes of the corrections of the `TimeEngine` (leap seconds,
+nutation and UT1-UTC) computed with astropy. Read from the `TIME_ENGINE_REFRESH_INTERVAL`
+environment variable (`float`)"""
+
+TIME_DATA_BROADCAST_INTERVAL = float(os.environ.get("TIME_DATA_BROADCAST_INTERVAL", 1))
+"""Interval (in seconds) between the refreshes of the time data of each process,
+and between the frames sent to the clients subscribed to the time_data group.
+Read from the `TIME_DATA_BROADCAST_INTERVAL` environment variable (`float`)"""
+
+TIME_DATA_LOCK_FILE = os.environ.get(
+    "TIME_DATA_LOCK_FILE",
+    os.path.join(tempfile.gettempdir(), "love-manager-time-data.lock"),
+)
+"""Path of the file locked by the process that broadcasts the time data in each node, when the
+Channel Layer is shared. Read from the `TIME_DATA_LOCK_FILE` environment variable (`string`)"""
+
+TIME_CONVERSION_MAX_TIMESTAMPS = int(
+    os.environ.get("TIME_CONVERSION_MAX_TIMESTAMPS", 100000)
+)
+"""Maximum number of timestamps converted per request by the time conversion endpoint.
+Read from the `TIME_CONVERSION_MAX_TIMESTAMPS` environment variable (`int`)"""
 
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
@@ -257,26 +471,56 @@ AUTH_LDAP_USER_ATTR_MAP = {
     "last_name": "sn",
     "email": "mail",
 }
+
+LDAP_POOL_SIZE = int(os.environ.get("LDAP_POOL_SIZE", 4))
+"""Maximum number of idle connections kept per LDAP server.
+Read from the `LDAP_POOL_SIZE` environment variable (`int`)"""
+
+LDAP_LOVE_OPS_CACHE_TTL = float(os.environ.get("LDAP_LOVE_OPS_CACHE_TTL", 300))
+"""Time (in seconds) after which the cached members of the love_ops LDAP group are refreshed in the background.
+Read from the `LDAP_LOVE_OPS_CACHE_TTL` environment variable (`float`)"""
+
+LDAP_CONNECT_TIMEOUT = float(os.environ.get("LDAP_CONNECT_TIMEOUT", 2))
+"""Timeout (in seconds) to connect to an LDAP server.
+Read from the `LDAP_CONNECT_TIMEOUT` environment variable (`float`)"""
+
+LDAP_TIMEOUT = float(os.environ.get("LDAP_TIMEOUT", 5))
+"""Timeout (in seconds) of the operations on an LDAP server.
+Read from the `LDAP_TIMEOUT` environment variable (`float`)"""
+
+LDAP_CONNECTION_OPTIONS = {
+    ldap.OPT_NETWORK_TIMEOUT: LDAP_CONNECT_TIMEOUT,
+    ldap.OPT_TIMEOUT: LDAP_TIMEOUT,
+}
+"""Options of the connections to the LDAP servers (`dict`)"""
+
+LDAP_HEALTH_PROBE_INTERVAL = float(os.environ.get("LDAP_HEALTH_PROBE_INTERVAL", 10))
+"""Interval (in seconds) between the connection attempts to an unhealthy LDAP server.
+Read from the `LDAP_HEALTH_PROBE_INTERVAL` environment variable (`float`)"""
+
 if AUTH_LDAP_3_SERVER_URI:
-    AUTHENTICATION_BACKENDS.insert(0, "api.views.IPABackend3")
     AUTH_LDAP_3_BIND_DN = AUTH_LDAP_BIND_DN
     AUTH_LDAP_3_BIND_PASSWORD = AUTH_LDAP_BIND_PASSWORD
     AUTH_LDAP_3_USER_SEARCH = AUTH_LDAP_USER_SEARCH
     AUTH_LDAP_3_USER_ATTR_MAP = AUTH_LDAP_USER_ATTR_MAP
+    AUTH_LDAP_3_CONNECTION_OPTIONS = LDAP_CONNECTION_OPTIONS
 
 if AUTH_LDAP_2_SERVER_URI:
-    AUTHENTICATION_BACKENDS.insert(0, "api.views.IPABackend2")
     AUTH_LDAP_2_BIND_DN = AUTH_LDAP_BIND_DN
     AUTH_LDAP_2_BIND_PASSWORD = AUTH_LDAP_BIND_PASSWORD
     AUTH_LDAP_2_USER_SEARCH = AUTH_LDAP_USER_SEARCH
     AUTH_LDAP_2_USER_ATTR_MAP = AUTH_LDAP_USER_ATTR_MAP
+    AUTH_LDAP_2_CONNECTION_OPTIONS = LDAP_CONNECTION_OPTIONS
 
 if AUTH_LDAP_1_SERVER_URI:
-    AUTHENTICATION_BACKENDS.insert(0, "api.views.IPABackend1")
     AUTH_LDAP_1_BIND_DN = AUTH_LDAP_BIND_DN
     AUTH_LDAP_1_BIND_PASSWORD = AUTH_LDAP_BIND_PASSWORD
     AUTH_LDAP_1_USER_SEARCH = AUTH_LDAP_USER_SEARCH
     AUTH_LDAP_1_USER_ATTR_MAP = AUTH_LDAP_USER_ATTR_MAP
+    AUTH_LDAP_1_CONNECTION_OPTIONS = LDAP_CONNECTION_OPTIONS
+
+if AUTH_LDAP_1_SERVER_URI or AUTH_LDAP_2_SERVER_URI or AUTH_LDAP_3_SERVER_URI:
+    AUTHENTICATION_BACKENDS.insert(0, "api.views.IPAFailoverBackend")
 
 TRACE_TIMESTAMPS = True
 """Define wether or not to add tracing timestamps to websocket messages.
@@ -0,0 +1,284 @@
+"""Defines the engine that computes the time data sent to the clients."""
+import time
+from django.conf import settings
+
+SECONDS_PER_DAY = 86400.0
+"""Number of seconds in a day (`float`)"""
+
+UNIX_EPOCH_MJD = 40587.0
+"""Modified julian date of the unix epoch, 1970-01-01T00:00:00 UTC (`float`)"""
+
+J2000_UNIX_DAYS = 10957.5
+"""Days between the unix epoch and J2000.0, 2000-01-01T12:00:00 (`float`)"""
+
+TT_MINUS_TAI = 32.184
+"""Difference in seconds between TT and TAI (`float`)"""
+
+SUMMIT_LONGITUDE = -70.749417
+"""Longitude of the summit in degrees, positive to the east (`float`)"""
+
+
+class TimeEngine:
+    """Compute the time data of `manager.utils.get_times` with closed-form NumPy expressions.
+
+    Computing the apparent sidereal time with astropy takes milliseconds, because it evaluates
+    the full precession-nutation model every time. The engine evaluates astropy only when its
+    corrections are refreshed, and in between computes:
+
+    - TAI from UTC with the cached TAI-UTC offset (leap seconds).
+    - The MJD directly from the unix timestamp.
+    - The Greenwich mean sidereal time with the IAU 2006 expression (Earth rotation angle plus
+      the precession polynomial), to which the cached correction is added to obtain the apparent
+      sidereal time. The correction is the difference with astropy at the time of the refresh,
+      i.e. the equation of the equinoxes and UT1-UTC, which change by milliseconds per day.
+
+    The corrections are refreshed every `TIME_ENGINE_REFRESH_INTERVAL` seconds,
+    and at every midnight UTC, when leap seconds are introduced.
+
+    The functions accept NumPy arrays of timestamps as well as single timestamps.
+    astropy, erfa and NumPy are only imported when the corrections are first refreshed,
+    given that importing astropy takes a large part of the start up time of the manager.
+    """
+
+    _state = None
+    """Tuple of (refreshed at, valid until, TAI-UTC offset in seconds,
+    sidereal time correction in hours) (`tuple`)"""
+
+    @classmethod
+    def get_times(cls, utc=None):
+        """Return relevant time measures, see `manager.utils.get_times`.
+
+        Parameters
+        ----------
+        utc: `float`
+            time in UTC scale as a unix timestamp (seconds), the current time if None
+
+        Returns
+        -------
+        `dict`
+            Dictionary with the utc, tai, mjd, observing_day, sidereal_summit,
+            sidereal_greenwich and tai_to_utc keys
+        """
+        if utc is None:
+            utc = time.time()
+        tai_offset, correction = cls.get_corrections(utc)
+        tai = utc + tai_offset
+        sidereal_greenwich = cls.get_sidereal_time(utc, tai_offset, correction)
+        return {
+            "utc": float(utc),
+            "tai": float(tai),
+            "mjd": float(cls.get_mjd(utc)),
+            "observing_day": time.strftime("%Y%m%d", time.gmtime(tai - 12 * 3600)),
+            "sidereal_summit": float((sidereal_greenwich + SUMMIT_LONGITUDE / 15) % 24),
+            "sidereal_greenwich": float(sidereal_greenwich),
+            "tai_to_utc": -float(tai_offset),
+        }
+
+    @classmethod
+    def get_tai_to_utc(cls, utc=None):
+        """Return the difference in seconds between TAI and UTC timestamps.
+
+        Parameters
+        ----------
+        utc: `float`
+            time in UTC scale as a unix timestamp (seconds), the current time if None
+
+        Returns
+        -------
+        `float`
+            The number of seconds of difference between TAI and UTC times
+        """
+        if utc is None:
+            utc = time.time()
+        return -float(cls.get_corrections(utc)[0])
+
+    @classmethod
+    def get_corrections(cls, utc):
+        """Return the cached corrections, refreshing them if they are no longer valid.
+
+        Parameters
+        ----------
+        utc: `float`
+            time in UTC scale as a unix timestamp (seconds)
+
+        Returns
+        -------
+        `tuple`
+            The TAI-UTC offset in seconds and the sidereal time correction in hours
+        """
+        state = cls._state
+        if state is None or not state[0] <= utc < state[1]:
+            state = cls.refresh(utc)
+        return state[2], state[3]
+
+    @classmethod
+    def refresh(cls, utc):
+        """Compute the corrections with astropy.
+
+        Parameters
+        ----------
+        utc: `float`
+            time in UTC scale as a unix timestamp (seconds)
+
+        Returns
+        -------
+        `tuple`
+            The new state, (refreshed at, valid until, TAI-UTC offset in seconds,
+            sidereal time correction in hours)
+        """
+        from astropy.time import Time
+
+        t = Time(utc, format="unix", scale="utc")
+        # Converting to TAI makes astropy update the leap seconds table used by erfa
+        t.tai
+        tai_offset = float(cls.get_tai_offset(utc))
+        apparent = t.sidereal_time("apparent", longitude="greenwich", model=None).value
+        correction = (
+            apparent - cls.get_mean_sidereal_time(utc, tai_offset) + 12
+        ) % 24 - 12
+        next_midnight = (utc // SECONDS_PER_DAY + 1) * SECONDS_PER_DAY
+        valid_until = min(utc + settings.TIME_ENGINE_REFRESH_INTERVAL, next_midnight)
+        cls._state = (utc, valid_until, tai_offset, correction)
+        return cls._state
+
+    @classmethod
+    def reset(cls):
+        """Discard the cached corrections."""
+        cls._state = None
+
+    @staticmethod
+    def get_tai_offset(utc):
+        """Return the TAI-UTC offset (leap seconds) of UTC timestamps.
+
+        Parameters
+        ----------
+        utc: `float` or `numpy.ndarray`
+            time in UTC scale as unix timestamps (seconds)
+
+        Returns
+        -------
+        `float` or `numpy.ndarray`
+            The TAI-UTC offsets in seconds
+        """
+        import erfa
+        import numpy as np
+
+        utc = np.asarray(utc, dtype=float)
+        days = np.floor(utc / SECONDS_PER_DAY).astype("datetime64[D]")
+        years = days.astype("datetime64[Y]")
+        months = days.astype("datetime64[M]")
+        day_fraction = (utc % SECONDS_PER_DAY) / SECONDS_PER_DAY
+        return erfa.dat(
+            years.astype(int) + 1970,
+            (months - years).astype(int) + 1,
+            (days - months).astype(int) + 1,
+            day_fraction,
+        )
+
+    @staticmethod
+    def get_mjd(utc):
+        """Return the modified julian date of UTC timestamps.
+
+        Parameters
+        ----------
+        utc: `float` or `numpy.ndarray`
+            time in UTC scale as unix timestamps (seconds)
+
+        Returns
+        -------
+        `float` or `numpy.ndarray`
+            The modified julian dates
+        """
+        return utc / SECONDS_PER_DAY + UNIX_EPOCH_MJD
+
+    @staticmethod
+    def get_mean_sidereal_time(utc, tai_offset):
+        """Return the Greenwich mean sidereal time of UTC timestamps (IAU 2006), taking UT1 as UTC.
+
+        Parameters
+        ----------
+        utc: `float` or `numpy.ndarray`
+            time in UTC scale as unix timestamps (seconds)
+        tai_offset: `float` or `numpy.ndarray`
+            TAI-UTC offset in seconds
+
+        Returns
+        -------
+        `float` or `numpy.ndarray`
+            The mean sidereal times, in hourangles between 0 and 24
+        """
+        days = utc / SECONDS_PER_DAY - J2000_UNIX_DAYS
+        # Earth rotation angle, the whole days are removed before multiplying to keep the precision
+        whole_days = days // 1
+        era = (0.7790572732640 + 0.00273781191135448 * days + (days - whole_days)) % 1.0
+        # Julian centuries in TT since J2000.0
+        centuries = (days + (tai_offset + TT_MINUS_TAI) / SECONDS_PER_DAY) / 36525.0
+        precession = (
+            (
+                ((-0.0000000368 * centuries - 0.000029956) * centuries - 0.00000044)
+                * centuries
+                + 1.3915817
+            )
+            * centuries
+            + 4612.156534
+        ) * centuries + 0.014506
+        return (24 * era + precession / 15 / 3600) % 24
+
+    @classmethod
+    def get_sidereal_time(cls, utc, tai_offset, correction):
+        """Return the Greenwich apparent sidereal time of UTC timestamps.
+
+        Parameters
+        ----------
+        utc: `float` or `numpy.ndarray`
+            time in UTC scale as unix timestamps (seconds)
+        tai_offset: `float` or `numpy.ndarray`
+            TAI-UTC offset in seconds
+        correction: `float`
+            difference between the apparent and the mean sidereal time, in hourangles
+
+        Returns
+        -------
+        `float` or `numpy.ndarray`
+            The apparent sidereal times, in hourangles between 0 and 24
+        """
+        return (cls.get_mean_sidereal_time(utc, tai_offset) + correction) % 24
+
+    @classmethod
+    def get_apparent_sidereal_times(cls, utc, tai_offset):
+        """Return the Greenwich apparent sidereal time of many UTC timestamps at once.
+
+        The correction to the mean sidereal time is computed with astropy at the nodes of a grid
+        of `TIME_ENGINE_REFRESH_INTERVAL` seconds that covers the timestamps,
+        and linearly interpolated between them.
+
+        Parameters
+        ----------
+        utc: `numpy.ndarray`
+            time in UTC scale as unix timestamps (seconds)
+        tai_offset: `numpy.ndarray`
+            TAI-UTC offsets in seconds
+
+        Returns
+        -------
+        `numpy.ndarray`
+            The apparent sidereal times, in hourangles between 0 and 24
+        """
+        import numpy as np
+        from astropy.time import Time
+
+        utc = np.asarray(utc, dtype=float)
+        mean = cls.get_mean_sidereal_time(utc, tai_offset)
+        if utc.size == 0:
+            return mean
+        step = settings.TIME_ENGINE_REFRESH_INTERVAL
+        indexes = np.unique(np.floor(utc / step))
+        nodes = np.union1d(indexes, indexes + 1) * step
+        apparent = (
+            Time(nodes, format="unix", scale="utc")
+            .sidereal_time("apparent", longitude="greenwich", model=None)
+            .value
+        )
+        node_mean = cls.get_mean_sidereal_time(nodes, cls.get_tai_offset(nodes))
+        corrections = (apparent - node_mean + 12) % 24 - 12
+        return (mean + np.interp(utc, nodes, corrections)) % 24
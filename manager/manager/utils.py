@@ -1,5 +1,6 @@
-from astropy.time import Time
-from astropy.units import hour
+import time
+from manager.time_engine import TimeEngine, SECONDS_PER_DAY, UNIX_EPOCH_MJD
+from manager.time_engine import SUMMIT_LONGITUDE
 
 
 def get_tai_to_utc() -> float:
@@ -10,14 +11,27 @@ def get_tai_to_utc() -> float:
     Int
         The number of seconds of difference between TAI and UTC times
     """
-    t = Time.now()
-    dt = t.datetime.timestamp() - t.tai.datetime.timestamp()
-    return dt
+    return TimeEngine.get_tai_to_utc()
+
+
+def get_tai_timestamp() -> float:
+    """Return the current time in TAI scale as a unix timestamp.
+
+    Returns
+    -------
+    Float
+        The current time in TAI scale as a unix timestamp (seconds)
+    """
+    utc = time.time()
+    return utc - TimeEngine.get_tai_to_utc(utc)
 
 
 def get_times():
     """Return relevant time measures.
 
+    The values are computed by the `TimeEngine`, which only uses astropy
+    to refresh its corrections periodically.
+
     Returns
     -------
     Dict
@@ -29,21 +43,76 @@ def get_times():
         - sidereal_greenwich: current time as a sidereal_time w/respect to Greenwich location (hourangles)
         - tai_to_utc: The number of seconds of difference between TAI and UTC times (seconds)
     """
-    t = Time.now()
-    t_utc = t.datetime.timestamp()
-    t_tai = t.tai.datetime.timestamp()
-    shifted_iso = (t.tai - 12 * hour).iso
-    observing_day = shifted_iso[0:10].replace("-", "")
-    sidereal_summit = t.sidereal_time("apparent", longitude=-70.749417, model=None)
-    sidereal_greenwich = t.sidereal_time("apparent", longitude="greenwich", model=None)
+    return TimeEngine.get_times()
+
+
+def convert_times(timestamps, scale="utc"):
+    """Convert many timestamps at once to the time measures returned by `get_times`.
+
+    The conversions are vectorized with NumPy, astropy is only used for the conversion from TAI
+    and for the sidereal time corrections, see `TimeEngine.get_apparent_sidereal_times`.
+
+    Parameters
+    ----------
+    timestamps: `list` or `numpy.ndarray` of `float`
+        unix timestamps (seconds) to convert
+    scale: `string`
+        time scale of the timestamps, "utc" or "tai"
+
+    Returns
+    -------
+    Dict
+        Dictionary containing the same keys as `get_times`,
+        each one with a `numpy.ndarray` of the values of the timestamps
+
+    Raises
+    ------
+    ValueError
+        If the scale is not "utc" or "tai"
+    """
+    import numpy as np
+    from astropy.time import Time
+
+    values = np.asarray(timestamps, dtype=float).reshape(-1)
+    if scale == "utc":
+        utc = values
+        tai_offset = TimeEngine.get_tai_offset(utc)
+        tai = utc + tai_offset
+    elif scale == "tai":
+        tai = values
+        days = np.floor(tai / SECONDS_PER_DAY)
+        t = Time(
+            days + UNIX_EPOCH_MJD,
+            (tai - days * SECONDS_PER_DAY) / SECONDS_PER_DAY,
+            format="mjd",
+            scale="tai",
+        )
+        tai_offset = TimeEngine.get_tai_offset(t.utc.unix)
+        utc = tai - tai_offset
+    else:
+        raise ValueError("Invalid time scale: {}".format(scale))
+
+    observing_days = np.floor((tai - 12 * 3600) / SECONDS_PER_DAY).astype(
+        "datetime64[D]"
+    )
+    years = observing_days.astype("datetime64[Y]")
+    months = observing_days.astype("datetime64[M]")
+    # Dates formatted as YYYYMMDD
+    observing_days = (
+        (years.astype(int) + 1970) * 10000
+        + ((months - years).astype(int) + 1) * 100
+        + (observing_days - months).astype(int)
+        + 1
+    ).astype(str)
+    sidereal_greenwich = TimeEngine.get_apparent_sidereal_times(utc, tai_offset)
     return {
-        "utc": t_utc,
-        "tai": t_tai,
-        "mjd": t.mjd,
-        "observing_day": observing_day,
-        "sidereal_summit": sidereal_summit.value,
-        "sidereal_greenwich": sidereal_greenwich.value,
-        "tai_to_utc": t_utc - t_tai,
+        "utc": utc,
+        "tai": tai,
+        "mjd": TimeEngine.get_mjd(utc),
+        "observing_day": observing_days,
+        "sidereal_summit": (sidereal_greenwich + SUMMIT_LONGITUDE / 15) % 24,
+        "sidereal_greenwich": sidereal_greenwich,
+        "tai_to_utc": -tai_offset,
     }
 
 
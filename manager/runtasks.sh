@@ -1,3 +1,6 @@
 #!/bin/bash
+echo -e "\nStarting sweep of the expired tokens, every ${TOKEN_SWEEP_INTERVAL:-3600} seconds"
+python manage.py sweeptokens --interval ${TOKEN_SWEEP_INTERVAL:-3600} &
+
 echo -e "\nStarting process for background tasks"
 python manage.py process_tasks
@@ -1,28 +1,84 @@
 """Contains the Django Channels Consumers that handle the reception/sending of channels messages."""
 import json
+import time
+import uuid
+import collections
 
 import asyncio
-from astropy.time import Time
 
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.conf import settings
 
 from manager import utils
+from api.logout_dispatcher import LogoutDispatcher
 from subscription.heartbeat_manager import HeartbeatManager
+from subscription.filters import SubscriptionFilter
+from subscription.subscription_index import SubscriptionIndex, WILDCARD
+from subscription.time_data import TimeDataBroadcaster
+from subscription.watchdog import (
+    SlowClientWatchdog,
+    TransportProducer,
+    SLOW_CLIENT_CLOSE_CODE,
+)
+from subscription.metrics import Metrics
 
 
 class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
-    """Consumer that handles incoming websocket messages."""
+    """Consumer that handles incoming websocket messages.
+
+    Messages from the Channel Layer are received through 2 lanes:
+
+    - The priority lane: the default channel of the consumer, used by events, heartbeats,
+      logout messages and any other non-telemetry group.
+    - The telemetry lane: a second channel, used only by telemetry groups. Its messages are moved
+      to a bounded local queue and sent by their own task.
+
+    This way high-rate telemetry never delays the messages of the priority lane,
+    and when a client cannot keep up, the telemetry lane is the one that sheds load:
+    the oldest telemetry messages are dropped from the local queue, which holds up to
+    `TELEMETRY_LANE_CAPACITY` messages.
+
+    Every message to the client is queued in one of 2 outboxes, written to the websocket by their own task:
+    the priority outbox, which is always written first and never makes its senders wait,
+    and the telemetry outbox, which holds up to `CLIENT_OUTBOX_CAPACITY` messages.
+    A `SlowClientWatchdog` follows how long the messages wait in the telemetry outbox,
+    i.e. how far behind the client is.
+    Slow clients are first downgraded to a reduced-rate mode, where only the latest telemetry
+    of each subscription is sent periodically, and then closed with the `SLOW_CLIENT_CLOSE_CODE`
+    if they stay behind.
+    """
+
+    telemetry_categories = ("telemetry",)
+    """Categories whose groups are received through the telemetry lane (`tuple` of `string`)"""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.first_connection = asyncio.Future()
+        self.telemetry_channel_name = None
+        self.telemetry_tasks = []
+        self.telemetry_lane = collections.deque(maxlen=settings.TELEMETRY_LANE_CAPACITY)
+        self.telemetry_lane_ready = asyncio.Event()
+        self.priority_outbox = collections.deque()
+        self.telemetry_outbox = collections.deque()
+        self.outbox_ready = asyncio.Event()
+        self.telemetry_outbox_space = asyncio.Event()
+        self.telemetry_outbox_space.set()
+        self.client_tasks = []
+        self.transport_producer = None
+        self.watchdog = SlowClientWatchdog()
+        self.evicted = False
+        self.time_data_subscribed = False
+        self.last_time_data_tick = None
         self.heartbeat_manager = HeartbeatManager()
         self.heartbeat_manager.initialize()
+        SubscriptionIndex.initialize()
+        TimeDataBroadcaster.initialize()
+        LogoutDispatcher.initialize()
 
     async def connect(self):
         """Handle connection, rejects connection if no authenticated user."""
         self.stream_group_names = []
+        self.all_subscription_filters = {}
         # Reject connection if no authenticated user:
         if self.scope["user"].is_anonymous:
             if (
@@ -45,6 +101,13 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         await asyncio.gather(
             *[self._leave_group(*stream) for stream in self.stream_group_names]
         )
+        self._stop_telemetry_lane()
+        self._stop_client_tasks()
+        SubscriptionIndex.discard_listener(self.channel_name)
+        if self.time_data_subscribed:
+            await self.channel_layer.group_discard(
+                TimeDataBroadcaster.group_name, self.channel_name
+            )
 
     async def receive_json(self, message):
         """Handle a received message.
@@ -57,9 +120,7 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         message: `dict`
             dictionary containing the message parsed as json
         """
-        manager_rcv = (
-            Time.now().tai.datetime.timestamp() if settings.TRACE_TIMESTAMPS else None
-        )
+        manager_rcv = utils.get_tai_timestamp() if settings.TRACE_TIMESTAMPS else None
         if "option" in message:
             await self.handle_subscription_message(message)
         elif "action" in message:
@@ -87,6 +148,8 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
                     "stream": "stream1",
                 }
 
+            Subscriptions to all the streams of a category ("csc", "salindex" and "stream" set to "all")
+            accept an optional "filters" field, see `SubscriptionFilter` for its format.
         """
         option = message["option"]
         category = message["category"]
@@ -96,6 +159,16 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
             csc = message["csc"]
             salindex = message["salindex"]
             stream = message["stream"]
+            if "filters" in message and csc == salindex == stream == "all":
+                try:
+                    self.all_subscription_filters[
+                        "{}-all-all-all".format(category)
+                    ] = SubscriptionFilter.from_dict(message["filters"])
+                except ValueError as e:
+                    await self.send_json(
+                        {"data": "Invalid subscription filters: {}".format(e)}
+                    )
+                    return
             await self._join_group(category, csc, str(salindex), stream)
             await self.send_json(
                 {
@@ -109,6 +182,10 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
             csc = message["csc"]
             salindex = message["salindex"]
             stream = message["stream"]
+            if csc == salindex == stream == "all":
+                self.all_subscription_filters.pop(
+                    "{}-all-all-all".format(category), None
+                )
             await self._leave_group(category, csc, str(salindex), stream)
             await self.send_json(
                 {
@@ -124,6 +201,8 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
 
         Currently supported actions:
         - get_time_data: sends a message with the time_data and passes though a request_time received with the message.
+          The time_data is the latest one of the `TimeDataBroadcaster`, refreshed every
+          `TIME_DATA_BROADCAST_INTERVAL` seconds.
 
             - Expected input message:
             .. code-block:: json
@@ -150,6 +229,53 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
                     "request_time": "<timestamp with the request time, e.g. 123243423.123>"
                 }
 
+        - subscribe_interest: used by producers to receive the interest set, i.e. the streams with at least
+          one subscriber, in order to only publish those. A snapshot of the interest set is sent
+          immediately and then its changes are sent as they happen.
+          Patterns are lists of [category, csc, salindex, stream], where "all" matches any value.
+          If "synced" is false the manager has not heard from all the other manager processes yet,
+          and producers should keep publishing every stream until they receive a synced snapshot.
+
+            - Expected input message:
+            .. code-block:: json
+
+                {
+                    "action": "subscribe_interest"
+                }
+
+            - Messages sent (output):
+            .. code-block:: json
+
+                {
+                    "interest": {
+                        "snapshot": "<true if the message contains the whole interest set, false if not>",
+                        "synced": "<true if the interest set is complete, false if not>",
+                        "added": [["event", "ATDome", "1", "summaryState"], ["telemetry", "all", "all", "all"]],
+                        "removed": [["event", "ATDome", "1", "heartbeat"]]
+                    }
+                }
+
+        - unsubscribe_interest: stop receiving the changes of the interest set.
+
+        - subscribe_time_data: receive the time_data every `TIME_DATA_BROADCAST_INTERVAL` seconds,
+          starting with the latest one.
+
+            - Expected input message:
+            .. code-block:: json
+
+                {
+                    "action": "subscribe_time_data"
+                }
+
+            - Messages sent (output):
+            .. code-block:: json
+
+                {
+                    "time_data": "<the same time_data of the get_time_data action>"
+                }
+
+        - unsubscribe_time_data: stop receiving the time_data.
+
         Parameters
         ----------
         message: `dict`
@@ -164,13 +290,33 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         """
         if message["action"] == "get_time_data":
             request_time = message["request_time"]
-            time_data = utils.get_times()
+            time_data = TimeDataBroadcaster.get_latest()
             await self.send_json({"time_data": time_data, "request_time": request_time})
+        elif message["action"] == "subscribe_time_data":
+            self.time_data_subscribed = True
+            await self.channel_layer.group_add(
+                TimeDataBroadcaster.group_name, self.channel_name
+            )
+            TimeDataBroadcaster.get_latest()
+            await self.time_data_frame(TimeDataBroadcaster.get_frame_message())
+        elif message["action"] == "unsubscribe_time_data":
+            self.time_data_subscribed = False
+            await self.channel_layer.group_discard(
+                TimeDataBroadcaster.group_name, self.channel_name
+            )
+        elif message["action"] == "subscribe_interest":
+            snapshot = SubscriptionIndex.add_listener(self.channel_name)
+            await self.send_json({"interest": snapshot})
+        elif message["action"] == "unsubscribe_interest":
+            SubscriptionIndex.discard_listener(self.channel_name)
 
     async def handle_data_message(self, message, manager_rcv):
         """Handle a data message.
 
         Sends the message to the corresponding groups based on the data of the message.
+        Every stream is matched against the active subscriptions with a single `SubscriptionIndex` lookup,
+        so only the groups with subscribers receive messages. The "all" level of a subscription
+        matches any value of that level.
 
         Parameters
         ----------
@@ -206,55 +352,69 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         # Store pairs of group, message to send:
         to_send = []
         tracing = {}
+        # Data for the groups of category-wide subscriptions, indexed by group name
+        all_data = {}
 
         # Iterate over all stream groups
         for csc_message in data:
             csc = csc_message["csc"]
             salindex = csc_message["salindex"]
             data_csc = csc_message["data"]
-            csc_message["data"] = data_csc
-            streams = data_csc.keys()
-            streams_data = {}
-
-            # Individual groups for each stream
-            for stream in streams:
-                sub_category = category
-                msg_type = "subscription_data"
-                group_name = "-".join([sub_category, csc, str(salindex), stream])
+            # Data for the groups of all streams of a category-csc-salindex, indexed by group name
+            csc_data = {}
+
+            # Route every stream to the groups of the subscriptions that match it
+            for stream in data_csc:
+                for pattern in SubscriptionIndex.match(
+                    category, csc, str(salindex), stream
+                ):
+                    group_name = "-".join(pattern)
+                    if pattern[3] != WILDCARD:
+                        # Individual groups for each stream
+                        msg = {
+                            "type": "subscription_data",
+                            "category": category,
+                            "csc": csc,
+                            "salindex": salindex,
+                            "data": {stream: data_csc[stream]},
+                            "subscription": group_name,
+                        }
+                        to_send.append({"group": group_name, "message": msg})
+                    elif pattern[1] != WILDCARD:
+                        # Higher level groups for all streams of a category-csc-salindex
+                        csc_data.setdefault(group_name, {})[stream] = data_csc[stream]
+                    else:
+                        # Top level for "all" subscriptions of the same category
+                        group_data = all_data.setdefault(group_name, [])
+                        if not group_data or group_data[-1] is not csc_message:
+                            group_data.append(csc_message)
+
+            for group_name, streams_data in csc_data.items():
                 msg = {
-                    "type": msg_type,
+                    "type": "subscription_data",
                     "category": category,
                     "csc": csc,
                     "salindex": salindex,
-                    "data": {stream: data_csc[stream]},
+                    "data": {csc: streams_data},
                     "subscription": group_name,
                 }
-
                 to_send.append({"group": group_name, "message": msg})
-                streams_data[stream] = data_csc[stream]
 
-            # Higher level groups for all streams of a category-csc-salindex
-            group_name = "-".join([category, csc, str(salindex), "all"])
+        for group_name, group_data in all_data.items():
             msg = {
-                "type": "subscription_data",
+                "type": "subscription_all_data",
                 "category": category,
-                "csc": csc,
-                "salindex": salindex,
-                "data": {csc: streams_data},
+                "data": group_data,
+                "frame_id": uuid.uuid4().hex,
                 "subscription": group_name,
             }
             to_send.append({"group": group_name, "message": msg})
 
-        # Top level for "all" subscriptions of the same category
-        group_name = "{}-all-all-all".format(category)
-        msg = {"type": "subscription_all_data", "category": category, "data": data}
-        to_send.append({"group": group_name, "message": msg})
-
         if settings.TRACE_TIMESTAMPS:
             tracing = {
                 "producer_snd": producer_snd,
                 "manager_rcv_from_producer": manager_rcv,
-                "manager_snd_to_group": Time.now().tai.datetime.timestamp(),
+                "manager_snd_to_group": utils.get_tai_timestamp(),
             }
             for group_msg in to_send:
                 group_msg["message"]["tracing"] = tracing
@@ -283,7 +443,8 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         key = "-".join([category, csc, salindex, stream])
         if [category, csc, salindex, stream] not in self.stream_group_names:
             self.stream_group_names.append([category, csc, salindex, stream])
-        await self.channel_layer.group_add(key, self.channel_name)
+            await SubscriptionIndex.add((category, csc, salindex, stream))
+        await self.channel_layer.group_add(key, await self._get_lane_channel(category))
 
         # If subscribing to an event, send the initial_state
         if category == "event":
@@ -323,7 +484,239 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         key = "-".join([category, csc, salindex, stream])
         if [category, csc, salindex, stream] in self.stream_group_names:
             self.stream_group_names.remove([category, csc, salindex, stream])
-        await self.channel_layer.group_discard(key, self.channel_name)
+            await SubscriptionIndex.discard((category, csc, salindex, stream))
+        await self.channel_layer.group_discard(
+            key, await self._get_lane_channel(category)
+        )
+
+    async def _get_lane_channel(self, category):
+        """Return the name of the channel used to receive the messages of a given category.
+
+        The telemetry lane (its channel and task) is created the first time it is needed.
+        Its channel shares the non-local part of the name with the main channel of the consumer,
+        given that the Redis Channel Layer only receives from one non-local channel at a time.
+        Therefore in Redis both lanes share the sorted set, and the capacity, of the process.
+        The lanes are kept apart by draining the telemetry channel continuously into the local
+        `telemetry_lane` queue, which is where telemetry is dropped, see `_receive_telemetry`.
+
+        Parameters
+        ----------
+        category: `string`
+            category of the messages, e.g. 'event' or 'telemetry'
+
+        Returns
+        -------
+        `string`
+            The name of the channel
+        """
+        if category not in self.telemetry_categories:
+            return self.channel_name
+        if self.telemetry_channel_name is None:
+            self.telemetry_channel_name = self.channel_name + "-telemetry"
+            self.telemetry_tasks = [
+                asyncio.create_task(self._receive_telemetry()),
+                asyncio.create_task(self._send_telemetry()),
+            ]
+        return self.telemetry_channel_name
+
+    def _stop_telemetry_lane(self):
+        """Cancel the tasks of the telemetry lane."""
+        for task in self.telemetry_tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        self.telemetry_tasks = []
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        """Queue a message to the client in the priority outbox, without waiting.
+
+        The messages are written to the websocket in order by the `_write_outbox` task,
+        before the messages of the telemetry outbox, see `_send_telemetry_message`.
+
+        Parameters
+        ----------
+        text_data: `string`
+            text of the message, if any
+        bytes_data: `bytes`
+            bytes of the message, if any
+        close: `bool`
+            close the websocket after writing the message
+        """
+        if self.evicted:
+            return
+        self._start_client_tasks()
+        self.priority_outbox.append((time.monotonic(), text_data, bytes_data, close))
+        self.outbox_ready.set()
+
+    async def _send_telemetry_message(self, text_data):
+        """Queue a telemetry message to the client in the telemetry outbox, waiting while it is full.
+
+        Parameters
+        ----------
+        text_data: `string`
+            text of the message
+        """
+        if self.evicted:
+            return
+        self._start_client_tasks()
+        while len(self.telemetry_outbox) >= settings.CLIENT_OUTBOX_CAPACITY:
+            self.telemetry_outbox_space.clear()
+            await self.telemetry_outbox_space.wait()
+            if self.evicted:
+                return
+        self.telemetry_outbox.append((time.monotonic(), text_data, None, False))
+        self.outbox_ready.set()
+
+    def _start_client_tasks(self):
+        """Start the tasks that write the outboxes and watch the client, if they are not running."""
+        if not self.client_tasks:
+            self.transport_producer = TransportProducer.attach(self.base_send)
+            self.client_tasks = [
+                asyncio.create_task(self._write_outbox()),
+                asyncio.create_task(self._watch_client()),
+            ]
+
+    def _stop_client_tasks(self):
+        """Cancel the tasks that write the outboxes and watch the client, and discard the outboxes."""
+        for task in self.client_tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        self.client_tasks = []
+        self.priority_outbox.clear()
+        self.telemetry_outbox.clear()
+        self.telemetry_outbox_space.set()
+        if self.transport_producer is not None:
+            self.transport_producer.detach()
+            self.transport_producer = None
+
+    async def _write_outbox(self):
+        """Write the messages of the outboxes to the websocket, in order,
+        those of the priority outbox before any of the telemetry outbox.
+
+        A message leaves its outbox once it is written. With ASGI servers that apply backpressure,
+        writing waits while the client is not reading. Daphne does not, so with Daphne
+        the messages wait while the `TransportProducer` of the connection is paused.
+        """
+        while True:
+            try:
+                await self.outbox_ready.wait()
+                while self.priority_outbox or self.telemetry_outbox:
+                    if self.transport_producer is not None:
+                        await self.transport_producer.writable.wait()
+                    outbox = self.priority_outbox or self.telemetry_outbox
+                    _, text_data, bytes_data, close = outbox[0]
+                    await super().send(
+                        text_data=text_data, bytes_data=bytes_data, close=close
+                    )
+                    outbox.popleft()
+                    if outbox is self.telemetry_outbox:
+                        self.telemetry_outbox_space.set()
+                self.outbox_ready.clear()
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+
+    async def _watch_client(self):
+        """Check periodically how far behind the client is, even if no messages are dispatched to it."""
+        while await self._check_watchdog():
+            await asyncio.sleep(settings.SLOW_CLIENT_CHECK_INTERVAL)
+
+    async def _receive_telemetry(self):
+        """Move the messages of the telemetry channel to the telemetry lane.
+
+        The channel is read as soon as it receives messages, so they do not accumulate in the
+        Channel Layer. When the lane holds `TELEMETRY_LANE_CAPACITY` messages the oldest one is dropped,
+        and counted in the "telemetry_lane_dropped" metric.
+        """
+        while True:
+            try:
+                message = await self.channel_layer.receive(self.telemetry_channel_name)
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+                continue
+            if len(self.telemetry_lane) == self.telemetry_lane.maxlen:
+                Metrics.increment("telemetry_lane_dropped")
+            self.telemetry_lane.append(message)
+            self.telemetry_lane_ready.set()
+
+    async def _send_telemetry(self):
+        """Dispatch the messages of the telemetry lane.
+
+        It yields control after every message, so the priority lane is never starved.
+        In reduced-rate mode only the latest message of each subscription is dispatched,
+        once every `SLOW_CLIENT_REDUCED_RATE_INTERVAL` seconds.
+        """
+        while not self.evicted:
+            try:
+                await self.telemetry_lane_ready.wait()
+                self.telemetry_lane_ready.clear()
+                while self.telemetry_lane:
+                    if self.watchdog.mode == SlowClientWatchdog.REDUCED:
+                        latest = {}
+                        while self.telemetry_lane:
+                            message = self.telemetry_lane.popleft()
+                            latest[self._coalescing_key(message)] = message
+                        for message in latest.values():
+                            await self.dispatch(message)
+                        await asyncio.sleep(settings.SLOW_CLIENT_REDUCED_RATE_INTERVAL)
+                    else:
+                        await self.dispatch(self.telemetry_lane.popleft())
+                        await asyncio.sleep(0)
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+
+    def _coalescing_key(self, message):
+        """Return the key used to keep only the latest message of each subscription in reduced-rate mode.
+
+        Parameters
+        ----------
+        message: `dict`
+            message of the telemetry lane
+
+        Returns
+        -------
+        `tuple`
+            The key of the message
+        """
+        if message["type"] == "subscription_all_data":
+            return (message.get("subscription"),) + tuple(
+                (entry["csc"], entry["salindex"]) for entry in message["data"]
+            )
+        return (
+            message.get("subscription"),
+            message.get("csc"),
+            message.get("salindex"),
+        )
+
+    async def _check_watchdog(self):
+        """Record in the watchdog how long the oldest message of the telemetry outbox has waited,
+        and how many telemetry messages are waiting, and apply the action it returns.
+
+        Only telemetry is followed, as it is the only traffic that is dropped for slow clients.
+
+        Returns
+        -------
+        `bool`
+            True if messages can be sent to the client, False if the client was evicted
+        """
+        if self.evicted:
+            return False
+        delay = (
+            time.monotonic() - self.telemetry_outbox[0][0]
+            if self.telemetry_outbox
+            else 0.0
+        )
+        action = self.watchdog.record(
+            delay, len(self.telemetry_lane) + len(self.telemetry_outbox)
+        )
+        if action == SlowClientWatchdog.EVICT:
+            self.evicted = True
+            self._stop_telemetry_lane()
+            self._stop_client_tasks()
+            await self.close(code=SLOW_CLIENT_CLOSE_CODE)
+            return False
+        return True
 
     async def subscription_data(self, message):
         """
@@ -336,9 +729,11 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
         message: `dict`
             dictionary containing the message parsed as json
         """
+        if not await self._check_watchdog():
+            return
         if settings.TRACE_TIMESTAMPS:
-            manager_rcv_from_group = Time.now().tai.datetime.timestamp()
-            tracing = message["tracing"] if "tracing" in message else {}
+            manager_rcv_from_group = utils.get_tai_timestamp()
+            tracing = dict(message["tracing"]) if "tracing" in message else {}
 
         data = message["data"]
         category = message["category"]
@@ -353,42 +748,98 @@ class SubscriptionConsumer(AsyncJsonWebsocketConsumer):
 
         if settings.TRACE_TIMESTAMPS:
             tracing["manager_rcv_from_group"] = manager_rcv_from_group
-            tracing["manager_snd_to_client"] = Time.now().tai.datetime.timestamp()
+            tracing["manager_snd_to_client"] = utils.get_tai_timestamp()
             msg["tracing"] = tracing
 
         # Send data to WebSocket
-        await self.send(text_data=json.dumps(msg))
+        if category in self.telemetry_categories:
+            await self._send_telemetry_message(json.dumps(msg))
+        else:
+            await self.send(text_data=json.dumps(msg))
 
     async def subscription_all_data(self, message):
         """
         Send a message to all the instances of a consumer that have joined the group.
 
-        It is used to send messages associated to subscriptions to all the groups of a particular category
+        It is used to send messages associated to subscriptions to all the groups of a particular category.
+        If the subscription was made with filters, only the part of the data that passes them is sent.
 
         Parameters
         ----------
         message: `dict`
             dictionary containing the message parsed as json
         """
+        if not await self._check_watchdog():
+            return
         if settings.TRACE_TIMESTAMPS:
-            manager_rcv_from_group = Time.now().tai.datetime.timestamp()
-            tracing = message["tracing"] if "tracing" in message else {}
+            manager_rcv_from_group = utils.get_tai_timestamp()
+            tracing = dict(message["tracing"]) if "tracing" in message else {}
 
         data = message["data"]
         category = message["category"]
+        subscription = message.get("subscription", "{}-all-all-all".format(category))
+        subscription_filter = self.all_subscription_filters.get(subscription)
+        if subscription_filter is not None:
+            data = subscription_filter.apply_cached(message.get("frame_id"), data)
+            if not data:
+                return
         msg = {
             "category": category,
             "data": data,
-            "subscription": "{}-all-all-all".format(category),
+            "subscription": subscription,
         }
 
         if settings.TRACE_TIMESTAMPS:
             tracing["manager_rcv_from_group"] = manager_rcv_from_group
-            tracing["manager_snd_to_client"] = Time.now().tai.datetime.timestamp()
+            tracing["manager_snd_to_client"] = utils.get_tai_timestamp()
             msg["tracing"] = tracing
 
         # Send data to WebSocket
-        await self.send(text_data=json.dumps(msg))
+        if category in self.telemetry_categories:
+            await self._send_telemetry_message(json.dumps(msg))
+        else:
+            await self.send(text_data=json.dumps(msg))
+
+    async def interest_update(self, message):
+        """
+        Send the changes of the interest set to a producer that subscribed to them.
+
+        Parameters
+        ----------
+        message: `dict`
+            dictionary containing the changes, with the keys "snapshot", "synced", "added" and "removed"
+        """
+        await self.send_json(
+            {
+                "interest": {
+                    "snapshot": message["snapshot"],
+                    "synced": message["synced"],
+                    "added": message["added"],
+                    "removed": message["removed"],
+                }
+            }
+        )
+
+    async def time_data_frame(self, message):
+        """
+        Send the time data to a client subscribed to the time_data group.
+
+        Only the first frame of every tick is sent, in case several processes broadcast the same tick.
+
+        Parameters
+        ----------
+        message: `dict`
+            dictionary containing the tick and the encoded frame
+        """
+        if not self.time_data_subscribed:
+            return
+        if (
+            self.last_time_data_tick is not None
+            and message["tick"] <= self.last_time_data_tick
+        ):
+            return
+        self.last_time_data_tick = message["tick"]
+        await self.send(text_data=message["frame"])
 
     async def send_heartbeat(self, message):
         """
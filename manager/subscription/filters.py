@@ -0,0 +1,163 @@
+"""Defines the server-side filters that can be applied to "all" subscriptions."""
+import re
+import fnmatch
+from collections import OrderedDict
+
+
+class SubscriptionFilter:
+    """Filter applied by the manager to the messages of a `<category>-all-all-all` subscription.
+
+    Filters are defined by the client when subscribing, through an optional "filters" field:
+
+    .. code-block:: json
+
+        {
+            "option": "subscribe",
+            "category": "event",
+            "csc": "all",
+            "salindex": "all",
+            "stream": "all",
+            "filters": {
+                "csc": ["ATDome", "ATMCS"],
+                "salindex": [0, 1],
+                "stream": ["summaryState", "log*"]
+            }
+        }
+
+    Every key of "filters" is optional, a missing key means no restriction on that level.
+    Stream filters are shell-style patterns (see `fnmatch`).
+
+    Filtered payloads are cached per producer frame, so that each message is filtered
+    only once per distinct filter, regardless of the number of subscribed clients.
+    """
+
+    levels = ("csc", "salindex", "stream")
+    """Levels that can be filtered (`tuple` of `string`)"""
+
+    cache_size = 256
+    """Maximum number of filtered payloads kept in the cache (`int`)"""
+
+    _cache = OrderedDict()
+    """Cache of filtered payloads, indexed by (frame_id, filter key) (`OrderedDict`)"""
+
+    def __init__(self, cscs=None, salindices=None, streams=None):
+        self.cscs = frozenset(cscs) if cscs is not None else None
+        self.salindices = (
+            frozenset(str(s) for s in salindices) if salindices is not None else None
+        )
+        self.streams = tuple(sorted(streams)) if streams is not None else None
+        # An empty list of streams matches none, as the empty lists of cscs and salindices do
+        self.streams_regex = (
+            re.compile("|".join(fnmatch.translate(p) for p in self.streams) or "(?!)")
+            if self.streams is not None
+            else None
+        )
+        self.key = "|".join(
+            [
+                ",".join(sorted(values)) if values is not None else "*"
+                for values in (self.cscs, self.salindices, self.streams)
+            ]
+        )
+
+    @classmethod
+    def from_dict(cls, filters):
+        """Build a SubscriptionFilter from the "filters" field of a subscription message.
+
+        Parameters
+        ----------
+        filters: `dict`
+            dictionary with the (optional) keys "csc", "salindex" and "stream",
+            each of them containing a list of allowed values
+
+        Returns
+        -------
+        `SubscriptionFilter`
+            The corresponding filter
+
+        Raises
+        ------
+        ValueError
+            If the filters are not well defined
+        """
+        if not isinstance(filters, dict):
+            raise ValueError("filters must be a dictionary")
+        unknown = set(filters) - set(cls.levels)
+        if unknown:
+            raise ValueError(f"unknown filter levels: {sorted(unknown)}")
+        values = {}
+        for level in cls.levels:
+            level_values = filters.get(level)
+            if level_values is None:
+                values[level] = None
+                continue
+            if isinstance(level_values, (str, int)):
+                level_values = [level_values]
+            if not isinstance(level_values, list):
+                raise ValueError(f"{level} filter must be a list")
+            values[level] = [str(value) for value in level_values]
+        return cls(
+            cscs=values["csc"], salindices=values["salindex"], streams=values["stream"]
+        )
+
+    def apply(self, data):
+        """Return the part of a producer payload that passes the filter.
+
+        Parameters
+        ----------
+        data: `list`
+            list of dictionaries with the keys "csc", "salindex" and "data",
+            as sent by the producers
+
+        Returns
+        -------
+        `list`
+            the filtered list, entries without streams left are dropped
+        """
+        filtered = []
+        for csc_message in data:
+            if self.cscs is not None and csc_message["csc"] not in self.cscs:
+                continue
+            if (
+                self.salindices is not None
+                and str(csc_message["salindex"]) not in self.salindices
+            ):
+                continue
+            if self.streams_regex is None:
+                filtered.append(csc_message)
+                continue
+            streams_data = {
+                stream: value
+                for stream, value in csc_message["data"].items()
+                if self.streams_regex.match(stream)
+            }
+            if streams_data:
+                filtered.append({**csc_message, "data": streams_data})
+        return filtered
+
+    def apply_cached(self, frame_id, data):
+        """Return the part of a producer payload that passes the filter, reusing previous results.
+
+        Parameters
+        ----------
+        frame_id: `string`
+            identifier of the producer frame the data belongs to, if None the cache is not used
+        data: `list`
+            list of dictionaries with the keys "csc", "salindex" and "data",
+            as sent by the producers
+
+        Returns
+        -------
+        `list`
+            the filtered list, entries without streams left are dropped
+        """
+        if frame_id is None:
+            return self.apply(data)
+        cache_key = (frame_id, self.key)
+        cache = SubscriptionFilter._cache
+        if cache_key in cache:
+            return cache[cache_key]
+        filtered = self.apply(data)
+        cache[cache_key] = filtered
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return filtered
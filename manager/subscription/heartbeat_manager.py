@@ -1,9 +1,9 @@
 import asyncio
 import datetime
 import json
-import requests
-import os
+from asgiref.sync import sync_to_async
 from channels.layers import get_channel_layer
+from api.commander_client import CommanderClient
 
 
 class HeartbeatManager:
@@ -58,17 +58,12 @@ class HeartbeatManager:
 
             This is what the `commander_heartbeat_task` does
             """
-            heartbeat_url = (
-                "http://"
-                + os.environ.get("COMMANDER_HOSTNAME")
-                + ":"
-                + os.environ.get("COMMANDER_PORT")
-                + "/heartbeat"
-            )
             while True:
                 try:
-                    # query commander
-                    resp = requests.get(heartbeat_url)
+                    # query commander, in a thread so the event loop is not blocked
+                    resp = await sync_to_async(
+                        CommanderClient.get, thread_sensitive=False
+                    )("/heartbeat")
                     timestamp = resp.json()["timestamp"]
                     # get timestamp
                     cls.set_heartbeat_timestamp("Commander", timestamp)
@@ -0,0 +1 @@
+"""Channel Layer backends tuned for the traffic of the LOVE-manager."""
@@ -0,0 +1,131 @@
+"""Defines the capacity rules of the Channel Layers and the metrics of the messages they drop."""
+import re
+import fnmatch
+from subscription.metrics import Metrics
+
+
+class CapacityRulesMixin:
+    """Choose the capacity of a channel by the group the message is sent to, or by the name of the channel,
+    and count the messages dropped because of full channels or expiration.
+
+    Capacities are defined with shell-style patterns (see `fnmatch`):
+
+    - `group_capacity` is matched against the group of the messages sent with `group_send`,
+      e.g. {"*-all": 500} gives a larger buffer to the messages of the subscriptions to "all" streams.
+    - `channel_capacity` is matched against the channel name, as in the layers of Django Channels,
+      e.g. {"*-telemetry": 50} for the telemetry lanes of the consumers.
+
+    A channel accepts a message while it holds less messages than the capacity of that message.
+
+    Dropped messages are counted in the `Metrics` registry:
+
+    - "channel_full": messages rejected because the channel was full, labeled by capacity rule,
+      i.e. the pattern that defined the capacity, or "default".
+    - "channel_full_categories": the same messages, labeled by the category of their group
+      (the first part of the group name, e.g. "telemetry"), or "direct" if they were not sent to a group.
+    - "channel_expired": messages removed from a channel because they expired, labeled by capacity rule.
+    - "channel_expired_categories": the same messages, labeled by category, when the layer knows it.
+    """
+
+    def __init__(self, *args, group_capacity=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.group_capacity_rules = self._compile_rules(group_capacity or {})
+        """List of (regex, label, capacity) matched against the group names (`list`)"""
+        self.channel_capacity_rules = self._compile_rules(
+            kwargs.get("channel_capacity") or {}
+        )
+        """List of (regex, label, capacity) matched against the channel names (`list`)"""
+
+    def get_capacity_rule(self, channel, group=None):
+        """Return the capacity rule that applies to a message sent to a channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        group: `string`
+            name of the group the message was sent to, None if it was sent directly to the channel
+
+        Returns
+        -------
+        `tuple`
+            The label of the rule (its pattern or "default") and the capacity
+        """
+        if group is not None:
+            for regex, label, capacity in self.group_capacity_rules:
+                if regex.match(group):
+                    return label, capacity
+        for regex, label, capacity in self.channel_capacity_rules:
+            if regex.match(channel):
+                return label, capacity
+        return "default", self.capacity
+
+    @staticmethod
+    def get_category(group):
+        """Return the category of a group, used to label the metrics.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group, None for messages sent directly to a channel
+
+        Returns
+        -------
+        `string`
+            The first part of the group name, e.g. "telemetry", or "direct"
+        """
+        if group is None:
+            return "direct"
+        return group.split("-", 1)[0]
+
+    @staticmethod
+    def record_full(label, category, count=1):
+        """Count messages rejected because their channels were full.
+
+        Parameters
+        ----------
+        label: `string`
+            label of the capacity rule
+        category: `string`
+            category of the group of the messages
+        count: `int`
+            number of messages
+        """
+        Metrics.increment("channel_full", count, label=label)
+        Metrics.increment("channel_full_categories", count, label=category)
+
+    @staticmethod
+    def record_expired(label, category=None, count=1):
+        """Count messages removed from their channels because they expired.
+
+        Parameters
+        ----------
+        label: `string`
+            label of the capacity rule
+        category: `string`
+            category of the group of the messages, None if unknown
+        count: `int`
+            number of messages
+        """
+        Metrics.increment("channel_expired", count, label=label)
+        if category is not None:
+            Metrics.increment("channel_expired_categories", count, label=category)
+
+    @staticmethod
+    def _compile_rules(capacities):
+        """Compile a dictionary of capacities indexed by pattern.
+
+        Parameters
+        ----------
+        capacities: `dict`
+            capacities indexed by shell-style pattern
+
+        Returns
+        -------
+        `list`
+            List of (regex, pattern, capacity)
+        """
+        return [
+            (re.compile(fnmatch.translate(pattern)), pattern, capacity)
+            for pattern, capacity in capacities.items()
+        ]
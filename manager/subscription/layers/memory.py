@@ -0,0 +1,313 @@
+"""Defines an in-memory Channel Layer optimized for the group fan-out of a single process."""
+import time
+import random
+import string
+import asyncio
+from collections import deque
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from subscription.layers.capacity import CapacityRulesMixin
+
+
+class LocalChannelLayer(CapacityRulesMixin, BaseChannelLayer):
+    """In-memory Channel Layer for deployments with a single manager process.
+
+    Differences with `channels.layers.InMemoryChannelLayer`:
+
+    - Messages are not copied, the same message object is delivered to every member of a group.
+      Consumers must treat received messages as read-only.
+    - Groups are indexed in both directions (group to channels and channel to groups),
+      so removing a channel from its groups does not go through every group.
+    - Every channel is a bounded deque, messages are expired only on the channel being used,
+      instead of going through every channel and group on each call.
+    - Receivers waiting on an empty channel get the messages directly, without going through the deque.
+    - Capacities can be defined per group and per channel, and dropped messages are counted,
+      see `CapacityRulesMixin`.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        **kwargs,
+    ):
+        super().__init__(
+            expiry=expiry,
+            capacity=capacity,
+            channel_capacity=channel_capacity,
+            **kwargs,
+        )
+        self.group_expiry = group_expiry
+
+        self.channels = {}
+        """Dictionary of the messages waiting to be received, indexed by channel.
+        Each value is a deque of (expiration time, message, capacity rule, category) (`dict`)"""
+
+        self.waiters = {}
+        """Dictionary of the futures of the receivers waiting for a message, indexed by channel (`dict`)"""
+
+        self.groups = {}
+        """Dictionary of the members of each group, indexed by group.
+        Each value is a dictionary of join times indexed by channel (`dict`)"""
+
+        self.channel_groups = {}
+        """Dictionary of the groups of each channel, indexed by channel (`dict`)"""
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        """Send a message to a channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        message: `dict`
+            the message, it is not copied
+
+        Raises
+        ------
+        ChannelFull
+            If the channel has reached its capacity
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        self._deliver(channel, message, time.time())
+
+    async def receive(self, channel):
+        """Receive the first message that arrives on a channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+
+        Returns
+        -------
+        `dict`
+            The message
+        """
+        assert self.valid_channel_name(channel)
+        queue = self.channels.get(channel)
+        if queue:
+            self._expire(channel, queue, time.time())
+            if queue:
+                message = queue.popleft()[1]
+                if not queue:
+                    del self.channels[channel]
+                return message
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self.waiters.setdefault(channel, deque())
+        waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The message was delivered right before the cancellation, keep it for the next receiver
+                self.channels.setdefault(channel, deque()).appendleft(
+                    (time.time() + self.expiry, waiter.result(), "default", "direct")
+                )
+            raise
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters and self.waiters.get(channel) is waiters:
+                del self.waiters[channel]
+
+    async def new_channel(self, prefix="specific."):
+        """Return a new channel name that can be used by something in this process.
+
+        Parameters
+        ----------
+        prefix: `string`
+            prefix of the channel name
+
+        Returns
+        -------
+        `string`
+            The name of the channel
+        """
+        return "%s.local!%s" % (
+            prefix,
+            "".join(random.choice(string.ascii_letters) for i in range(12)),
+        )
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        """Add a channel to a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        channel: `string`
+            name of the channel
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        self.groups.setdefault(group, {})[channel] = time.time()
+        self.channel_groups.setdefault(channel, set()).add(group)
+
+    async def group_discard(self, group, channel):
+        """Remove a channel from a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        channel: `string`
+            name of the channel
+        """
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        self._discard(group, channel)
+
+    async def group_send(self, group, message):
+        """Send a message to every channel of a group.
+
+        The same message object is delivered to every channel, channels that are full are skipped.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        message: `dict`
+            the message, it is not copied
+        """
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        members = self.groups.get(group)
+        if not members:
+            return
+        now = time.time()
+        timeout = now - self.group_expiry
+        for channel, joined in list(members.items()):
+            if joined < timeout:
+                self._discard(group, channel)
+                continue
+            try:
+                self._deliver(channel, message, now, group)
+            except ChannelFull:
+                pass
+
+    # Flush extension
+
+    async def flush(self):
+        """Remove every message and group."""
+        self.channels = {}
+        self.groups = {}
+        self.channel_groups = {}
+
+    async def close(self):
+        """Close the layer, there is nothing to close."""
+        pass
+
+    # Stats
+
+    def get_stats(self):
+        """Return the current usage of the layer.
+
+        Returns
+        -------
+        `dict`
+            Dictionary with the number of channels with pending messages, groups, waiting receivers,
+            pending messages, and the length of the longest channel
+        """
+        depths = [len(queue) for queue in self.channels.values()]
+        return {
+            "channels": len(depths),
+            "groups": len(self.groups),
+            "waiting_receivers": sum(len(w) for w in self.waiters.values()),
+            "pending_messages": sum(depths),
+            "max_channel_depth": max(depths, default=0),
+        }
+
+    # Internals
+
+    def _deliver(self, channel, message, now, group=None):
+        """Hand a message to a waiting receiver, or store it in the channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        message: `dict`
+            the message
+        now: `float`
+            current time
+        group: `string`
+            name of the group the message was sent to, None if it was sent directly to the channel
+
+        Raises
+        ------
+        ChannelFull
+            If the channel has reached its capacity
+        """
+        waiters = self.waiters.get(channel)
+        if waiters:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(message)
+                    return
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = deque()
+        else:
+            self._expire(channel, queue, now)
+        label, capacity = self.get_capacity_rule(channel, group)
+        category = self.get_category(group)
+        if len(queue) >= capacity:
+            self.record_full(label, category)
+            raise ChannelFull(channel)
+        queue.append((now + self.expiry, message, label, category))
+
+    def _expire(self, channel, queue, now):
+        """Remove the expired messages of a channel.
+
+        As in `InMemoryChannelLayer`, a channel with expired messages is removed from all its groups.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        queue: `deque`
+            messages of the channel
+        now: `float`
+            current time
+        """
+        expired = False
+        while queue and queue[0][0] < now:
+            _, _, label, category = queue.popleft()
+            self.record_expired(label, category)
+            expired = True
+        if expired:
+            for group in list(self.channel_groups.get(channel, ())):
+                self._discard(group, channel)
+
+    def _discard(self, group, channel):
+        """Remove a channel from a group, updating both indexes.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        channel: `string`
+            name of the channel
+        """
+        members = self.groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+        groups = self.channel_groups.get(channel)
+        if groups is not None:
+            groups.discard(group)
+            if not groups:
+                del self.channel_groups[channel]
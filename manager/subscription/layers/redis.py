@@ -0,0 +1,205 @@
+"""Defines a Redis Channel Layer that serializes and encrypts the messages sent to a group only once."""
+import time
+import random
+import msgpack
+from channels.exceptions import ChannelFull
+from channels_redis.core import RedisChannelLayer
+from subscription.layers.capacity import CapacityRulesMixin
+
+
+class EncryptOnceRedisChannelLayer(CapacityRulesMixin, RedisChannelLayer):
+    """`RedisChannelLayer` that serializes and encrypts the messages sent to a group only once.
+
+    `RedisChannelLayer.group_send` writes a copy of the message to the channel of every process
+    with members in the group, each of them with the list of its member channels,
+    and therefore serializes and encrypts the whole message once per process.
+
+    This layer encrypts the message once, and writes it to every process inside an unencrypted envelope
+    with the list of member channels. Messages sent directly to a channel (`send`) are not changed.
+    Every process sharing the layer must use this class.
+
+    Capacities can be defined per group and per channel, and dropped messages are counted,
+    see `CapacityRulesMixin`. Note that in Redis all the channels of a process share the same
+    sorted set, and therefore the same capacity. The category of expired messages is not known.
+    """
+
+    envelope_marker = b"\x00envelope"
+    """Bytes that precede the envelopes, they cannot be the beginning of a serialized message (`bytes`)"""
+
+    group_send_lua = """
+        local full = {}
+        local expired = {}
+        local current_time = ARGV[#ARGV - 2]
+        local expiry = ARGV[#ARGV - 1]
+        local min_time = ARGV[#ARGV]
+        for i=1,#KEYS do
+            expired[i] = redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, min_time)
+            if redis.call('ZCOUNT', KEYS[i], '-inf', '+inf') < tonumber(ARGV[i + #KEYS]) then
+                redis.call('ZADD', KEYS[i], current_time, ARGV[i])
+                redis.call('EXPIRE', KEYS[i], expiry)
+                full[i] = 0
+            else
+                full[i] = 1
+            end
+        end
+        return {full, expired}
+    """
+    """Lua script that removes the expired messages of the channels of a group, and adds the message
+    to those that are not full. Returns which channels were full and how many messages expired in each (`string`)"""
+
+    async def send(self, channel, message):
+        """Send a message to a channel, counting it if the channel is full.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        message: `dict`
+            the message
+
+        Raises
+        ------
+        ChannelFull
+            If the channel has reached its capacity
+        """
+        try:
+            await super().send(channel, message)
+        except ChannelFull:
+            self.record_full(
+                self.get_capacity_rule(channel)[0], self.get_category(None)
+            )
+            raise
+
+    async def group_send(self, group, message):
+        """Send a message to every channel of a group.
+
+        Channels that are full are skipped, and counted along with the expired messages.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        message: `dict`
+            the message
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        key = self._group_key(group)
+        async with self.connection(self.consistent_hash(group)) as connection:
+            await connection.zremrangebyscore(
+                key, min=0, max=int(time.time()) - self.group_expiry
+            )
+            channel_names = [
+                x.decode("utf8") for x in await connection.zrange(key, 0, -1)
+            ]
+        if not channel_names:
+            return
+
+        (
+            connection_to_channel_keys,
+            channel_key_to_message,
+            channel_key_to_rule,
+        ) = self._map_channel_keys_to_connection(channel_names, message, group)
+        category = self.get_category(group)
+        for index, channel_keys in connection_to_channel_keys.items():
+            args = [channel_key_to_message[k] for k in channel_keys]
+            args += [channel_key_to_rule[k][1] for k in channel_keys]
+            now = time.time()
+            args += [now, self.expiry, int(now) - int(self.expiry)]
+            async with self.connection(index) as connection:
+                full, expired = await connection.eval(
+                    self.group_send_lua, keys=channel_keys, args=args
+                )
+            for channel_key, is_full, expired_count in zip(channel_keys, full, expired):
+                label = channel_key_to_rule[channel_key][0]
+                if is_full:
+                    self.record_full(label, category)
+                if expired_count:
+                    self.record_expired(label, count=expired_count)
+
+    def _map_channel_keys_to_connection(self, channel_names, message, group=None):
+        """Group the channels of a group_send by Redis key, with the message to send to each key.
+
+        Parameters
+        ----------
+        channel_names: `list` of `string`
+            names of the channels of the group
+        message: `dict`
+            the message sent to the group
+        group: `string`
+            name of the group, used to choose the capacities
+
+        Returns
+        -------
+        `tuple`
+            Dictionary of Redis keys indexed by connection index, dictionary of serialized envelopes
+            indexed by Redis key and dictionary of capacity rules, i.e. (label, capacity), indexed by Redis key
+        """
+        connection_to_channel_keys = {}
+        channel_key_to_channels = {}
+        channel_key_to_rule = {}
+        for channel in channel_names:
+            channel_non_local_name = self.non_local_name(channel)
+            channel_key = self.prefix + channel_non_local_name
+            if channel_key not in channel_key_to_channels:
+                channel_key_to_channels[channel_key] = []
+                channel_key_to_rule[channel_key] = self.get_capacity_rule(
+                    channel, group
+                )
+                index = self.consistent_hash(channel_non_local_name)
+                connection_to_channel_keys.setdefault(index, []).append(channel_key)
+            channel_key_to_channels[channel_key].append(channel)
+
+        payload = self.serialize(message) if channel_key_to_channels else None
+        channel_key_to_message = {
+            key: self._serialize_envelope(channels, payload)
+            for key, channels in channel_key_to_channels.items()
+        }
+        return (
+            connection_to_channel_keys,
+            channel_key_to_message,
+            channel_key_to_rule,
+        )
+
+    def _serialize_envelope(self, channels, payload):
+        """Serialize the envelope of a message sent to a group.
+
+        Parameters
+        ----------
+        channels: `list` of `string`
+            names of the member channels of a process
+        payload: `bytes`
+            the serialized (and encrypted) message
+
+        Returns
+        -------
+        `bytes`
+            The serialized envelope
+        """
+        # As in `serialize`, the random prefix guarantees uniqueness in the sorted set of the channel
+        random_prefix = random.getrandbits(8 * 12).to_bytes(12, "big")
+        envelope = msgpack.packb(
+            {"channels": channels, "payload": payload}, use_bin_type=True
+        )
+        return random_prefix + self.envelope_marker + envelope
+
+    def deserialize(self, message):
+        """Deserialize a message or an envelope.
+
+        Parameters
+        ----------
+        message: `bytes`
+            the serialized message or envelope
+
+        Returns
+        -------
+        `dict`
+            The message, messages sent to a group contain the list of member channels in "__asgi_channel__"
+        """
+        body = message[12:]
+        if not body.startswith(self.envelope_marker):
+            return super().deserialize(message)
+        start = len(self.envelope_marker)
+        envelope = msgpack.unpackb(body[start:], raw=False)
+        result = super().deserialize(envelope["payload"])
+        result["__asgi_channel__"] = envelope["channels"]
+        return result
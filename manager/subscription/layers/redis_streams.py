@@ -0,0 +1,346 @@
+"""Defines a Redis Channel Layer that keeps the messages of each group in a capped Redis Stream."""
+import time
+import asyncio
+from channels_redis.core import RedisChannelLayer
+from subscription.metrics import Metrics
+
+
+class RedisStreamsChannelLayer(RedisChannelLayer):
+    """Redis Channel Layer where every group is a Redis Stream, read by offset.
+
+    `group_send` appends the message once to the stream of the group (XADD with MAXLEN),
+    regardless of the number of members. Each process reads the streams of the groups its channels belong to,
+    and delivers the messages to its local channels.
+
+    Every process keeps the offset of the last message read from each stream,
+    so if it is briefly disconnected from Redis it continues reading from there instead of losing messages.
+    How many messages can be recovered is given by the length of the streams,
+    which is configured by category, i.e. the first part of the group names (e.g. "telemetry").
+
+    Messages sent directly to channels (`send`) use the `RedisChannelLayer` implementation,
+    but they are moved to the local channels by a task, the same way as the messages of the streams.
+    Only process-local channels (the ones returned by `new_channel`) can be added to groups.
+
+    The local channels hold up to `capacity` messages, and then drop the oldest ones.
+    Dropped messages are counted in the "receive_buffer_dropped" counter of the `Metrics` registry,
+    labeled by the category of their group, or "direct" if they were not sent to a group.
+    """
+
+    def __init__(
+        self, replay_depth=100, category_replay_depth=None, block=100, **kwargs
+    ):
+        """Initialize the layer.
+
+        Parameters
+        ----------
+        replay_depth: `int`
+            maximum number of messages kept in the stream of each group
+        category_replay_depth: `dict`
+            maximum number of messages kept in the streams of the groups of a given category,
+            indexed by category. Overrides `replay_depth`
+        block: `int`
+            maximum time (in milliseconds) a read of the streams is blocked waiting for messages
+        **kwargs
+            parameters of `RedisChannelLayer`
+        """
+        super().__init__(**kwargs)
+        self.replay_depth = replay_depth
+        self.category_replay_depth = category_replay_depth or {}
+        self.block = block
+
+        self.local_groups = {}
+        """Dictionary of the local members of each group, indexed by group.
+        Each value is a dictionary of join times indexed by channel (`dict`)"""
+
+        self.offsets = {}
+        """Dictionary with the id of the last message read from the stream of each group,
+        indexed by group (`dict`)"""
+
+        self.reader_tasks = {}
+        """Dictionary of the tasks reading the streams of each Redis host, indexed by host index (`dict`)"""
+
+        self.direct_reader_tasks = {}
+        """Dictionary of the tasks reading the messages sent directly to the local channels,
+        indexed by the non-local part of the channel names (`dict`)"""
+
+    def get_replay_depth(self, group):
+        """Return the maximum number of messages kept in the stream of a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+
+        Returns
+        -------
+        `int`
+            The maximum length of the stream
+        """
+        category = group.split("-", 1)[0]
+        return self.category_replay_depth.get(category, self.replay_depth)
+
+    # Channel layer API
+
+    async def receive(self, channel):
+        """Receive the first message that arrives on a channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+
+        Returns
+        -------
+        `dict`
+            The message
+        """
+        assert self.valid_channel_name(channel)
+        if "!" not in channel:
+            return await super().receive(channel)
+        real_channel = self.non_local_name(channel)
+        assert real_channel.endswith(self.client_prefix + "!"), "Wrong client prefix"
+        task = self.direct_reader_tasks.get(real_channel)
+        if task is None or task.done():
+            self.direct_reader_tasks[real_channel] = asyncio.create_task(
+                self._read_direct(real_channel)
+            )
+        queue = self.receive_buffer[channel]
+        message = await queue.get()
+        if queue.empty() and self.receive_buffer.get(channel) is queue:
+            del self.receive_buffer[channel]
+        return message
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        """Add a process-local channel to a group.
+
+        The channel receives the messages sent to the group from now on.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        channel: `string`
+            name of the channel
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "!" in channel, "Only process-local channels can be added to groups"
+        if group not in self.offsets:
+            self.offsets[group] = await self._get_last_id(group)
+        self.local_groups.setdefault(group, {})[channel] = time.time()
+        self._ensure_reader(self.consistent_hash(group))
+
+    async def group_discard(self, group, channel):
+        """Remove a channel from a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        channel: `string`
+            name of the channel
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        members = self.local_groups.get(group)
+        if members is None:
+            return
+        members.pop(channel, None)
+        if not members:
+            del self.local_groups[group]
+            del self.offsets[group]
+
+    async def group_send(self, group, message):
+        """Append a message to the stream of a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        message: `dict`
+            the message
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        key = self._stream_key(group)
+        async with self.connection(self.consistent_hash(group)) as connection:
+            pipeline = connection.pipeline()
+            pipeline.xadd(
+                key,
+                {"message": self.serialize(message)},
+                max_len=self.get_replay_depth(group),
+                exact_len=True,
+            )
+            pipeline.expire(key, self.group_expiry)
+            await pipeline.execute()
+
+    # Flush extension
+
+    async def flush(self):
+        """Delete all messages, groups and streams, and stop reading the streams."""
+        self._stop_readers()
+        self.local_groups = {}
+        self.offsets = {}
+        await super().flush()
+
+    async def close_pools(self):
+        """Stop reading the streams and close all the connections."""
+        self._stop_readers()
+        await super().close_pools()
+
+    # Internals
+
+    def _stream_key(self, group):
+        """Return the key of the stream of a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+
+        Returns
+        -------
+        `string`
+            The key of the stream
+        """
+        return "%s:stream:%s" % (self.prefix, group)
+
+    async def _get_last_id(self, group):
+        """Return the id of the last message of the stream of a group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+
+        Returns
+        -------
+        `string`
+            The id of the last message, "0-0" if the stream is empty
+        """
+        async with self.connection(self.consistent_hash(group)) as connection:
+            last = await connection.xrevrange(self._stream_key(group), count=1)
+        return last[0][0].decode() if last else "0-0"
+
+    def _ensure_reader(self, index):
+        """Start the task reading the streams of a Redis host, if it is not running.
+
+        Parameters
+        ----------
+        index: `int`
+            index of the Redis host
+        """
+        task = self.reader_tasks.get(index)
+        if task is None or task.done():
+            self.reader_tasks[index] = asyncio.create_task(self._read_streams(index))
+
+    def _stop_readers(self):
+        """Cancel the tasks reading the streams and the messages sent directly to the local channels."""
+        for task in [*self.reader_tasks.values(), *self.direct_reader_tasks.values()]:
+            task.cancel()
+        self.reader_tasks = {}
+        self.direct_reader_tasks = {}
+
+    async def _read_direct(self, real_channel):
+        """Move the messages sent directly to the local channels to their buffers.
+
+        Parameters
+        ----------
+        real_channel: `string`
+            non-local part of the names of the channels, e.g. "specific.<client prefix>!"
+        """
+        while True:
+            try:
+                message_channel, message = await self.receive_single(real_channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+                continue
+            if type(message_channel) is list:
+                for channel in message_channel:
+                    self._put(channel, message)
+            else:
+                self._put(message_channel, message)
+
+    async def _read_streams(self, index):
+        """Read the streams of the groups of a Redis host and deliver their messages to the local channels.
+
+        Runs until there are no local groups left in the host. Connection errors are retried,
+        continuing from the last message read from each stream.
+
+        Parameters
+        ----------
+        index: `int`
+            index of the Redis host
+        """
+        while True:
+            groups = [g for g in self.local_groups if self.consistent_hash(g) == index]
+            if not groups:
+                self.reader_tasks.pop(index, None)
+                return
+            try:
+                async with self.connection(index) as connection:
+                    entries = await connection.xread(
+                        [self._stream_key(g) for g in groups],
+                        timeout=self.block,
+                        latest_ids=[self.offsets[g] for g in groups],
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+                continue
+            prefix_length = len(self._stream_key(""))
+            for stream, entry_id, fields in entries:
+                self._deliver(stream.decode()[prefix_length:], entry_id, fields)
+
+    def _deliver(self, group, entry_id, fields):
+        """Deliver a message read from the stream of a group to the local members of the group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        entry_id: `bytes`
+            id of the message in the stream
+        fields: `dict`
+            fields of the message in the stream
+        """
+        members = self.local_groups.get(group)
+        if not members:
+            return
+        self.offsets[group] = entry_id.decode()
+        try:
+            message = self.deserialize(fields[b"message"])
+        except Exception as e:
+            # e.g. messages older than the expiry of the encryption
+            print(e, flush=True)
+            return
+        timeout = time.time() - self.group_expiry
+        for channel, joined in list(members.items()):
+            if joined < timeout:
+                del members[channel]
+                continue
+            self._put(channel, message, group)
+
+    def _put(self, channel, message, group=None):
+        """Put a message in the buffer of a local channel, counting the message dropped if it is full.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        message: `dict`
+            the message
+        group: `string`
+            name of the group the message was sent to, None if it was sent directly to the channel
+        """
+        queue = self.receive_buffer[channel]
+        if queue.full():
+            category = "direct" if group is None else group.split("-", 1)[0]
+            Metrics.increment("receive_buffer_dropped", label=category)
+        queue.put_nowait(message)
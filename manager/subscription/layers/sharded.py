@@ -0,0 +1,162 @@
+"""Defines Redis Channel Layers that spread the groups and channels over several Redis hosts with consistent hashing."""
+import bisect
+import hashlib
+from subscription.layers.redis import EncryptOnceRedisChannelLayer
+from subscription.layers.redis_streams import RedisStreamsChannelLayer
+from subscription.metrics import Metrics
+
+
+class HashRing:
+    """Consistent hashing ring of a list of shards.
+
+    Every shard is placed in the ring several times (virtual nodes), so keys are evenly distributed,
+    and adding or removing a shard only moves the keys of the neighboring positions.
+    """
+
+    def __init__(self, names, replicas=128):
+        """Build the ring.
+
+        Parameters
+        ----------
+        names: `list` of `string`
+            names of the shards, e.g. "host:port". Keys are mapped to their index in this list
+        replicas: `int`
+            number of virtual nodes of each shard
+        """
+        ring = sorted(
+            (self.hash("{}#{}".format(name, replica)), index)
+            for index, name in enumerate(names)
+            for replica in range(replicas)
+        )
+        self.positions = [position for position, _ in ring]
+        self.indexes = [index for _, index in ring]
+
+    @staticmethod
+    def hash(value):
+        """Return the position of a value in the ring.
+
+        Parameters
+        ----------
+        value: `string` or `bytes`
+            the value
+
+        Returns
+        -------
+        `int`
+            The position, between 0 and 2**64 - 1
+        """
+        if isinstance(value, str):
+            value = value.encode("utf8")
+        return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+
+    def get_index(self, key):
+        """Return the index of the shard of a key.
+
+        Parameters
+        ----------
+        key: `string` or `bytes`
+            the key, e.g. a group name
+
+        Returns
+        -------
+        `int`
+            Index of the shard, i.e. of the first virtual node after the key in the ring
+        """
+        position = bisect.bisect(self.positions, self.hash(key))
+        return self.indexes[position % len(self.indexes)]
+
+
+class ConsistentHashingMixin:
+    """Replace the hashing of the Redis Channel Layers with a `HashRing` over their hosts,
+    and count the messages sent to each host.
+
+    The `RedisChannelLayer` uses the same hash to choose the host of groups and process-local channels,
+    by dividing the CRC of the names in equal ranges, which moves most of the keys when a host is added.
+
+    The number of messages is stored in the "channel_layer_shard_messages" counter of the `Metrics` registry,
+    labeled by host. Messages sent to groups are counted in the host of the group,
+    and messages sent to channels in the host of the channel.
+    """
+
+    def __init__(self, *args, replicas=128, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_names = [self._get_shard_name(host) for host in self.hosts]
+        """Names of the hosts, used to label the metrics (`list` of `string`)"""
+        self.ring = HashRing(self.shard_names, replicas=replicas)
+        """Consistent hashing ring of the hosts (`HashRing`)"""
+
+    def consistent_hash(self, value):
+        """Return the index of the host of a group or channel.
+
+        Parameters
+        ----------
+        value: `string` or `bytes`
+            name of the group or channel
+
+        Returns
+        -------
+        `int`
+            Index of the host
+        """
+        if self.ring_size == 1:
+            return 0
+        if isinstance(value, str) and "!" in value:
+            # Process-local channels are hashed by their non-local part,
+            # so `send` and `receive` agree on the host of the channel
+            value = self.non_local_name(value)
+        return self.ring.get_index(value)
+
+    async def send(self, channel, message):
+        """Send a message to a channel and count it in the host of the channel.
+
+        Parameters
+        ----------
+        channel: `string`
+            name of the channel
+        message: `dict`
+            the message
+        """
+        await super().send(channel, message)
+        index = self.consistent_hash(channel)
+        Metrics.increment("channel_layer_shard_messages", label=self.shard_names[index])
+
+    async def group_send(self, group, message):
+        """Send a message to a group and count it in the host of the group.
+
+        Parameters
+        ----------
+        group: `string`
+            name of the group
+        message: `dict`
+            the message
+        """
+        await super().group_send(group, message)
+        index = self.consistent_hash(group)
+        Metrics.increment("channel_layer_shard_messages", label=self.shard_names[index])
+
+    @staticmethod
+    def _get_shard_name(host):
+        """Return the name of a host.
+
+        Parameters
+        ----------
+        host: `dict`
+            connection parameters of the host, as decoded by `RedisChannelLayer.decode_hosts`
+
+        Returns
+        -------
+        `string`
+            The name of the host, "<host>:<port>" or the Redis URL without scheme and credentials
+        """
+        address = host["address"]
+        if isinstance(address, str):
+            return address.split("://", 1)[-1].rsplit("@", 1)[-1]
+        return "{}:{}".format(*address)
+
+
+class ShardedRedisChannelLayer(ConsistentHashingMixin, EncryptOnceRedisChannelLayer):
+    """`EncryptOnceRedisChannelLayer` with consistent hashing of groups and channels over its hosts."""
+
+
+class ShardedRedisStreamsChannelLayer(ConsistentHashingMixin, RedisStreamsChannelLayer):
+    """`RedisStreamsChannelLayer` with consistent hashing of groups and channels over its hosts."""
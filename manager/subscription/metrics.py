@@ -0,0 +1,69 @@
+"""Defines the process-wide metrics of the subscription app."""
+import copy
+
+
+class Metrics:
+    """Process-wide registry of counters, used to export the behavior of the websockets and the Channel Layer.
+
+    Counters can be plain numbers or be split by a label, e.g. the channel prefix or the group category.
+    Every process keeps its own counters.
+    """
+
+    counters = {}
+    """Dictionary containing the counters, indexed by name.
+    Labeled counters are dictionaries indexed by label (`dict`)"""
+
+    @classmethod
+    def increment(cls, name, value=1, label=None):
+        """Increment a counter.
+
+        Parameters
+        ----------
+        name: `string`
+            name of the counter, e.g. "slow_client_evictions"
+        value: `int` or `float`
+            amount to add to the counter
+        label: `string`
+            optional label to split the counter by, e.g. "telemetry"
+        """
+        if label is None:
+            cls.counters[name] = cls.counters.get(name, 0) + value
+        else:
+            labeled = cls.counters.setdefault(name, {})
+            labeled[label] = labeled.get(label, 0) + value
+
+    @classmethod
+    def get(cls, name, label=None):
+        """Return the value of a counter.
+
+        Parameters
+        ----------
+        name: `string`
+            name of the counter
+        label: `string`
+            optional label of the counter
+
+        Returns
+        -------
+        `int` or `float`
+            The value of the counter, 0 if it was never incremented
+        """
+        if label is None:
+            return cls.counters.get(name, 0)
+        return cls.counters.get(name, {}).get(label, 0)
+
+    @classmethod
+    def snapshot(cls):
+        """Return a copy of all the counters.
+
+        Returns
+        -------
+        `dict`
+            Dictionary containing the counters, indexed by name
+        """
+        return copy.deepcopy(cls.counters)
+
+    @classmethod
+    def reset(cls):
+        """Reset all the counters."""
+        cls.counters = {}
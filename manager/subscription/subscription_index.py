@@ -0,0 +1,527 @@
+"""Defines the index of active subscriptions used to route the messages received from the producers."""
+import time
+import uuid
+import asyncio
+from channels.layers import get_channel_layer, InMemoryChannelLayer
+from django.conf import settings
+from subscription.layers.memory import LocalChannelLayer
+
+WILDCARD = "all"
+"""Value that matches any other value in a given level of a subscription pattern (`string`)"""
+
+
+class SubscriptionTrie:
+    """Trie of subscription patterns over the category, csc, salindex and stream levels.
+
+    Patterns are tuples of 4 strings, any of which can be the `WILDCARD`.
+    Every pattern keeps a reference count, so it is only removed from the trie when
+    all the subscribers that added it have discarded it.
+    """
+
+    depth = 4
+    """Number of levels of the patterns (`int`)"""
+
+    def __init__(self):
+        self.root = {}
+        self.counts = {}
+
+    def __contains__(self, pattern):
+        return tuple(pattern) in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def patterns(self):
+        """Return the patterns stored in the trie.
+
+        Returns
+        -------
+        `list` of `tuple`
+            The stored patterns
+        """
+        return list(self.counts)
+
+    def add(self, pattern, count=1):
+        """Add a pattern to the trie, or increase its reference count if it was already there.
+
+        Parameters
+        ----------
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        count: `int`
+            number of references to add
+
+        Returns
+        -------
+        `bool`
+            True if the pattern was not in the trie before, False if not
+        """
+        pattern = tuple(pattern)
+        if pattern in self.counts:
+            self.counts[pattern] += count
+            return False
+        node = self.root
+        for value in pattern[:-1]:
+            node = node.setdefault(value, {})
+        node[pattern[-1]] = pattern
+        self.counts[pattern] = count
+        return True
+
+    def discard(self, pattern, count=1):
+        """Decrease the reference count of a pattern, removing it from the trie when it reaches zero.
+
+        Parameters
+        ----------
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        count: `int`
+            number of references to remove
+
+        Returns
+        -------
+        `bool`
+            True if the pattern was removed from the trie, False if not
+        """
+        pattern = tuple(pattern)
+        if pattern not in self.counts:
+            return False
+        self.counts[pattern] -= count
+        if self.counts[pattern] > 0:
+            return False
+        del self.counts[pattern]
+        path = [self.root]
+        for value in pattern[:-1]:
+            path.append(path[-1][value])
+        del path[-1][pattern[-1]]
+        # Prune the branches that were left empty
+        for level in range(len(pattern) - 2, -1, -1):
+            if path[level + 1]:
+                break
+            del path[level][pattern[level]]
+        return True
+
+    def match(self, category, csc, salindex, stream):
+        """Return all the patterns that match a given stream.
+
+        Parameters
+        ----------
+        category: `string`
+            category of the stream, e.g. 'event' or 'telemetry'
+        csc: `string`
+            CSC of the stream, e.g. 'ScriptQueue'
+        salindex: `string`
+            SAL index of the CSC of the stream, e.g. '1'
+        stream: `string`
+            name of the stream, e.g. 'summaryState'
+
+        Returns
+        -------
+        `list` of `tuple`
+            The patterns that match the stream
+        """
+        nodes = [self.root]
+        for value in (category, csc, salindex, stream):
+            next_nodes = []
+            for node in nodes:
+                if value in node:
+                    next_nodes.append(node[value])
+                if value != WILDCARD and WILDCARD in node:
+                    next_nodes.append(node[WILDCARD])
+            if not next_nodes:
+                return []
+            nodes = next_nodes
+        return nodes
+
+
+class SubscriptionIndex:
+    """Process-wide index of the subscriptions with at least one subscriber.
+
+    Consumers register their subscriptions here, and the index is used to route every incoming
+    stream to the groups that actually have subscribers with a single lookup.
+    Its patterns define the interest set: the streams that have at least one subscriber.
+    Producers can listen to the changes of the interest set in order to only publish the watched streams.
+
+    When the Channel Layer is shared by several processes (e.g. the RedisChannelLayer),
+    each process announces its subscriptions to the others through the `group_name` group,
+    periodically and whenever one of them is added or removed. Announcements from processes that stop
+    announcing expire after some intervals. Until this process has heard a full round of announcements,
+    streams are also routed to the default groups, in order to not miss subscribers from other processes.
+    """
+
+    group_name = "subscription_index"
+    """Name of the group used to share the subscriptions between processes (`string`)"""
+
+    origin = uuid.uuid4().hex
+    """Identifier of this process in the announcements (`string`)"""
+
+    trie = SubscriptionTrie()
+    """Trie with the subscriptions of all the processes (`SubscriptionTrie`)"""
+
+    local_patterns = {}
+    """Number of subscribers in this process, indexed by pattern (`dict`)"""
+
+    remote_patterns = {}
+    """Patterns of other processes and the time of their last announcement, indexed by origin (`dict`)"""
+
+    channel_name = None
+    """Name of the channel used to receive the announcements (`string`)"""
+
+    announce_task = None
+    """Reference to the task that announces the subscriptions of this process."""
+
+    receive_task = None
+    """Reference to the task that receives the announcements of other processes."""
+
+    synced = False
+    """Define wether or not the index has heard the announcements of all the processes (`bool`)"""
+
+    listeners = set()
+    """Names of the channels of this process that receive the changes of the index,
+    e.g. those of the producers (`set` of `string`)"""
+
+    pending_changes = {}
+    """Changes not yet notified to the listeners, True for added patterns and False
+    for removed patterns, indexed by pattern (`dict`)"""
+
+    notify_task = None
+    """Reference to the task that notifies the pending changes to the listeners."""
+
+    @classmethod
+    def is_shared(cls):
+        """Define wether or not the Channel Layer is shared with other processes.
+
+        Returns
+        -------
+        `bool`
+            True if the Channel Layer is shared, False if not
+        """
+        return not isinstance(
+            get_channel_layer(), (InMemoryChannelLayer, LocalChannelLayer)
+        )
+
+    @classmethod
+    def initialize(cls):
+        """Initialize the SubscriptionIndex.
+
+        If the Channel Layer is shared with other processes, run 2 async tasks in the event loop,
+        one to announce the subscriptions of this process periodically,
+        and the other to receive the announcements of other processes.
+        """
+        if not cls.is_shared():
+            cls.synced = True
+            return
+        if not cls.announce_task:
+            cls.announce_task = asyncio.create_task(cls.announce())
+        if not cls.receive_task:
+            cls.receive_task = asyncio.create_task(cls.receive())
+
+    @classmethod
+    async def add(cls, pattern):
+        """Register a subscriber of this process to a pattern.
+
+        Parameters
+        ----------
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        """
+        pattern = tuple(pattern)
+        cls.local_patterns[pattern] = cls.local_patterns.get(pattern, 0) + 1
+        if cls.trie.add(pattern):
+            cls._record_change(pattern, True)
+        if cls.local_patterns[pattern] == 1 and cls.channel_name:
+            await cls._send_update("add", pattern)
+
+    @classmethod
+    async def discard(cls, pattern):
+        """Unregister a subscriber of this process from a pattern.
+
+        Parameters
+        ----------
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        """
+        pattern = tuple(pattern)
+        if pattern not in cls.local_patterns:
+            return
+        cls.local_patterns[pattern] -= 1
+        if cls.trie.discard(pattern):
+            cls._record_change(pattern, False)
+        if cls.local_patterns[pattern] == 0:
+            del cls.local_patterns[pattern]
+            if cls.channel_name:
+                await cls._send_update("discard", pattern)
+
+    @classmethod
+    def match(cls, category, csc, salindex, stream):
+        """Return the subscription patterns a given stream must be routed to.
+
+        Parameters
+        ----------
+        category: `string`
+            category of the stream, e.g. 'event' or 'telemetry'
+        csc: `string`
+            CSC of the stream, e.g. 'ScriptQueue'
+        salindex: `string`
+            SAL index of the CSC of the stream, e.g. '1'
+        stream: `string`
+            name of the stream, e.g. 'summaryState'
+
+        Returns
+        -------
+        `list` of `tuple`
+            The patterns that match the stream
+        """
+        patterns = cls.trie.match(category, csc, salindex, stream)
+        if cls.synced:
+            return patterns
+        default_patterns = [
+            (category, csc, salindex, stream),
+            (category, csc, salindex, WILDCARD),
+            (category, WILDCARD, WILDCARD, WILDCARD),
+        ]
+        return list(dict.fromkeys(patterns + default_patterns))
+
+    @classmethod
+    async def announce(cls):
+        """Announce the subscriptions of this process periodically and expire the stale ones of other processes.
+
+        This is what the `announce_task` does
+        """
+        channel_layer = get_channel_layer()
+        interval = settings.SUBSCRIPTION_INDEX_ANNOUNCE_INTERVAL
+        started_at = time.time()
+        while True:
+            try:
+                if not cls.channel_name:
+                    cls.channel_name = await channel_layer.new_channel()
+                # Refresh the membership, so it does not expire
+                await channel_layer.group_add(cls.group_name, cls.channel_name)
+                await channel_layer.group_send(
+                    cls.group_name,
+                    {
+                        "type": "subscription_index.announce",
+                        "origin": cls.origin,
+                        "patterns": [list(p) for p in cls.local_patterns],
+                    },
+                )
+                now = time.time()
+                for origin, (patterns, last_seen) in list(cls.remote_patterns.items()):
+                    if now - last_seen > 3 * interval:
+                        cls._update_remote(origin, set())
+                        del cls.remote_patterns[origin]
+                if not cls.synced and now - started_at > interval:
+                    cls.synced = True
+                    await cls._notify_snapshot()
+                await asyncio.sleep(interval)
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(interval)
+
+    @classmethod
+    async def receive(cls):
+        """Receive and apply the announcements of other processes.
+
+        This is what the `receive_task` does
+        """
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                if not cls.channel_name:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await channel_layer.receive(cls.channel_name)
+                origin = message["origin"]
+                if origin == cls.origin:
+                    continue
+                patterns = (
+                    cls.remote_patterns[origin][0]
+                    if origin in cls.remote_patterns
+                    else set()
+                )
+                if message["type"] == "subscription_index.announce":
+                    patterns = {tuple(p) for p in message["patterns"]}
+                elif message["type"] == "subscription_index.add":
+                    patterns = patterns | {tuple(message["pattern"])}
+                elif message["type"] == "subscription_index.discard":
+                    patterns = patterns - {tuple(message["pattern"])}
+                cls._update_remote(origin, patterns)
+            except Exception as e:
+                print(e, flush=True)
+                await asyncio.sleep(1)
+
+    @classmethod
+    def _update_remote(cls, origin, patterns):
+        """Replace the patterns of another process in the trie.
+
+        Parameters
+        ----------
+        origin: `string`
+            identifier of the process
+        patterns: `set` of `tuple`
+            the current patterns of the process
+        """
+        previous = (
+            cls.remote_patterns[origin][0] if origin in cls.remote_patterns else set()
+        )
+        for pattern in patterns - previous:
+            if cls.trie.add(pattern):
+                cls._record_change(pattern, True)
+        for pattern in previous - patterns:
+            if cls.trie.discard(pattern):
+                cls._record_change(pattern, False)
+        cls.remote_patterns[origin] = (patterns, time.time())
+
+    @classmethod
+    async def _send_update(cls, operation, pattern):
+        """Notify other processes that a pattern was added to or removed from this process.
+
+        Parameters
+        ----------
+        operation: `string`
+            either 'add' or 'discard'
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        """
+        await get_channel_layer().group_send(
+            cls.group_name,
+            {
+                "type": "subscription_index.{}".format(operation),
+                "origin": cls.origin,
+                "pattern": list(pattern),
+            },
+        )
+
+    @classmethod
+    def add_listener(cls, channel_name):
+        """Register a channel of this process to receive the changes of the index.
+
+        Parameters
+        ----------
+        channel_name: `string`
+            name of the channel
+
+        Returns
+        -------
+        `dict`
+            Snapshot of the index, see `get_snapshot`
+        """
+        cls.listeners.add(channel_name)
+        return cls.get_snapshot()
+
+    @classmethod
+    def discard_listener(cls, channel_name):
+        """Unregister a channel of this process from the changes of the index.
+
+        Parameters
+        ----------
+        channel_name: `string`
+            name of the channel
+        """
+        cls.listeners.discard(channel_name)
+
+    @classmethod
+    def get_snapshot(cls):
+        """Return all the patterns with at least one subscriber.
+
+        Returns
+        -------
+        `dict`
+            Dictionary containing the following keys:
+            - snapshot: True, the message contains all the patterns
+            - synced: True if the index has heard the subscriptions of all the processes, False if not
+            - added: list of patterns, each of them a list of [category, csc, salindex, stream]
+            - removed: empty list
+        """
+        return {
+            "snapshot": True,
+            "synced": cls.synced,
+            "added": [list(p) for p in cls.trie.patterns()],
+            "removed": [],
+        }
+
+    @classmethod
+    def _record_change(cls, pattern, added):
+        """Record a pattern that was added to or removed from the trie, to notify it to the listeners.
+
+        Changes are notified in batches, every `INTEREST_FEEDBACK_INTERVAL` seconds,
+        and changes that cancel each other within a batch are not notified.
+
+        Parameters
+        ----------
+        pattern: `tuple`
+            tuple of (category, csc, salindex, stream)
+        added: `bool`
+            True if the pattern was added, False if it was removed
+        """
+        if not cls.listeners:
+            return
+        if cls.pending_changes.get(pattern) == (not added):
+            del cls.pending_changes[pattern]
+        else:
+            cls.pending_changes[pattern] = added
+        if not cls.notify_task or cls.notify_task.done():
+            cls.notify_task = asyncio.create_task(cls._notify_changes())
+
+    @classmethod
+    async def _notify_changes(cls):
+        """Notify the pending changes to the listeners.
+
+        This is what the `notify_task` does
+        """
+        while True:
+            await asyncio.sleep(settings.INTEREST_FEEDBACK_INTERVAL)
+            changes = cls.pending_changes
+            cls.pending_changes = {}
+            if not changes:
+                return
+            await cls._send_to_listeners(
+                {
+                    "type": "interest_update",
+                    "snapshot": False,
+                    "synced": cls.synced,
+                    "added": [list(p) for p, added in changes.items() if added],
+                    "removed": [list(p) for p, added in changes.items() if not added],
+                }
+            )
+
+    @classmethod
+    async def _notify_snapshot(cls):
+        """Notify a snapshot of the index to the listeners."""
+        cls.pending_changes = {}
+        await cls._send_to_listeners({"type": "interest_update", **cls.get_snapshot()})
+
+    @classmethod
+    async def _send_to_listeners(cls, message):
+        """Send a message to all the listeners.
+
+        Parameters
+        ----------
+        message: `dict`
+            the message to send
+        """
+        channel_layer = get_channel_layer()
+        for channel_name in list(cls.listeners):
+            try:
+                await channel_layer.send(channel_name, message)
+            except Exception as e:
+                print(e, flush=True)
+
+    @classmethod
+    async def reset(cls):
+        """Reset the `SubscriptionIndex`, cancelling its tasks and removing all the subscriptions."""
+        if cls.announce_task:
+            cls.announce_task.cancel()
+            cls.announce_task = None
+        if cls.receive_task:
+            cls.receive_task.cancel()
+            cls.receive_task = None
+        if cls.notify_task:
+            cls.notify_task.cancel()
+            cls.notify_task = None
+        cls.listeners = set()
+        cls.pending_changes = {}
+        cls.channel_name = None
+        cls.trie = SubscriptionTrie()
+        cls.local_patterns = {}
+        cls.remote_patterns = {}
+        cls.synced = False
@@ -0,0 +1,165 @@
+"""Defines a stand-in Redis, an in-process fake of the Redis commands used by the Channel Layers in the tests."""
+import time
+import asyncio
+import itertools
+
+
+class StandInRedis:
+    """In-process Redis server that implements the stream commands used by the `RedisStreamsChannelLayer`,
+    with the interface of the `aioredis` connections: XADD (with MAXLEN), XREVRANGE, XREAD (blocking),
+    XLEN and EXPIRE, which is ignored. Pipelines execute their commands in order.
+    """
+
+    def __init__(self):
+        self.streams = {}
+        """Entries of each stream, as (id, fields) tuples, indexed by key (`dict`)"""
+
+        self.commands = []
+        """Name and key of every command received, e.g. ("XADD", "asgi:stream:group") (`list`)"""
+
+        self.ids = itertools.count(1)
+        """Sequence of the ids of the entries (`itertools.count`)"""
+
+        self.condition = None
+        """Condition notified when entries are added, created in the event loop of the tests (`asyncio.Condition`)"""
+
+    def get_condition(self):
+        """Return the condition notified when entries are added, creating it if needed."""
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        return self.condition
+
+    @staticmethod
+    def parse_id(entry_id):
+        """Return an entry id, e.g. b"1600000000000-1", as a tuple that can be compared.
+
+        Parameters
+        ----------
+        entry_id: `string` or `bytes`
+            The id
+
+        Returns
+        -------
+        `tuple`
+            The milliseconds and sequence number of the id
+        """
+        if isinstance(entry_id, bytes):
+            entry_id = entry_id.decode()
+        milliseconds, _, sequence = entry_id.partition("-")
+        return int(milliseconds), int(sequence or 0)
+
+    @staticmethod
+    def get_key(key):
+        """Return a key as `string`."""
+        return key.decode() if isinstance(key, bytes) else key
+
+    async def xadd(
+        self, stream, fields, message_id=b"*", max_len=None, exact_len=False
+    ):
+        key = self.get_key(stream)
+        self.commands.append(("XADD", key))
+        entry_id = "{}-{}".format(int(time.time() * 1000), next(self.ids)).encode()
+        entries = self.streams.setdefault(key, [])
+        entries.append(
+            (
+                entry_id,
+                {
+                    (k.encode() if isinstance(k, str) else k): v
+                    for k, v in fields.items()
+                },
+            )
+        )
+        if max_len is not None:
+            del entries[:-max_len]
+        async with self.get_condition():
+            self.condition.notify_all()
+        return entry_id
+
+    async def xlen(self, stream):
+        return len(self.streams.get(self.get_key(stream), []))
+
+    async def xrevrange(self, stream, start="+", stop="-", count=None):
+        key = self.get_key(stream)
+        self.commands.append(("XREVRANGE", key))
+        entries = list(reversed(self.streams.get(key, [])))
+        return entries[:count] if count is not None else entries
+
+    async def xread(self, streams, timeout=0, count=None, latest_ids=None):
+        keys = [self.get_key(stream) for stream in streams]
+        self.commands.append(("XREAD", tuple(keys)))
+        latest_ids = [self.parse_id(i) for i in latest_ids]
+
+        def read():
+            return [
+                (key.encode(), entry_id, fields)
+                for key, latest in zip(keys, latest_ids)
+                for entry_id, fields in self.streams.get(key, [])
+                if self.parse_id(entry_id) > latest
+            ]
+
+        async with self.get_condition():
+            try:
+                await asyncio.wait_for(
+                    self.condition.wait_for(read), timeout / 1000 if timeout else None
+                )
+            except asyncio.TimeoutError:
+                return []
+        return read()
+
+    async def expire(self, key, timeout):
+        self.commands.append(("EXPIRE", self.get_key(key)))
+        return True
+
+    def pipeline(self):
+        return StandInPipeline(self)
+
+
+class StandInPipeline:
+    """Pipeline of a `StandInRedis`, which runs its commands in order when executed."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((command, args, kwargs))
+
+        return queue
+
+    async def execute(self):
+        return [await command(*args, **kwargs) for command, args, kwargs in self.calls]
+
+
+class StandInConnection:
+    """Async context manager that returns a `StandInRedis`, as `RedisChannelLayer.connection` does
+    with the connections of its pools."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self.redis
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+def use_stand_in_redis(layer):
+    """Replace the Redis hosts of a Channel Layer with stand-in servers.
+
+    Parameters
+    ----------
+    layer: `channels_redis.core.RedisChannelLayer`
+        The layer
+
+    Returns
+    -------
+    `list` of `StandInRedis`
+        The servers, in the order of the hosts of the layer
+    """
+    servers = [StandInRedis() for host in layer.hosts]
+    layer.connection = lambda index: StandInConnection(servers[index])
+    return servers
@@ -0,0 +1,32 @@
+"""Tests for the filters of the subscriptions to all streams."""
+from subscription.filters import SubscriptionFilter
+
+
+class TestSubscriptionFilter:
+    """Test that the filters only let through the data of the allowed cscs, salindices and streams."""
+
+    data = [
+        {"csc": "ATDome", "salindex": 1, "data": {"stream1": {}, "stream2": {}}},
+        {"csc": "ScriptQueue", "salindex": 2, "data": {"stream1": {}}},
+    ]
+
+    def test_streams(self):
+        """Test that only the streams that match the patterns pass the filter."""
+        # Arrange
+        subscription_filter = SubscriptionFilter.from_dict({"stream": ["*2"]})
+        # Act
+        filtered = subscription_filter.apply(self.data)
+        # Assert
+        assert filtered == [
+            {"csc": "ATDome", "salindex": 1, "data": {"stream2": {}}},
+        ]
+
+    def test_empty_lists_match_nothing(self):
+        """Test that empty lists of cscs, salindices or streams let nothing through."""
+        for level in SubscriptionFilter.levels:
+            # Arrange
+            subscription_filter = SubscriptionFilter.from_dict({level: []})
+            # Act
+            filtered = subscription_filter.apply(self.data)
+            # Assert
+            assert filtered == [], level
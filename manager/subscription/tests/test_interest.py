@@ -0,0 +1,67 @@
+"""Tests for the notification of the interest set to the producers."""
+import pytest
+from django.contrib.auth.models import User, Permission
+from channels.testing import WebsocketCommunicator
+from manager.routing import application
+from api.models import Token
+
+
+class TestInterest:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        self.user = User.objects.create_user(
+            "username", password="123", email="user@user.cl"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
+        self.url = "manager/ws/subscription/?token={}".format(self.token)
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_producer_receives_interest_changes(self):
+        """Test that a producer receives the streams that clients subscribe to and unsubscribe from."""
+        # Arrange
+        client_communicator = WebsocketCommunicator(application, self.url)
+        producer_communicator = WebsocketCommunicator(application, self.url)
+        await client_communicator.connect()
+        await producer_communicator.connect()
+        subscription_msg = {
+            "option": "subscribe",
+            "category": "event",
+            "csc": "ATDome",
+            "salindex": 1,
+            "stream": "summaryState",
+        }
+        pattern = ["event", "ATDome", "1", "summaryState"]
+
+        # Act 1: the producer subscribes to the interest set
+        await producer_communicator.send_json_to({"action": "subscribe_interest"})
+        response = await producer_communicator.receive_json_from()
+
+        # Assert 1: the producer receives a snapshot
+        assert response["interest"]["snapshot"]
+        assert response["interest"]["synced"]
+        assert pattern not in response["interest"]["added"]
+
+        # Act 2: a client subscribes to a stream
+        await client_communicator.send_json_to(subscription_msg)
+        await client_communicator.receive_json_from()
+        response = await producer_communicator.receive_json_from()
+
+        # Assert 2: the producer receives the new stream
+        assert not response["interest"]["snapshot"]
+        assert response["interest"]["added"] == [pattern]
+        assert response["interest"]["removed"] == []
+
+        # Act 3: the client unsubscribes from the stream
+        subscription_msg["option"] = "unsubscribe"
+        await client_communicator.send_json_to(subscription_msg)
+        await client_communicator.receive_json_from()
+        response = await producer_communicator.receive_json_from()
+
+        # Assert 3: the producer receives the removed stream
+        assert response["interest"]["added"] == []
+        assert response["interest"]["removed"] == [pattern]
+
+        await client_communicator.disconnect()
+        await producer_communicator.disconnect()
@@ -0,0 +1,435 @@
+"""Tests for the Channel Layer backends of the subscription app."""
+import os
+import socket
+import asyncio
+import pytest
+from unittest.mock import patch
+from channels.exceptions import ChannelFull
+from subscription.layers.memory import LocalChannelLayer
+from subscription.layers.redis import EncryptOnceRedisChannelLayer
+from subscription.layers.redis_streams import RedisStreamsChannelLayer
+from subscription.layers.sharded import HashRing, ShardedRedisStreamsChannelLayer
+from subscription.metrics import Metrics
+from subscription.tests.redis_server import use_stand_in_redis
+
+REDIS_ADDRESS = (
+    os.environ.get("REDIS_HOST") or "localhost",
+    int(os.environ.get("REDIS_PORT", 6379)),
+)
+
+
+def redis_available():
+    """Return True if there is a Redis server listening in REDIS_ADDRESS."""
+    try:
+        socket.create_connection(REDIS_ADDRESS, timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+class TestLocalChannelLayer:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        self.layer = LocalChannelLayer(
+            capacity=3,
+            channel_capacity={"*-telemetry": 1},
+            group_capacity={"*-all": 5},
+        )
+        Metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_group_send_delivers_the_same_message(self):
+        """Test that group_send delivers the same message object to every member of the group, without copies."""
+        # Arrange
+        channels = [await self.layer.new_channel() for i in range(3)]
+        for channel in channels:
+            await self.layer.group_add("event-ATDome-1-all", channel)
+        message = {"type": "subscription_data", "data": {"summaryState": 1}}
+
+        # Act
+        await self.layer.group_send("event-ATDome-1-all", message)
+        received = [await self.layer.receive(channel) for channel in channels]
+
+        # Assert
+        assert all(m is message for m in received)
+
+    @pytest.mark.asyncio
+    async def test_waiting_receiver_gets_the_message(self):
+        """Test that a receiver waiting on an empty channel gets the message sent to it."""
+        # Arrange
+        channel = await self.layer.new_channel()
+        receive_task = asyncio.create_task(self.layer.receive(channel))
+        await asyncio.sleep(0)
+
+        # Act
+        await self.layer.send(channel, {"type": "test"})
+
+        # Assert
+        assert await asyncio.wait_for(receive_task, 1) == {"type": "test"}
+        assert self.layer.get_stats()["waiting_receivers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_capacity_per_channel(self):
+        """Test that channels are bounded by the capacity of their name and ChannelFull errors are counted."""
+        # Arrange
+        channel = await self.layer.new_channel()
+        telemetry_channel = channel + "-telemetry"
+        for i in range(3):
+            await self.layer.send(channel, {"type": "test", "i": i})
+        await self.layer.send(telemetry_channel, {"type": "test"})
+
+        # Act and Assert
+        with pytest.raises(ChannelFull):
+            await self.layer.send(channel, {"type": "test"})
+        with pytest.raises(ChannelFull):
+            await self.layer.send(telemetry_channel, {"type": "test"})
+        assert Metrics.get("channel_full", label="default") == 1
+        assert Metrics.get("channel_full", label="*-telemetry") == 1
+        assert Metrics.get("channel_full_categories", label="direct") == 2
+        assert self.layer.get_stats()["max_channel_depth"] == 3
+        assert (await self.layer.receive(channel))["i"] == 0
+
+    @pytest.mark.asyncio
+    async def test_capacity_per_group(self):
+        """Test that messages sent to "all" groups get a larger capacity than the ones sent to single streams."""
+        # Arrange
+        channel = await self.layer.new_channel()
+        await self.layer.group_add("event-ATDome-1-summaryState", channel)
+        await self.layer.group_add("event-all-all-all", channel)
+
+        # Act
+        for i in range(6):
+            await self.layer.group_send("event-ATDome-1-summaryState", {"type": "test"})
+            await self.layer.group_send("event-all-all-all", {"type": "test"})
+
+        # Assert
+        assert len(self.layer.channels[channel]) == 5
+        assert Metrics.get("channel_full", label="default") == 4
+        assert Metrics.get("channel_full", label="*-all") == 3
+        assert Metrics.get("channel_full_categories", label="event") == 7
+
+    @pytest.mark.asyncio
+    async def test_expired_messages_remove_the_channel_from_its_groups(self):
+        """Test that a channel with expired messages is removed from all its groups."""
+        # Arrange
+        self.layer.expiry = -1
+        channel = await self.layer.new_channel()
+        await self.layer.group_add("event-all-all-all", channel)
+        await self.layer.group_add("telemetry-all-all-all", channel)
+        await self.layer.group_send("event-all-all-all", {"type": "test"})
+
+        # Act
+        await self.layer.group_send("event-all-all-all", {"type": "test"})
+
+        # Assert
+        assert self.layer.groups == {}
+        assert self.layer.channel_groups == {}
+        assert Metrics.get("channel_expired", label="*-all") == 1
+        assert Metrics.get("channel_expired_categories", label="event") == 1
+
+
+class TestRedisStreamsChannelLayer:
+    """Test the `RedisStreamsChannelLayer` against a stand-in Redis, and a local Redis server if there is one."""
+
+    @pytest.fixture(
+        autouse=True,
+        params=[
+            "stand-in",
+            pytest.param(
+                "redis",
+                marks=pytest.mark.skipif(
+                    not redis_available(), reason="requires a local Redis server"
+                ),
+            ),
+        ],
+    )
+    def layer(self, request):
+        self.stand_in = request.param == "stand-in"
+        self.layer = self.make_layer()
+        Metrics.reset()
+
+    def make_layer(self, **kwargs):
+        """Return a layer connected to the stand-in Redis or to the local Redis server."""
+        layer = RedisStreamsChannelLayer(
+            hosts=[REDIS_ADDRESS],
+            prefix="test-streams",
+            replay_depth=5,
+            category_replay_depth={"telemetry": 2},
+            **kwargs,
+        )
+        if self.stand_in:
+            use_stand_in_redis(layer)
+        return layer
+
+    async def close(self):
+        """Stop reading the streams, and delete them from Redis."""
+        if self.stand_in:
+            self.layer._stop_readers()
+        else:
+            await self.layer.flush()
+
+    @pytest.mark.asyncio
+    async def test_group_send_delivers_to_local_members(self):
+        """Test that every member of a group receives the messages sent to it, in order."""
+        # Arrange
+        channels = [await self.layer.new_channel() for i in range(2)]
+        for channel in channels:
+            await self.layer.group_add("event-ATDome-1-all", channel)
+
+        # Act
+        for i in range(3):
+            await self.layer.group_send("event-ATDome-1-all", {"type": "test", "i": i})
+
+        # Assert
+        for channel in channels:
+            for i in range(3):
+                message = await asyncio.wait_for(self.layer.receive(channel), 1)
+                assert message == {"type": "test", "i": i}
+        await self.close()
+
+    @pytest.mark.asyncio
+    async def test_streams_are_capped(self):
+        """Test that the streams keep up to the replay depth of their category."""
+        # Act
+        for i in range(6):
+            await self.layer.group_send("event-ATDome-1-all", {"type": "event"})
+            await self.layer.group_send("telemetry-ATDome-1-all", {"type": "telemetry"})
+
+        # Assert
+        async with self.layer.connection(0) as connection:
+            assert (
+                await connection.xlen(self.layer._stream_key("event-ATDome-1-all")) == 5
+            )
+            assert (
+                await connection.xlen(self.layer._stream_key("telemetry-ATDome-1-all"))
+                == 2
+            )
+        await self.close()
+
+    @pytest.mark.asyncio
+    async def test_catch_up_after_disconnection(self):
+        """Test that the messages sent while a process is disconnected are received when it reconnects,
+        up to the replay depth of their category."""
+        # Arrange
+        channel = await self.layer.new_channel()
+        await self.layer.group_add("event-ATDome-1-all", channel)
+        await self.layer.group_add("telemetry-ATDome-1-all", channel)
+        self.layer._stop_readers()
+
+        # Act
+        for i in range(6):
+            await self.layer.group_send("event-ATDome-1-all", {"type": "event", "i": i})
+            await self.layer.group_send(
+                "telemetry-ATDome-1-all", {"type": "telemetry", "i": i}
+            )
+        self.layer._ensure_reader(0)
+        received = [
+            await asyncio.wait_for(self.layer.receive(channel), 1) for i in range(7)
+        ]
+
+        # Assert
+        assert [m["i"] for m in received if m["type"] == "event"] == [1, 2, 3, 4, 5]
+        assert [m["i"] for m in received if m["type"] == "telemetry"] == [4, 5]
+        await self.close()
+
+    @pytest.mark.asyncio
+    async def test_full_buffers_are_counted(self):
+        """Test that the messages dropped by the buffers of the local channels are counted by category."""
+        # Arrange
+        self.layer = self.make_layer(capacity=3)
+        channel = await self.layer.new_channel()
+        await self.layer.group_add("event-ATDome-1-all", channel)
+
+        # Act
+        for i in range(5):
+            await self.layer.group_send("event-ATDome-1-all", {"type": "test", "i": i})
+        last_id = await self.layer._get_last_id("event-ATDome-1-all")
+        while self.layer.offsets["event-ATDome-1-all"] != last_id:
+            await asyncio.sleep(0.01)
+        received = [await self.layer.receive(channel) for i in range(3)]
+
+        # Assert
+        assert [m["i"] for m in received] == [2, 3, 4]
+        assert Metrics.get("receive_buffer_dropped", label="event") == 2
+        await self.close()
+
+
+class TestHashRing:
+    def test_keys_are_spread_and_stable(self):
+        """Test that groups are spread over all the shards, and adding a shard only moves part of them."""
+        # Arrange
+        groups = ["telemetry-ATMCS-0-stream{}".format(i) for i in range(1000)]
+        ring = HashRing(["redis1:6379", "redis2:6379", "redis3:6379"])
+        bigger_ring = HashRing(
+            ["redis1:6379", "redis2:6379", "redis3:6379", "redis4:6379"]
+        )
+
+        # Act
+        shards = [ring.get_index(group) for group in groups]
+        bigger_shards = [bigger_ring.get_index(group) for group in groups]
+
+        # Assert
+        for index in range(3):
+            assert 200 < shards.count(index) < 470
+        moved = [a for a, b in zip(shards, bigger_shards) if a != b]
+        assert all(b == 3 for a, b in zip(shards, bigger_shards) if a != b)
+        assert len(moved) < 400
+
+
+class TestShardedRedisStreamsChannelLayer:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        Metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_groups_are_routed_by_the_ring(self):
+        """Test that every group is written to and read from the shard given by the ring."""
+        # Arrange
+        hosts = ["redis1:6379", "redis2:6379", "redis3:6379"]
+        layer = ShardedRedisStreamsChannelLayer(hosts=hosts, prefix="test-sharded")
+        shards = use_stand_in_redis(layer)
+        groups = ["event-ATDome-1-stream{}".format(i) for i in range(30)]
+        channel = await layer.new_channel()
+        for group in groups:
+            await layer.group_add(group, channel)
+
+        # Act
+        for group in groups:
+            await layer.group_send(group, {"type": "test", "group": group})
+        received = [
+            await asyncio.wait_for(layer.receive(channel), 1) for group in groups
+        ]
+
+        # Assert
+        assert sorted(m["group"] for m in received) == sorted(groups)
+        for group in groups:
+            index = layer.ring.get_index(group)
+            for shard_index, shard in enumerate(shards):
+                assert (layer._stream_key(group) in shard.streams) == (
+                    shard_index == index
+                )
+        assert all(shard.streams for shard in shards)
+        assert layer.consistent_hash(channel) == layer.consistent_hash(
+            layer.non_local_name(channel)
+        )
+        shard_messages = Metrics.get("channel_layer_shard_messages")
+        assert shard_messages == {
+            host: sum(1 for group in groups if layer.ring.get_index(group) == index)
+            for index, host in enumerate(hosts)
+        }
+        layer._stop_readers()
+
+    @pytest.mark.skipif(not redis_available(), reason="requires a local Redis server")
+    @pytest.mark.asyncio
+    async def test_groups_are_spread_over_the_shards(self):
+        """Test that the groups are spread over the shards, and the messages are counted per shard."""
+        # Arrange
+        # Two databases of the same server act as two shards
+        self.layer = ShardedRedisStreamsChannelLayer(
+            hosts=["redis://{}:{}/{}".format(*REDIS_ADDRESS, db) for db in (1, 2)],
+            prefix="test-sharded",
+        )
+        groups = ["event-ATDome-1-stream{}".format(i) for i in range(20)]
+        channel = await self.layer.new_channel()
+        for group in groups:
+            await self.layer.group_add(group, channel)
+
+        # Act
+        for group in groups:
+            await self.layer.group_send(group, {"type": "test", "group": group})
+        received = [
+            await asyncio.wait_for(self.layer.receive(channel), 1) for group in groups
+        ]
+        await self.layer.send(channel, {"type": "direct"})
+        direct = await asyncio.wait_for(self.layer.receive(channel), 1)
+
+        # Assert
+        assert sorted(m["group"] for m in received) == sorted(groups)
+        assert direct == {"type": "direct"}
+        shard_messages = Metrics.get("channel_layer_shard_messages")
+        assert set(shard_messages) == {
+            "{}:{}/1".format(*REDIS_ADDRESS),
+            "{}:{}/2".format(*REDIS_ADDRESS),
+        }
+        assert sum(shard_messages.values()) == 21
+        await self.layer.flush()
+
+
+class TestEncryptOnceRedisChannelLayer:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        self.layer = EncryptOnceRedisChannelLayer(symmetric_encryption_keys=["key"])
+
+    def test_group_messages_are_encrypted_once(self):
+        """Test that a message sent to members of several processes is encrypted only once,
+        and every process gets it with the list of its member channels."""
+        # Arrange
+        channels = [
+            "specific.process1!a",
+            "specific.process1!b",
+            "specific.process2!c",
+        ]
+        message = {"type": "subscription_data", "data": {"summaryState": 1}}
+
+        # Act
+        with patch.object(
+            self.layer.crypter, "encrypt", wraps=self.layer.crypter.encrypt
+        ) as encrypt:
+            _, channel_key_to_message, _ = self.layer._map_channel_keys_to_connection(
+                channels, message
+            )
+
+        # Assert
+        assert encrypt.call_count == 1
+        received = {
+            key: self.layer.deserialize(value)
+            for key, value in channel_key_to_message.items()
+        }
+        assert received == {
+            "asgispecific.process1!": {**message, "__asgi_channel__": channels[:2]},
+            "asgispecific.process2!": {**message, "__asgi_channel__": channels[2:]},
+        }
+
+    def test_direct_messages_are_not_changed(self):
+        """Test that the messages sent directly to a channel are still serialized as in RedisChannelLayer."""
+        # Arrange
+        message = {"type": "test"}
+
+        # Act
+        serialized = self.layer.serialize(message)
+
+        # Assert
+        assert self.layer.deserialize(serialized) == message
+
+    @pytest.mark.skipif(not redis_available(), reason="requires a local Redis server")
+    @pytest.mark.asyncio
+    async def test_full_channels_are_counted(self):
+        """Test that the messages sent to full channels are skipped and counted, with the capacity of their group."""
+        # Arrange
+        Metrics.reset()
+        layer = EncryptOnceRedisChannelLayer(
+            hosts=[REDIS_ADDRESS],
+            prefix="test-capacity",
+            capacity=2,
+            group_capacity={"*-all": 3},
+        )
+        channel = await layer.new_channel()
+        await layer.group_add("event-ATDome-1-summaryState", channel)
+        await layer.group_add("event-all-all-all", channel)
+
+        # Act
+        for i in range(3):
+            await layer.group_send("event-ATDome-1-summaryState", {"type": "stream"})
+        await layer.group_send("event-all-all-all", {"type": "all"})
+        await layer.group_send("event-all-all-all", {"type": "all"})
+        received = [
+            (await asyncio.wait_for(layer.receive(channel), 1))["type"]
+            for i in range(3)
+        ]
+
+        # Assert
+        assert received == ["stream", "stream", "all"]
+        assert Metrics.get("channel_full", label="default") == 1
+        assert Metrics.get("channel_full", label="*-all") == 1
+        assert Metrics.get("channel_full_categories", label="event") == 2
+        await layer.flush()
@@ -0,0 +1,57 @@
+"""Tests for the trie used to index the subscriptions."""
+from subscription.subscription_index import SubscriptionTrie
+
+
+class TestSubscriptionTrie:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        self.trie = SubscriptionTrie()
+
+    def test_match_exact_and_wildcard_patterns(self):
+        """Test that a stream matches its exact pattern and the patterns with wildcards that contain it."""
+        # Arrange
+        patterns = [
+            ("event", "ATDome", "1", "summaryState"),
+            ("event", "ATDome", "1", "all"),
+            ("event", "all", "all", "all"),
+            ("event", "ATDome", "all", "summaryState"),
+            ("event", "ATDome", "2", "summaryState"),
+            ("telemetry", "all", "all", "all"),
+        ]
+        for pattern in patterns:
+            self.trie.add(pattern)
+
+        # Act
+        matches = self.trie.match("event", "ATDome", "1", "summaryState")
+
+        # Assert
+        assert sorted(matches) == sorted(patterns[:4])
+        assert self.trie.match("event", "ATMCS", "0", "heartbeat") == [
+            ("event", "all", "all", "all")
+        ]
+        assert self.trie.match("cmd", "ATDome", "1", "summaryState") == []
+
+    def test_reference_counts(self):
+        """Test that patterns are only removed when all their references are discarded."""
+        # Arrange
+        pattern = ("telemetry", "ATDome", "1", "position")
+        assert self.trie.add(pattern)
+        assert not self.trie.add(pattern)
+
+        # Act 1
+        removed = self.trie.discard(pattern)
+
+        # Assert 1
+        assert not removed
+        assert pattern in self.trie
+        assert self.trie.match(*pattern) == [pattern]
+
+        # Act 2
+        removed = self.trie.discard(pattern)
+
+        # Assert 2
+        assert removed
+        assert pattern not in self.trie
+        assert self.trie.match(*pattern) == []
+        assert self.trie.root == {}
+        assert len(self.trie) == 0
@@ -4,6 +4,7 @@ import pytest
 
 from django.contrib.auth.models import User, Permission
 from channels.testing import WebsocketCommunicator
+from channels.layers import get_channel_layer
 from manager.routing import application
 from api.models import Token
 
@@ -229,6 +230,77 @@ class TestSubscriptionCombinations:
             assert response == expected
         await communicator.disconnect()
 
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_receive_filtered_messages_from_all_subscription(self):
+        """Test that clients subscribed to all streams with filters only receive the data that passes them."""
+        # Arrange
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+        for category in self.categories:
+            msg = {
+                "option": "subscribe",
+                "category": category,
+                "csc": "all",
+                "salindex": "all",
+                "stream": "all",
+                "filters": {"csc": ["ATDome"], "salindex": [1], "stream": ["*1"]},
+            }
+            await communicator.send_json_to(msg)
+            await communicator.receive_json_from()
+        # Act
+        for combination in self.combinations:
+            msg, ignore = self.build_messages(
+                combination["category"],
+                combination["csc"],
+                combination["salindex"],
+                self.streams,
+            )
+            await communicator.send_json_to(msg)
+            if combination["csc"] == "ATDome" and combination["salindex"] == 1:
+                ignore, expected = self.build_messages(
+                    combination["category"],
+                    combination["csc"],
+                    combination["salindex"],
+                    ["stream1"],
+                )
+                expected["subscription"] = "{}-all-all-all".format(
+                    combination["category"]
+                )
+                response = await communicator.receive_json_from()
+                # Assert: receive only the filtered part of the message
+                assert response == expected
+            else:
+                # Assert: not receive messages filtered out completely
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        communicator.receive_json_from(),
+                        timeout=self.no_reception_timeout,
+                    )
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_reject_invalid_filters_in_all_subscription(self):
+        """Test that subscriptions to all streams with invalid filters are rejected."""
+        # Arrange
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+        msg = {
+            "option": "subscribe",
+            "category": "event",
+            "csc": "all",
+            "salindex": "all",
+            "stream": "all",
+            "filters": {"topic": ["summaryState"]},
+        }
+        # Act
+        await communicator.send_json_to(msg)
+        response = await communicator.receive_json_from()
+        # Assert
+        assert response["data"].startswith("Invalid subscription filters")
+        await communicator.disconnect()
+
     @pytest.mark.asyncio
     @pytest.mark.django_db(transaction=True)
     async def test_receive_message_for_subscribed_group_only(self):
@@ -378,6 +450,61 @@ class TestSubscriptionCombinations:
             await communicator.receive_json_from()
         await communicator.disconnect()
 
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_events_are_not_delayed_by_telemetry(self):
+        """Test that events are received through their own lane, ahead of the telemetry that sheds load."""
+        # Arrange
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+        for category in ["telemetry", "event"]:
+            await communicator.send_json_to(
+                {
+                    "option": "subscribe",
+                    "category": category,
+                    "csc": "ATDome",
+                    "salindex": 1,
+                    "stream": "stream1",
+                }
+            )
+            await communicator.receive_json_from()
+        channel_layer = get_channel_layer()
+        telemetry_channels = channel_layer.groups["telemetry-ATDome-1-stream1"]
+        event_channels = channel_layer.groups["event-ATDome-1-stream1"]
+        assert set(telemetry_channels).isdisjoint(set(event_channels))
+
+        # Act: flood the telemetry lane and then send an event
+        for i in range(2 * channel_layer.capacity):
+            msg, ignore = self.build_messages("telemetry", "ATDome", 1, ["stream1"])
+            await channel_layer.group_send(
+                "telemetry-ATDome-1-stream1",
+                {
+                    "type": "subscription_data",
+                    "category": "telemetry",
+                    "csc": "ATDome",
+                    "salindex": 1,
+                    "data": msg["data"][0]["data"],
+                    "subscription": "telemetry-ATDome-1-stream1",
+                },
+            )
+        msg, expected = self.build_messages("event", "ATDome", 1, ["stream1"])
+        await communicator.send_json_to(msg)
+        responses = []
+        while True:
+            try:
+                responses.append(
+                    await asyncio.wait_for(communicator.receive_json_from(), 0.1)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # Assert
+        categories = [response["category"] for response in responses]
+        assert expected in responses
+        assert categories.index("event") < channel_layer.capacity
+        assert categories.count("telemetry") <= channel_layer.capacity
+        await communicator.disconnect()
+
     @pytest.mark.asyncio
     @pytest.mark.django_db(transaction=True)
     async def test_request_initial_state_when_subscribing_to_event(self):
@@ -1,11 +1,16 @@
 """Tests for the subscription of consumers to love_csc streams."""
 import pytest
 import json
+import asyncio
 from django.contrib.auth.models import User, Permission
 from channels.testing import WebsocketCommunicator
 from manager.routing import application
 from api.models import Token
+from astropy.time import Time
+from astropy.units import hour
 from manager import utils
+from manager.time_engine import TimeEngine
+from subscription.time_data import TimeDataBroadcaster
 
 
 class TestTimeData:
@@ -17,6 +22,11 @@ class TestTimeData:
         self.token = Token.objects.create(user=self.user)
         self.user.user_permissions.add(Permission.objects.get(name="Execute Commands"))
         self.url = "manager/ws/subscription/?token={}".format(self.token)
+        TimeDataBroadcaster.reset()
+
+    def teardown_method(self):
+        """Clean up the TestCase, executed after each test of the TestCase."""
+        TimeDataBroadcaster.reset()
 
     @pytest.mark.asyncio
     @pytest.mark.django_db(transaction=True)
@@ -39,3 +49,138 @@ class TestTimeData:
         assert utils.assert_time_data(time_data)
         assert request_time == 12312312341123
         await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_get_time_data_from_cache(self, settings):
+        """Test that get_time_data answers with the latest time data of the broadcaster."""
+        # Arrange
+        settings.TIME_DATA_BROADCAST_INTERVAL = 60
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+        # Wait for the first refresh of the broadcaster, the next one is 60 seconds later
+        while TimeDataBroadcaster.latest is None:
+            await asyncio.sleep(0.01)
+        latest = TimeDataBroadcaster.latest
+
+        # Act
+        await communicator.send_json_to({"action": "get_time_data", "request_time": 1})
+        first_response = await communicator.receive_json_from()
+        await communicator.send_json_to({"action": "get_time_data", "request_time": 2})
+        second_response = await communicator.receive_json_from()
+
+        # Assert
+        assert utils.assert_time_data(first_response["time_data"])
+        assert first_response["time_data"] == latest
+        assert second_response["time_data"] == latest
+        assert second_response["request_time"] == 2
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_subscribe_time_data(self, settings):
+        """Test that the subscribers to the time_data group receive the time data periodically."""
+        # Arrange
+        settings.TIME_DATA_BROADCAST_INTERVAL = 0.1
+        communicator = WebsocketCommunicator(application, self.url)
+        connected, subprotocol = await communicator.connect()
+
+        # Act 1 (Subscribe)
+        await communicator.send_json_to({"action": "subscribe_time_data"})
+        responses = [await communicator.receive_json_from() for i in range(3)]
+
+        # Assert 1
+        for response in responses:
+            assert utils.assert_time_data(response["time_data"])
+        utc_values = [response["time_data"]["utc"] for response in responses]
+        assert utc_values == sorted(set(utc_values))
+
+        # Act 2 (Unsubscribe)
+        await communicator.send_json_to({"action": "unsubscribe_time_data"})
+
+        # Assert 2
+        await asyncio.sleep(0.3)
+        while not await communicator.receive_nothing():
+            await communicator.receive_json_from()
+        await asyncio.sleep(0.3)
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+
+class TestTimeEngine:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        TimeEngine.reset()
+
+    def teardown_method(self):
+        """Clean up the TestCase, executed after each test of the TestCase."""
+        TimeEngine.reset()
+
+    @pytest.mark.parametrize(
+        "utc", [946728000.0, 1483000000.0, 1700000000.0, 1900000000.0]
+    )
+    def test_accuracy_against_astropy(self, utc, settings):
+        """Test that the time data stays close to astropy during the whole refresh interval."""
+        # Arrange
+        settings.TIME_ENGINE_REFRESH_INTERVAL = 600
+        TimeEngine.refresh(utc)
+
+        for offset in [0, 1.5, 300, 599.9]:
+            # Act
+            time_data = TimeEngine.get_times(utc + offset)
+
+            # Assert
+            t = Time(utc + offset, format="unix", scale="utc")
+            sidereal_summit = t.sidereal_time(
+                "apparent", longitude=-70.749417, model=None
+            ).value
+            sidereal_greenwich = t.sidereal_time(
+                "apparent", longitude="greenwich", model=None
+            ).value
+            assert utils.assert_time_data(time_data)
+            # 1e-6 hourangles are less than 4 milliseconds
+            assert abs(time_data["sidereal_summit"] - sidereal_summit) < 1e-6
+            assert abs(time_data["sidereal_greenwich"] - sidereal_greenwich) < 1e-6
+            assert abs(time_data["mjd"] - t.mjd) < 1e-9
+            assert time_data["tai_to_utc"] == round(
+                t.datetime.timestamp() - t.tai.datetime.timestamp(), 3
+            )
+            assert time_data["tai"] - time_data["utc"] == -time_data["tai_to_utc"]
+            shifted_iso = (t.tai - 12 * hour).iso
+            assert time_data["observing_day"] == shifted_iso[0:10].replace("-", "")
+
+    def test_refresh_after_interval(self, settings):
+        """Test that astropy is only used when the corrections expire."""
+        # Arrange
+        settings.TIME_ENGINE_REFRESH_INTERVAL = 600
+        utc = 1700000000.0
+        TimeEngine.get_times(utc)
+        state = TimeEngine._state
+
+        # Act 1
+        TimeEngine.get_times(utc + 599)
+
+        # Assert 1
+        assert TimeEngine._state is state
+
+        # Act 2
+        TimeEngine.get_times(utc + 600)
+
+        # Assert 2
+        assert TimeEngine._state is not state
+        assert TimeEngine._state[0] == utc + 600
+
+    def test_leap_second(self, settings):
+        """Test that a new leap second is applied after midnight, before the refresh interval."""
+        # Arrange
+        settings.TIME_ENGINE_REFRESH_INTERVAL = 3600
+        # 2016-12-31T23:30:00 UTC, the last leap second was added at the end of that day
+        utc = 1483227000.0
+
+        # Act
+        before = TimeEngine.get_tai_to_utc(utc)
+        after = TimeEngine.get_tai_to_utc(utc + 1800)
+
+        # Assert
+        assert before == -36.0
+        assert after == -37.0
@@ -0,0 +1,311 @@
+"""Tests for the detection of slow websocket clients."""
+import time
+import asyncio
+import functools
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from manager.routing import application
+from api.models import Token
+from subscription.metrics import Metrics
+from subscription.watchdog import (
+    SlowClientWatchdog,
+    TransportProducer,
+    SLOW_CLIENT_CLOSE_CODE,
+)
+
+
+class TestSlowClientWatchdog:
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        Metrics.reset()
+        self.watchdog = SlowClientWatchdog(
+            max_delay=1, max_queue_depth=10, grace_period=0.01
+        )
+
+    def test_up_to_date_client_is_not_downgraded(self):
+        """Test that a client receiving messages on time keeps the normal mode."""
+        # Act
+        actions = [self.watchdog.record(0.1, 2) for i in range(10)]
+
+        # Assert
+        assert actions == [None] * 10
+        assert self.watchdog.mode == SlowClientWatchdog.NORMAL
+        assert Metrics.get("slow_client_downgrades") == 0
+
+    def test_slow_client_is_downgraded_and_evicted(self):
+        """Test that a slow client is first downgraded and then evicted if it stays behind."""
+        # Act 1: the client falls behind
+        action = self.watchdog.record(2, 0)
+
+        # Assert 1
+        assert action == SlowClientWatchdog.DOWNGRADE
+        assert self.watchdog.mode == SlowClientWatchdog.REDUCED
+        assert Metrics.get("slow_client_downgrades") == 1
+
+        # Act 2: the client is still behind after the grace period
+        time.sleep(0.02)
+        action = self.watchdog.record(None, 20)
+
+        # Assert 2
+        assert action == SlowClientWatchdog.EVICT
+        assert Metrics.get("slow_client_evictions") == 1
+
+    def test_slow_client_is_restored_when_it_catches_up(self):
+        """Test that a downgraded client is restored to the normal mode once it catches up."""
+        # Arrange
+        self.watchdog.record(0, 20)
+
+        # Act
+        first_action = self.watchdog.record(0.1, 0)
+        time.sleep(0.02)
+        second_action = self.watchdog.record(0.1, 0)
+
+        # Assert
+        assert first_action is None
+        assert second_action == SlowClientWatchdog.RESTORE
+        assert self.watchdog.mode == SlowClientWatchdog.NORMAL
+        assert Metrics.get("slow_client_evictions") == 0
+
+
+class StandInProtocol:
+    """Websocket protocol of a Daphne connection, that only accepts one producer."""
+
+    def __init__(self):
+        self.producer = None
+
+    def registerProducer(self, producer, streaming):
+        if self.producer is not None:
+            raise RuntimeError("Producer already registered")
+        self.producer = producer
+
+    def unregisterProducer(self):
+        self.producer = None
+
+
+class TestTransportProducer:
+    def test_producer_follows_the_connection(self):
+        """Test that the producer is registered on Daphne connections, and paused with them."""
+        # Arrange
+        protocol = StandInProtocol()
+        send = functools.partial(lambda protocol, message: None, protocol)
+
+        # Act
+        producer = TransportProducer.attach(send)
+        protocol.producer.pauseProducing()
+        paused = producer.writable.is_set()
+        protocol.producer.resumeProducing()
+        producer.detach()
+
+        # Assert
+        assert paused is False
+        assert producer.writable.is_set()
+        assert protocol.producer is None
+        assert TransportProducer.attach(lambda message: None) is None
+
+
+class TestSlowClientConsumer:
+    """Test that the consumers downgrade and close the clients that do not read their messages."""
+
+    def setup_method(self):
+        """Set up the TestCase, executed before each test of the TestCase."""
+        Metrics.reset()
+        self.user = User.objects.create_user(
+            "username", password="123", email="user@user.cl"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.url = "manager/ws/subscription/?token={}".format(self.token)
+        self.reading = None
+        send = AsyncJsonWebsocketConsumer.send
+
+        async def stalled_send(consumer, *args, **kwargs):
+            await self.reading.wait()
+            await send(consumer, *args, **kwargs)
+
+        self.patcher = patch.object(AsyncJsonWebsocketConsumer, "send", stalled_send)
+        self.patcher.start()
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    @pytest.fixture(autouse=True)
+    def watchdog_settings(self, settings):
+        settings.SLOW_CLIENT_MAX_DELAY = 0.1
+        settings.SLOW_CLIENT_CHECK_INTERVAL = 0.02
+        settings.SLOW_CLIENT_REDUCED_RATE_INTERVAL = 0.2
+        settings.SLOW_CLIENT_GRACE_PERIOD = 0.5
+
+    async def subscribe(self):
+        """Connect a client subscribed to a telemetry stream and return its communicator."""
+        self.reading = asyncio.Event()
+        self.reading.set()
+        communicator = WebsocketCommunicator(application, self.url)
+        await communicator.connect()
+        await communicator.send_json_to(
+            {
+                "option": "subscribe",
+                "category": "telemetry",
+                "csc": "ATDome",
+                "salindex": 1,
+                "stream": "stream1",
+            }
+        )
+        await communicator.receive_json_from()
+        return communicator
+
+    async def send_telemetry(self, value):
+        """Send a telemetry message to the subscribed stream."""
+        await get_channel_layer().group_send(
+            "telemetry-ATDome-1-stream1",
+            {
+                "type": "subscription_data",
+                "category": "telemetry",
+                "csc": "ATDome",
+                "salindex": 1,
+                "data": {"stream1": {"value": value}},
+                "subscription": "telemetry-ATDome-1-stream1",
+            },
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_client_is_downgraded(self, settings):
+        """Test that a client that stops reading is downgraded to the reduced-rate mode."""
+        # Arrange
+        settings.SLOW_CLIENT_GRACE_PERIOD = 10
+        communicator = await self.subscribe()
+        self.reading.clear()
+        await self.send_telemetry(0)
+        await asyncio.sleep(0.3)
+        self.reading.set()
+        await communicator.receive_json_from()
+
+        # Act
+        for value in range(1, 21):
+            await self.send_telemetry(value)
+        responses = []
+        while True:
+            try:
+                responses.append(
+                    await asyncio.wait_for(communicator.receive_json_from(), 0.5)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # Assert
+        assert Metrics.get("slow_client_downgrades") == 1
+        assert Metrics.get("slow_client_evictions") == 0
+        assert 0 < len(responses) < 20
+        assert responses[-1]["data"][0]["data"]["stream1"]["value"] == 20
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_client_is_closed(self):
+        """Test that a client that does not read its messages is closed after the grace period."""
+        # Arrange
+        communicator = await self.subscribe()
+        self.reading.clear()
+
+        # Act
+        await self.send_telemetry(0)
+        output = await communicator.receive_output(timeout=3)
+
+        # Assert
+        assert output == {"type": "websocket.close", "code": SLOW_CLIENT_CLOSE_CODE}
+        assert Metrics.get("slow_client_downgrades") == 1
+        assert Metrics.get("slow_client_evictions") == 1
+        self.reading.set()
+        await communicator.wait()
+
+    async def send_event(self, value):
+        """Send an event message to the subscribed event stream."""
+        await get_channel_layer().group_send(
+            "event-ATDome-1-event1",
+            {
+                "type": "subscription_data",
+                "category": "event",
+                "csc": "ATDome",
+                "salindex": 1,
+                "data": {"event1": {"value": value}},
+                "subscription": "event-ATDome-1-event1",
+            },
+        )
+
+    async def fill_telemetry_outbox(self, settings):
+        """Connect a client subscribed to a telemetry and an event stream,
+        and leave a backlog of telemetry it does not read.
+
+        Returns
+        -------
+        `WebsocketCommunicator`
+            The communicator of the client
+        """
+        settings.CLIENT_OUTBOX_CAPACITY = 2
+        settings.SLOW_CLIENT_MAX_DELAY = 10
+        settings.SLOW_CLIENT_MAX_QUEUE_DEPTH = 100
+        communicator = await self.subscribe()
+        await communicator.send_json_to(
+            {
+                "option": "subscribe",
+                "category": "event",
+                "csc": "ATDome",
+                "salindex": 1,
+                "stream": "event1",
+            }
+        )
+        await communicator.receive_json_from()
+        self.reading.clear()
+        for value in range(10):
+            await self.send_telemetry(value)
+        await asyncio.sleep(0.2)
+        return communicator
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_events_skip_the_telemetry_backlog(self, settings):
+        """Test that an event is written before the telemetry that waits for the client."""
+        # Arrange
+        communicator = await self.fill_telemetry_outbox(settings)
+
+        # Act
+        await self.send_event(1)
+        await asyncio.sleep(0.1)
+        self.reading.set()
+        responses = []
+        while True:
+            try:
+                responses.append(
+                    await asyncio.wait_for(communicator.receive_json_from(), 0.5)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # Assert: only the telemetry message being written when the client stopped reading goes first
+        categories = [response["category"] for response in responses]
+        assert categories[:2] == ["telemetry", "event"]
+        assert categories.count("telemetry") > 1
+        assert Metrics.get("slow_client_evictions") == 0
+        await communicator.disconnect()
+
+    @pytest.mark.asyncio
+    @pytest.mark.django_db(transaction=True)
+    async def test_logout_does_not_wait_for_the_telemetry_backlog(self, settings):
+        """Test that a client with a telemetry backlog is logged out while it is still not reading."""
+        # Arrange
+        communicator = await self.fill_telemetry_outbox(settings)
+        await self.send_event(1)
+
+        # Act
+        await get_channel_layer().group_send(
+            "token-{}".format(self.token), {"type": "logout"}
+        )
+        output = await communicator.receive_output(timeout=1)
+
+        # Assert
+        assert output == {"type": "websocket.close"}
+        self.reading.set()
+        await communicator.wait()
@@ -0,0 +1,152 @@
+"""Defines the broadcaster of the time data to the clients subscribed to the time_data group."""
+import os
+import json
+import time
+import fcntl
+import asyncio
+from channels.layers import get_channel_layer
+from django.conf import settings
+from manager import utils
+from subscription.metrics import Metrics
+from subscription.subscription_index import SubscriptionIndex
+
+
+class TimeDataBroadcaster:
+    """Keeps the latest time data of the process and broadcasts it to the `group_name` group.
+
+    Every process refreshes its latest time data every `TIME_DATA_BROADCAST_INTERVAL` seconds,
+    which is used to answer the "get_time_data" actions without computing it per request.
+
+    Only one process per node sends the frames to the group: the one holding the lock of
+    the `TIME_DATA_LOCK_FILE`, or this process if the Channel Layer is not shared.
+    The JSON of the frame is encoded once, and sent as is by every consumer.
+    Frames are numbered by interval (tick), so if several nodes broadcast to the same group,
+    consumers only send the first frame of every tick to their clients.
+    """
+
+    group_name = "time_data"
+    """Name of the group of the consumers that receive the time data (`string`)"""
+
+    latest = None
+    """Latest time data of this process (`dict`)"""
+
+    latest_tick = None
+    """Tick of the latest time data, i.e. its utc timestamp divided by the interval (`int`)"""
+
+    latest_frame = None
+    """JSON of the frame sent to the clients with the latest time data (`string`)"""
+
+    broadcast_task = None
+    """Reference to the task that refreshes and broadcasts the time data."""
+
+    lock_file = None
+    """File descriptor of the `TIME_DATA_LOCK_FILE`, if this process holds its lock (`int`)"""
+
+    @classmethod
+    def initialize(cls):
+        """Initialize the TimeDataBroadcaster.
+
+        Run an async task in the event loop to refresh and broadcast the time data periodically.
+        """
+        if not cls.broadcast_task:
+            cls.broadcast_task = asyncio.create_task(cls.broadcast())
+
+    @classmethod
+    def update(cls):
+        """Compute the latest time data and encode its frame."""
+        cls.latest = utils.get_times()
+        cls.latest_tick = int(
+            cls.latest["utc"] // settings.TIME_DATA_BROADCAST_INTERVAL
+        )
+        cls.latest_frame = json.dumps({"time_data": cls.latest})
+
+    @classmethod
+    def get_latest(cls):
+        """Return the latest time data, computing it if it is older than 2 intervals,
+        e.g. when there is no task refreshing it.
+
+        Returns
+        -------
+        `dict`
+            The time data, see `manager.utils.get_times`
+        """
+        if (
+            cls.latest is None
+            or time.time() - cls.latest["utc"]
+            > 2 * settings.TIME_DATA_BROADCAST_INTERVAL
+        ):
+            cls.update()
+        return cls.latest
+
+    @classmethod
+    def get_frame_message(cls):
+        """Return the message sent to the group with the latest time data.
+
+        Returns
+        -------
+        `dict`
+            The message, with the tick and the encoded frame
+        """
+        return {
+            "type": "time_data_frame",
+            "tick": cls.latest_tick,
+            "frame": cls.latest_frame,
+        }
+
+    @classmethod
+    def is_broadcaster(cls):
+        """Define wether or not this process sends the frames to the group, acquiring the lock if it is free.
+
+        Returns
+        -------
+        `bool`
+            True if this process is the broadcaster of its node, False if not
+        """
+        if not SubscriptionIndex.is_shared():
+            return True
+        if cls.lock_file is not None:
+            return True
+        lock_file = os.open(settings.TIME_DATA_LOCK_FILE, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_file)
+            return False
+        cls.lock_file = lock_file
+        return True
+
+    @classmethod
+    async def broadcast(cls):
+        """Refresh the time data and send it to the group periodically, at the start of every interval.
+
+        This is what the `broadcast_task` does
+        """
+        channel_layer = get_channel_layer()
+        interval = settings.TIME_DATA_BROADCAST_INTERVAL
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # In a thread, so the periodic refreshes of the `TimeEngine` do not block the event loop
+                await loop.run_in_executor(None, cls.update)
+                if cls.is_broadcaster():
+                    await channel_layer.group_send(
+                        cls.group_name, cls.get_frame_message()
+                    )
+                    Metrics.increment("time_data_frames")
+            except Exception as e:
+                print(e, flush=True)
+            await asyncio.sleep(interval - time.time() % interval)
+
+    @classmethod
+    def reset(cls):
+        """Stop (cancel) the task and reset the TimeDataBroadcaster to its default values,
+        releasing the lock if this process holds it."""
+        if cls.broadcast_task and not cls.broadcast_task.get_loop().is_closed():
+            cls.broadcast_task.cancel()
+        cls.broadcast_task = None
+        if cls.lock_file is not None:
+            os.close(cls.lock_file)
+        cls.lock_file = None
+        cls.latest = None
+        cls.latest_tick = None
+        cls.latest_frame = None
@@ -0,0 +1,180 @@
+"""Defines the watchdog used to detect and evict websocket clients that cannot keep up with their subscriptions."""
+import time
+import asyncio
+import functools
+from django.conf import settings
+from subscription.metrics import Metrics
+
+SLOW_CLIENT_CLOSE_CODE = 4008
+"""Websocket close code sent to the clients evicted for being too slow (`int`)"""
+
+
+class SlowClientWatchdog:
+    """Keep track of how far behind a websocket client is, and decide when to downgrade or evict it.
+
+    A client is considered behind when the oldest message waiting to be written to its websocket
+    has waited more than `max_delay` seconds, or when more than `max_queue_depth` messages are waiting
+    to be sent to it. Times are measured in the process of the consumer, with a monotonic clock.
+
+    The first time a client is behind it is downgraded to a reduced-rate mode.
+    If it is still behind after `grace_period` seconds in that mode it must be evicted.
+    If it stays up to date for `grace_period` seconds in that mode it is restored to the normal mode.
+    """
+
+    NORMAL = "normal"
+    """Mode of the clients that receive every message"""
+
+    REDUCED = "reduced"
+    """Mode of the clients that receive only the latest telemetry of each subscription, at a reduced rate"""
+
+    DOWNGRADE = "downgrade"
+    """Action returned when the client must be downgraded"""
+
+    RESTORE = "restore"
+    """Action returned when the client can be restored to the normal mode"""
+
+    EVICT = "evict"
+    """Action returned when the client must be closed"""
+
+    def __init__(self, max_delay=None, max_queue_depth=None, grace_period=None):
+        self.max_delay = (
+            max_delay if max_delay is not None else settings.SLOW_CLIENT_MAX_DELAY
+        )
+        self.max_queue_depth = (
+            max_queue_depth
+            if max_queue_depth is not None
+            else settings.SLOW_CLIENT_MAX_QUEUE_DEPTH
+        )
+        self.grace_period = (
+            grace_period
+            if grace_period is not None
+            else settings.SLOW_CLIENT_GRACE_PERIOD
+        )
+        self.mode = self.NORMAL
+        self.mode_since = time.monotonic()
+        self.behind_since = None
+        self.caught_up_since = None
+        self.delay = 0.0
+        self.queue_depth = 0
+
+    def record(self, delay, queue_depth):
+        """Record the state of the client when a message is sent to it and return the action to take, if any.
+
+        Parameters
+        ----------
+        delay: `float`
+            seconds the oldest message waiting to be written to the client has waited, None if unknown
+        queue_depth: `int`
+            number of messages waiting to be sent to the client
+
+        Returns
+        -------
+        `string` or None
+            DOWNGRADE, RESTORE or EVICT if the mode of the client must change, None if not
+        """
+        now = time.monotonic()
+        if delay is not None:
+            self.delay = delay
+        self.queue_depth = queue_depth
+        behind = self.delay > self.max_delay or self.queue_depth > self.max_queue_depth
+        if not behind:
+            self.behind_since = None
+            if self.caught_up_since is None:
+                self.caught_up_since = now
+            if (
+                self.mode == self.REDUCED
+                and now - self.caught_up_since > self.grace_period
+            ):
+                self._set_mode(self.NORMAL, now)
+                return self.RESTORE
+            return None
+
+        self.caught_up_since = None
+        if self.behind_since is None:
+            self.behind_since = now
+        if self.mode == self.NORMAL:
+            self._set_mode(self.REDUCED, now)
+            Metrics.increment("slow_client_downgrades")
+            return self.DOWNGRADE
+        if now - max(self.behind_since, self.mode_since) > self.grace_period:
+            Metrics.increment("slow_client_evictions")
+            return self.EVICT
+        return None
+
+    def _set_mode(self, mode, now):
+        """Change the mode of the client.
+
+        Parameters
+        ----------
+        mode: `string`
+            either NORMAL or REDUCED
+        now: `float`
+            current monotonic time
+        """
+        self.mode = mode
+        self.mode_since = now
+
+
+class TransportProducer:
+    """Twisted push producer registered on the websocket protocol of a Daphne connection.
+
+    The ASGI `send` of Daphne never waits for the client, its messages are buffered by Twisted instead.
+    Twisted pauses the producers of a connection while its output buffer is full, and resumes them
+    once it is written, so `writable` tells wether or not the client is reading its messages.
+
+    Parameters
+    ----------
+    protocol: `autobahn.twisted.websocket.WebSocketServerProtocol`
+        The websocket protocol of the connection
+    """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    @classmethod
+    def attach(cls, send):
+        """Register a producer on the connection of an ASGI `send` callable, if it is a Daphne connection.
+
+        Parameters
+        ----------
+        send: `callable`
+            The ASGI `send` callable of the connection
+
+        Returns
+        -------
+        `TransportProducer`
+            The producer, or None if the connection is not a Daphne connection
+        """
+        if not isinstance(send, functools.partial) or not send.args:
+            return None
+        protocol = send.args[0]
+        if not hasattr(protocol, "registerProducer"):
+            return None
+        producer = cls(protocol)
+        try:
+            protocol.registerProducer(producer, True)
+        except Exception:
+            return None
+        return producer
+
+    def detach(self):
+        """Unregister the producer from the connection."""
+        self.writable.set()
+        try:
+            self.protocol.unregisterProducer()
+        except Exception:
+            pass
+
+    def pauseProducing(self):
+        """Called by Twisted when the output buffer of the connection is full."""
+        self.writable.clear()
+
+    def resumeProducing(self):
+        """Called by Twisted when the output buffer of the connection has been written."""
+        self.writable.set()
+
+    def stopProducing(self):
+        """Called by Twisted when the connection is closed."""
+        self.writable.set()